@@ -0,0 +1,557 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for Notion to MDX
+Times the scripts' hot paths on seeded synthetic Notion pages and a local
+image server, and compares runs against a saved baseline
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from content_analyzer import DOMAIN_KEYWORDS, STOP_WORDS, extract_keywords, suggest_tags
+from mdx_builder import build_mdx
+from text_io import open_output
+from url_converter import DOMAIN_NAMES, convert_urls_to_markdown
+
+# Bump when the result layout changes; baselines of another version are not compared
+BENCHMARK_VERSION = 2
+
+# Target page size in bytes and how many links/images per KB of text
+SIZE_CLASSES = {
+    'small': {'bytes': 4 * 1024, 'links_per_kb': 0.5, 'images_per_kb': 0.25},
+    'medium': {'bytes': 64 * 1024, 'links_per_kb': 1.0, 'images_per_kb': 0.1},
+    'large': {'bytes': 1024 * 1024, 'links_per_kb': 1.5, 'images_per_kb': 0.05},
+    'huge': {'bytes': 10 * 1024 * 1024, 'links_per_kb': 4.0, 'images_per_kb': 0.1},
+}
+DEFAULT_SIZES = ('small', 'medium', 'large')
+
+STAGES = ('extract_keywords', 'suggest_tags', 'convert_urls_to_markdown', 'build_mdx',
+          'download_image')
+
+# Image sizes served by the local image server, in bytes
+IMAGE_BYTES = (20 * 1024, 200 * 1024, 2 * 1024 * 1024)
+
+# Images fetched per size class; enough for stable percentiles without a slow run
+MAX_DOWNLOADS = 60
+
+PROPER_NOUNS = ('SanFrancisco', 'Singapore', 'Notion', 'Python', 'Tokyo', 'GitHub',
+                'NetworkSchool', 'Berlin', 'OpenAI', 'London')
+CODE_LANGUAGES = ('python', 'bash', 'js', '')
+
+
+def _words(rng: random.Random) -> List[str]:
+    """Vocabulary weighted like prose: mostly stop words, some theme terms"""
+    # Single words only, so a seed gives the same pages as the vocabulary grows phrases
+    themed = sorted({word for words in DOMAIN_KEYWORDS.values() for word in words if ' ' not in word})
+    filler = sorted(STOP_WORDS)
+    return filler * 3 + themed + [f"term{rng.randrange(500)}" for _ in range(200)]
+
+
+def generate_page(size: str, seed: int = 0, image_base: str = 'http://127.0.0.1:8000') -> str:
+    """
+    Generate a Notion-like Markdown page of a size class
+
+    Pages mix headings, paragraphs with proper nouns, bullet lists,
+    quotes, fenced and inline code, plain URLs, existing Markdown links
+    and image references, in proportions set by SIZE_CLASSES. The same
+    seed always gives the same page.
+
+    Args:
+        size: Key of SIZE_CLASSES
+        seed: Random seed
+        image_base: Root URL that image references point at
+
+    Returns:
+        Page markdown
+    """
+    spec = SIZE_CLASSES[size]
+    rng = random.Random(f"{seed}:{size}")
+    vocabulary = _words(rng)
+    domains = sorted(DOMAIN_NAMES) + ['example.com', 'blog.example.org', 'docs.python.org']
+    link_chance = spec['links_per_kb'] / 120   # about 120 words per KB
+    # One image at a random offset in each stretch of this many bytes, so
+    # the count follows the page size however large the blocks are
+    image_every = 1024 / spec['images_per_kb']
+    next_image = rng.random() * image_every
+
+    def url() -> str:
+        path = '/'.join(rng.choice(vocabulary) for _ in range(rng.randint(0, 3)))
+        return f"https://{rng.choice(domains)}/{path}"
+
+    def sentence() -> str:
+        words = []
+        for _ in range(rng.randint(6, 20)):
+            roll = rng.random()
+            if roll < link_chance:
+                words.append(url() if rng.random() < 0.7 else f"[{rng.choice(vocabulary)}]({url()})")
+            elif roll < link_chance + 0.04:
+                words.append(rng.choice(PROPER_NOUNS))
+            elif roll < link_chance + 0.06:
+                words.append(f"`{rng.choice(vocabulary)}`")
+            else:
+                words.append(rng.choice(vocabulary))
+        text = ' '.join(words)
+        return text[0].upper() + text[1:] + '.'
+
+    parts = [f"# {' '.join(rng.choice(vocabulary) for _ in range(5)).title()}\n\n"]
+    written = len(parts[0])
+    while written < spec['bytes']:
+        roll = rng.random()
+        if written >= next_image:
+            n = rng.randrange(1000)
+            block = f"![{rng.choice(vocabulary)}]({image_base}/img/{n}.png)\n\n"
+            next_image = (next_image // image_every + 1 + rng.random()) * image_every
+        elif roll < 0.08:
+            block = f"## {' '.join(rng.choice(vocabulary) for _ in range(4)).title()}\n\n"
+        elif roll < 0.2:
+            block = ''.join(f"- {sentence()}\n" for _ in range(rng.randint(2, 6))) + '\n'
+        elif roll < 0.25:
+            block = f"> {sentence()}\n\n"
+        elif roll < 0.3:
+            lines = [f"fetch('{url()}')" for _ in range(rng.randint(1, 8))]
+            block = f"```{rng.choice(CODE_LANGUAGES)}\n" + '\n'.join(lines) + "\n```\n\n"
+        else:
+            block = ' '.join(sentence() for _ in range(rng.randint(2, 6))) + '\n\n'
+        parts.append(block)
+        written += len(block)
+    return ''.join(parts)
+
+
+def generate_corpus(sizes=DEFAULT_SIZES, pages: int = 3, seed: int = 0,
+                    image_base: str = 'http://127.0.0.1:8000') -> Dict[str, List[str]]:
+    """
+    Generate several pages for each size class
+
+    Args:
+        sizes: Size class names
+        pages: Pages per class
+        seed: Random seed
+        image_base: Root URL that image references point at
+
+    Returns:
+        Dict of size class -> pages
+    """
+    return {size: [generate_page(size, seed + i, image_base) for i in range(pages)] for size in sizes}
+
+
+def synthetic_png(n_bytes: int, seed: int = 0) -> bytes:
+    """
+    Build a PNG of roughly n_bytes whose header reports real dimensions
+
+    The pixel data is incompressible noise, so the file size is what
+    the download path has to move; only the header is ever probed.
+    """
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    payload = random.Random(seed).randbytes(max(0, n_bytes - 57))
+    header = struct.pack('>IIBBBBB', 1200, 800, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', payload)
+            + chunk(b'IEND', b''))
+
+
+class LocalServer:
+    """
+    Local HTTP server on a free port, served from a background thread
+
+    Every GET is passed to handle with the request handler, which sends
+    the response. The benchmark's image server and the tests' stand-in
+    servers are built on it.
+
+    Usage:
+        with LocalServer(handle) as server:
+            url = f"{server.url}/path"
+    """
+
+    def __init__(self, handle: Callable[[BaseHTTPRequestHandler], None]):
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                handle(self)
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        # A short poll interval lets tests stop a server without a half-second wait
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+
+    def __enter__(self) -> 'LocalServer':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class ImageServer(LocalServer):
+    """
+    Local HTTP server for image downloads
+
+    /img/<n>.png returns one of IMAGE_BYTES sized images, picked by n,
+    from memory with a Content-Length, so downloads measure the client
+    rather than the disk or network.
+
+    Usage:
+        with ImageServer() as server:
+            url = f"{server.url}/img/1.png"
+    """
+
+    def __init__(self, image_bytes=IMAGE_BYTES):
+        images = [synthetic_png(size, i) for i, size in enumerate(image_bytes)]
+
+        def handle(request: BaseHTTPRequestHandler) -> None:
+            name = request.path.rsplit('/', 1)[-1].split('.')[0]
+            if not request.path.startswith('/img/') or not name.isdigit():
+                request.send_error(404)
+                return
+            body = images[int(name) % len(images)]
+            request.send_response(200)
+            request.send_header('Content-Type', 'image/png')
+            request.send_header('Content-Length', str(len(body)))
+            request.end_headers()
+            request.wfile.write(body)
+
+        super().__init__(handle)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Linearly interpolated q-th percentile (0-100) of sorted values"""
+    if not values:
+        return 0.0
+    position = (len(values) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def summarize(latencies: List[float], total_bytes: int, peak_bytes: int) -> dict:
+    """
+    Summarize timed calls of one stage
+
+    Args:
+        latencies: Seconds per call
+        total_bytes: Input bytes processed over all calls
+        peak_bytes: Peak traced memory of one call
+
+    Returns:
+        Dict with calls, throughput (bytes/s and calls/s), latency
+        percentiles in milliseconds and peak memory in bytes, or
+        {'calls': 0, 'skipped': True} if there were no calls
+    """
+    if not latencies:
+        # Zero percentiles would read as an impossibly fast stage
+        return {'calls': 0, 'skipped': True}
+    latencies = sorted(latencies)
+    total = sum(latencies)
+    return {
+        'calls': len(latencies),
+        'bytes_per_second': round(total_bytes / total) if total > 0 else 0,
+        'calls_per_second': round(len(latencies) / total, 2) if total > 0 else 0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p90_ms': round(percentile(latencies, 90) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3),
+        'peak_memory': peak_bytes,
+    }
+
+
+def _measure(call: Callable[[], object], repeat: int) -> tuple:
+    """Time call repeat times, then trace the memory of one more call"""
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+
+    # Traced separately: tracemalloc slows allocation-heavy code several-fold
+    tracemalloc.start()
+    try:
+        call()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return latencies, peak
+
+
+def bench_text_stage(stage: str, pages: List[str], repeat: int) -> dict:
+    """
+    Benchmark a text stage over pages
+
+    Args:
+        stage: One of the text stages in STAGES
+        pages: Page markdown
+        repeat: Timed calls per page
+
+    Returns:
+        Summary (see summarize)
+    """
+    calls = {
+        'extract_keywords': extract_keywords,
+        'suggest_tags': suggest_tags,
+        'convert_urls_to_markdown': convert_urls_to_markdown,
+        'build_mdx': lambda text: build_mdx('Benchmark Page', '2025-01-12', ['benchmark'], text),
+    }
+    function = calls[stage]
+    latencies = []
+    peak = 0
+    for text in pages:
+        times, page_peak = _measure(lambda: function(text), repeat)
+        latencies.extend(times)
+        peak = max(peak, page_peak)
+    total_bytes = sum(len(text.encode('utf-8')) for text in pages) * repeat
+    return summarize(latencies, total_bytes, peak)
+
+
+def bench_downloads(pages: List[str], work_dir: Path) -> dict:
+    """
+    Benchmark download_image against the local image server
+
+    Each image is fetched once over a shared session; the last one is
+    fetched again under tracemalloc for the peak memory.
+
+    Args:
+        pages: Pages whose image references point at an ImageServer
+        work_dir: Scratch directory for the downloads
+
+    Returns:
+        Summary (see summarize); throughput counts image bytes
+    """
+    from image_processor import download_image, extract_image_urls, new_session
+
+    urls = list(dict.fromkeys(url for text in pages for url in extract_image_urls(text)))
+    urls = urls[:MAX_DOWNLOADS]
+    if not urls:
+        return summarize([], 0, 0)
+
+    session = new_session(1)
+    latencies = []
+    total_bytes = 0
+    try:
+        for i, url in enumerate(urls):
+            start = time.perf_counter()
+            path = download_image(url, work_dir, f"image-{i}.png", session=session, verbose=False)
+            latencies.append(time.perf_counter() - start)
+            total_bytes += path.stat().st_size
+            path.unlink()
+
+        tracemalloc.start()
+        try:
+            download_image(urls[-1], work_dir, 'traced.png', session=session, verbose=False).unlink()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    finally:
+        session.close()
+    return summarize(latencies, total_bytes, peak)
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, stages=STAGES, pages: int = 3, repeat: int = 5,
+                   seed: int = 0, log=sys.stderr) -> dict:
+    """
+    Run the selected stages on every size class
+
+    Args:
+        sizes: Size class names
+        stages: Stage names
+        pages: Synthetic pages per size class
+        repeat: Timed calls per page for the text stages
+        seed: Corpus seed
+        log: Stream for progress lines (None for quiet)
+
+    Returns:
+        Results with 'meta' (environment and parameters) and 'results'
+        (stage -> size class -> summary)
+    """
+    results = {}
+    with ImageServer() as server:
+        corpus = generate_corpus(sizes, pages, seed, server.url)
+        work_dir = Path(tempfile.mkdtemp(prefix='notion-to-mdx-bench-'))
+        try:
+            for stage in stages:
+                for size in sizes:
+                    if stage == 'download_image':
+                        summary = bench_downloads(corpus[size], work_dir)
+                    else:
+                        summary = bench_text_stage(stage, corpus[size], repeat)
+                    results.setdefault(stage, {})[size] = summary
+                    if log is not None and summary.get('skipped'):
+                        print(f"⚠ {stage} [{size}] skipped: no samples", file=log)
+                    elif log is not None:
+                        print(f"✓ {stage} [{size}] p50 {summary['p50_ms']} ms, "
+                              f"{summary['bytes_per_second'] / 1e6:.1f} MB/s, "
+                              f"peak {summary['peak_memory'] / 1e6:.1f} MB", file=log)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'version': BENCHMARK_VERSION,
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'seed': seed,
+            'pages': pages,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float = 0.1) -> Iterator[dict]:
+    """
+    Compare median latencies of two runs
+
+    Args:
+        results: Current run from run_benchmarks
+        baseline: Earlier run
+        threshold: Relative slowdown that counts as a regression
+
+    Yields:
+        Dict per stage and size class measured in both runs, with the
+        baseline and current p50, their ratio and a regression flag
+    """
+    if baseline.get('meta', {}).get('version') != BENCHMARK_VERSION:
+        return
+    for stage, by_size in results['results'].items():
+        for size, current in by_size.items():
+            before = baseline['results'].get(stage, {}).get(size)
+            if current.get('skipped') or not before or not before.get('p50_ms'):
+                continue
+            ratio = current['p50_ms'] / before['p50_ms']
+            yield {
+                'stage': stage,
+                'size': size,
+                'baseline_p50_ms': before['p50_ms'],
+                'p50_ms': current['p50_ms'],
+                'ratio': round(ratio, 3),
+                'regression': ratio > 1 + threshold,
+            }
+
+
+def parse_names(value: Optional[str], known, default) -> List[str]:
+    """Split a comma-separated option, checking each name"""
+    if not value:
+        return list(default)
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in known]
+    if unknown:
+        raise ValueError(f"Unknown name(s): {', '.join(unknown)}; choose from {', '.join(known)}")
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the conversion hot paths on synthetic Notion pages'
+    )
+    parser.add_argument(
+        '--sizes',
+        help=f"Comma-separated size classes: {', '.join(SIZE_CLASSES)} "
+             f"(default: {','.join(DEFAULT_SIZES)})"
+    )
+    parser.add_argument(
+        '--stages',
+        help=f"Comma-separated stages (default: all): {', '.join(STAGES)}"
+    )
+    parser.add_argument(
+        '--pages',
+        type=int,
+        default=3,
+        help='Synthetic pages per size class (default: 3)'
+    )
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=5,
+        help='Timed calls per page for text stages (default: 5)'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='Corpus seed; the same seed gives the same pages (default: 0)'
+    )
+    parser.add_argument(
+        '--output',
+        help='Write the JSON results to this file (- for stdout)'
+    )
+    parser.add_argument(
+        '--baseline',
+        metavar='FILE',
+        help='Compare median latencies with the JSON results of an earlier run'
+    )
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=10.0,
+        metavar='PCT',
+        help='With --baseline: slowdown in percent that counts as a regression (default: 10)'
+    )
+    parser.add_argument(
+        '--fail-on-regression',
+        action='store_true',
+        help='With --baseline: exit with status 1 if any stage regressed'
+    )
+    parser.add_argument(
+        '--generate',
+        metavar='SIZE',
+        help='Only print one synthetic page of this size class (with --seed) and exit'
+    )
+    args = parser.parse_args()
+
+    try:
+        if args.generate:
+            parse_names(args.generate, SIZE_CLASSES, ())
+            sys.stdout.write(generate_page(args.generate, args.seed))
+            return
+
+        sizes = parse_names(args.sizes, SIZE_CLASSES, DEFAULT_SIZES)
+        stages = parse_names(args.stages, STAGES, STAGES)
+        results = run_benchmarks(sizes, stages, args.pages, args.repeat, args.seed)
+
+        if args.output:
+            with open_output(args.output) as output:
+                json.dump(results, output, indent=2)
+                output.write('\n')
+
+        regressed = False
+        if args.baseline:
+            with open(args.baseline, encoding='utf-8') as f:
+                baseline = json.load(f)
+            rows = list(compare(results, baseline, args.threshold / 100))
+            if not rows:
+                print("⚠ Baseline has no comparable results", file=sys.stderr)
+            for row in rows:
+                mark = '✗' if row['regression'] else '✓'
+                print(f"{mark} {row['stage']} [{row['size']}] p50 {row['baseline_p50_ms']} -> "
+                      f"{row['p50_ms']} ms (x{row['ratio']})", file=sys.stderr)
+                regressed = regressed or row['regression']
+        exit(1 if regressed and args.fail_on_regression else 0)
+
+    except Exception as e:
+        print(f"✗ Error: {e}")
+        exit(1)
+
+
+if __name__ == '__main__':
+    main()
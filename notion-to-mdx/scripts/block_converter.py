@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Notion block converter for Notion to MDX
+Turns Notion API block trees into Markdown, yielding it line by line so
+large pages stream straight into mdx_builder
+"""
+
+import argparse
+import json
+import re
+import sys
+from collections import Counter
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from mdx_builder import validate_inputs, write_mdx
+from metrics import add_metrics_arguments, instrumented
+from text_io import open_output, read_text
+
+# Characters that would otherwise be read as Markdown or MDX syntax
+MARKDOWN_ESCAPE_PATTERN = re.compile(r'([\\`*_\[\]<>{}~|])')
+
+# Blocks that form a tight list when they follow each other
+LIST_TYPES = {'bulleted_list_item', 'numbered_list_item', 'to_do'}
+
+HEADING_LEVELS = {'heading_1': 1, 'heading_2': 2, 'heading_3': 3}
+
+# Notion code-block languages whose Markdown fence name differs
+CODE_LANGUAGES = {
+    'plain text': '', 'c++': 'cpp', 'c#': 'csharp', 'f#': 'fsharp',
+    'objective-c': 'objectivec', 'vb.net': 'vbnet', 'java/c/c++/c#': 'java',
+}
+
+# Blocks whose children are shown inline, as if the wrapper were not there
+TRANSPARENT_TYPES = {'column_list', 'column', 'synced_block', 'template'}
+
+# Blocks rendered as a plain link to their URL
+LINK_TYPES = {'bookmark', 'embed', 'link_preview', 'video', 'audio', 'file', 'pdf'}
+
+# Blocks with their own Markdown form, besides headings, lists and links
+BLOCK_TYPES = {
+    'paragraph', 'quote', 'callout', 'toggle', 'code', 'divider', 'equation',
+    'image', 'table', 'child_page', 'child_database',
+}
+
+CONVERTED_TYPES = BLOCK_TYPES | set(HEADING_LEVELS) | LIST_TYPES | LINK_TYPES
+
+# Marks the first child of a list item, so a nested list stays tight
+_ITEM_START = 'item-start'
+
+ChildLoader = Callable[[dict], Iterable[dict]]
+
+
+class _Frame:
+    """One level of the explicit stack: the blocks left at that level and how to indent them"""
+
+    __slots__ = ('blocks', 'prefix', 'previous', 'number')
+
+    def __init__(self, blocks: Iterable[dict], prefix: str, previous: Optional[str] = None):
+        self.blocks = iter(blocks)
+        self.prefix = prefix
+        self.previous = previous
+        self.number = 0
+
+
+def escape_markdown(text: str) -> str:
+    """Backslash-escape characters that Markdown or MDX would interpret"""
+    return MARKDOWN_ESCAPE_PATTERN.sub(r'\\\1', text)
+
+
+def _inline_code(text: str) -> str:
+    """Wrap text in a backtick run longer than any inside it"""
+    ticks = '`' * (max((len(run) for run in re.findall(r'`+', text)), default=0) + 1)
+    if text.startswith('`') or text.endswith('`'):
+        text = f" {text} "
+    return f"{ticks}{text}{ticks}"
+
+
+def render_rich_text(rich_text: Iterable[dict]) -> str:
+    """
+    Render Notion rich text with its annotations as inline Markdown
+
+    Bold, italic, strikethrough, code and links are kept; underline and
+    colors have no Markdown form and are dropped. Whitespace is moved
+    outside the markers so that '** bold**' never breaks emphasis.
+
+    Args:
+        rich_text: Rich text objects from the Notion API
+
+    Returns:
+        Markdown text (may contain newlines from soft line breaks)
+    """
+    parts = []
+    for item in rich_text:
+        text = item.get('plain_text')
+        if text is None:
+            text = (item.get('text') or {}).get('content', '')
+        if not text:
+            continue
+
+        annotations = item.get('annotations') or {}
+        if item.get('type') == 'equation':
+            expression = (item.get('equation') or {}).get('expression', text)
+            parts.append(f"${expression}$")
+            continue
+
+        core = text.strip()
+        if not core:
+            parts.append(text)
+            continue
+        lead = text[:len(text) - len(text.lstrip())]
+        trail = text[len(text.rstrip()):]
+
+        if annotations.get('code'):
+            core = _inline_code(core)
+        else:
+            core = escape_markdown(core)
+            if annotations.get('bold'):
+                core = f"**{core}**"
+            if annotations.get('italic'):
+                core = f"*{core}*"
+            if annotations.get('strikethrough'):
+                core = f"~~{core}~~"
+
+        href = item.get('href') or ((item.get('text') or {}).get('link') or {}).get('url')
+        if href:
+            core = f"[{core}]({href})"
+        parts.append(f"{lead}{core}{trail}")
+    return ''.join(parts)
+
+
+def _block_text(data: dict) -> str:
+    return render_rich_text(data.get('rich_text') or data.get('text') or ())
+
+
+def _plain_text(rich_text: Iterable[dict]) -> str:
+    return ''.join(item.get('plain_text', '') for item in rich_text)
+
+
+def _file_url(data: dict) -> str:
+    """URL of a Notion-hosted or external file object"""
+    for source in ('file', 'external'):
+        if isinstance(data.get(source), dict) and data[source].get('url'):
+            return data[source]['url']
+    return data.get('url', '')
+
+
+def _prefixed(text: str, first: str, rest: str) -> Iterator[str]:
+    """
+    Yield the lines of a text block with a first-line and continuation prefix
+
+    Soft line breaks inside a paragraph become hard breaks (two spaces).
+    """
+    lines = text.split('\n')
+    for i, line in enumerate(lines):
+        ending = '  \n' if i < len(lines) - 1 and line else '\n'
+        yield f"{first if i == 0 else rest}{line}{ending}"
+
+
+def _children(block: dict, load_children: Optional[ChildLoader]) -> Optional[Iterable[dict]]:
+    """Children given inline (under the block or its type data) or fetched on demand"""
+    children = block.get('children')
+    if children is None:
+        children = (block.get(block.get('type')) or {}).get('children')
+    if children is None and block.get('has_children') and load_children is not None:
+        children = load_children(block)
+    return children
+
+
+def _table_lines(block: dict, rows: Iterable[dict], prefix: str) -> Iterator[str]:
+    """Render a table block's rows as a Markdown table"""
+    width = (block.get('table') or {}).get('table_width', 0)
+    for i, row in enumerate(rows):
+        cells = [render_rich_text(cell).replace('\n', ' ')
+                 for cell in (row.get('table_row') or {}).get('cells', [])]
+        cells += [''] * (width - len(cells))
+        yield f"{prefix}| {' | '.join(cells)} |\n"
+        if i == 0:
+            # Markdown tables always have a header; Notion's first row takes that role
+            yield f"{prefix}|{'|'.join('---' for _ in cells)}|\n"
+
+
+def iter_markdown(blocks: Iterable[dict], load_children: Optional[ChildLoader] = None,
+                  skipped: Optional[Counter] = None) -> Iterator[str]:
+    """
+    Convert a Notion block tree to Markdown, one line at a time
+
+    Nesting is walked with an explicit stack rather than recursion, so
+    deeply nested toggles and lists cannot hit Python's recursion limit,
+    and only the blocks on the current path are held at once. Children
+    may be given inline (a 'children' list on the block or its type data)
+    or fetched lazily through load_children.
+
+    Args:
+        blocks: Top-level blocks of a page (any iterable, e.g. a generator
+            over API pages)
+        load_children: Called with a block that has_children but carries
+            none, returning its child blocks
+        skipped: Counter that receives the types of blocks that were left out
+
+    Yields:
+        Markdown lines, each ending in a newline
+    """
+    stack = [_Frame(blocks, '')]
+    while stack:
+        frame = stack[-1]
+        block = next(frame.blocks, None)
+        if block is None:
+            stack.pop()
+            continue
+
+        kind = block.get('type')
+        data = block.get(kind) or {}
+        prefix = frame.prefix
+
+        if kind == 'paragraph' and not _block_text(data) and not block.get('has_children'):
+            continue  # Empty paragraphs are Notion spacing
+
+        if kind in TRANSPARENT_TYPES:
+            children = _children(block, load_children)
+            if children is not None:
+                child = _Frame(children, prefix, frame.previous)
+                stack.append(child)
+                # The wrapper is invisible, so its last block counts as this level's last
+                frame.previous = kind
+            continue
+
+        if kind not in CONVERTED_TYPES:
+            if skipped is not None:
+                skipped[kind] += 1
+            continue
+
+        # Blocks are separated by a blank line, except items of one list
+        previous = frame.previous
+        tight = kind in LIST_TYPES and (previous == kind or previous == _ITEM_START)
+        if previous is not None and not tight:
+            yield prefix.rstrip() + '\n'
+        frame.previous = kind
+        frame.number = frame.number + 1 if kind == 'numbered_list_item' else 0
+
+        child_prefix = prefix
+        child_previous = kind
+
+        if kind == 'paragraph':
+            yield from _prefixed(_block_text(data), prefix, prefix)
+
+        elif kind in HEADING_LEVELS:
+            level = HEADING_LEVELS[kind]
+            yield f"{prefix}{'#' * level} {_block_text(data).replace(chr(10), ' ')}\n"
+
+        elif kind in LIST_TYPES:
+            if kind == 'bulleted_list_item':
+                marker = '- '
+            elif kind == 'numbered_list_item':
+                marker = f"{frame.number}. "
+            else:
+                marker = '- [x] ' if data.get('checked') else '- [ ] '
+            # Continuation lines and children line up with the item text
+            child_prefix = prefix + ' ' * (2 if kind == 'to_do' else len(marker))
+            yield from _prefixed(_block_text(data), prefix + marker, child_prefix)
+            child_previous = _ITEM_START
+
+        elif kind == 'quote':
+            child_prefix = prefix + '> '
+            yield from _prefixed(_block_text(data), child_prefix, child_prefix)
+
+        elif kind == 'callout':
+            icon = data.get('icon') or {}
+            emoji = icon.get('emoji', '') if icon.get('type', 'emoji') == 'emoji' else ''
+            text = _block_text(data)
+            child_prefix = prefix + '> '
+            yield from _prefixed(f"{emoji} {text}" if emoji else text, child_prefix, child_prefix)
+
+        elif kind == 'toggle':
+            # Markdown has no collapsible block: the summary becomes a heading
+            # at the top level and a bold line elsewhere, followed by its content
+            title = _block_text(data).replace('\n', ' ')
+            yield f"{prefix}### {title}\n" if not prefix else f"{prefix}**{title}**\n"
+
+        elif kind == 'code':
+            code = _plain_text(data.get('rich_text') or ())
+            language = data.get('language', '')
+            language = CODE_LANGUAGES.get(language, language.replace(' ', ''))
+            runs = re.findall(r'`{3,}', code)
+            fence = '`' * max(3, max((len(run) + 1 for run in runs), default=3))
+            yield f"{prefix}{fence}{language}\n"
+            for line in code.split('\n'):
+                yield f"{prefix}{line}\n" if line else prefix.rstrip() + '\n'
+            yield f"{prefix}{fence}\n"
+
+        elif kind == 'divider':
+            yield f"{prefix}---\n"
+
+        elif kind == 'equation':
+            yield f"{prefix}$$\n"
+            for line in data.get('expression', '').split('\n'):
+                yield f"{prefix}{line}\n"
+            yield f"{prefix}$$\n"
+
+        elif kind == 'image':
+            caption = _plain_text(data.get('caption') or ())
+            yield f"{prefix}![{escape_markdown(caption)}]({_file_url(data)})\n"
+
+        elif kind in LINK_TYPES:
+            url = _file_url(data)
+            caption = _plain_text(data.get('caption') or ()) or data.get('name') or url
+            yield f"{prefix}[{escape_markdown(caption)}]({url})\n"
+
+        elif kind == 'table':
+            rows = _children(block, load_children) or ()
+            yield from _table_lines(block, rows, prefix)
+            continue
+
+        elif kind in ('child_page', 'child_database'):
+            # Links to other Notion pages cannot be kept; the title stays as text
+            yield f"{prefix}{escape_markdown(data.get('title', ''))}\n"
+            continue
+
+        children = _children(block, load_children)
+        if children is not None:
+            stack.append(_Frame(children, child_prefix, child_previous))
+
+
+def load_blocks(text: str) -> List[dict]:
+    """
+    Read blocks from JSON saved from the Notion API
+
+    Args:
+        text: JSON list of blocks, or an API response with a 'results' list
+
+    Returns:
+        List of top-level blocks
+    """
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get('results', [])
+    if not isinstance(data, list):
+        raise ValueError("Expected a list of blocks or an object with 'results'")
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Convert Notion API block JSON to Markdown or a complete MDX file'
+    )
+    parser.add_argument(
+        '--blocks-file',
+        required=True,
+        metavar='FILE',
+        help="JSON list of blocks (children inline), or an API response with 'results' (- for stdin)"
+    )
+    parser.add_argument(
+        '--output',
+        help='Write to this file instead of stdout'
+    )
+    parser.add_argument(
+        '--title',
+        help='Write a complete MDX file with this title (requires --date, --tags and --output)'
+    )
+    parser.add_argument(
+        '--date',
+        help='Publication date (YYYY-MM-DD) for MDX output'
+    )
+    parser.add_argument(
+        '--tags',
+        help='Comma-separated tags for MDX output'
+    )
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    if args.title and not (args.date and args.tags and args.output):
+        parser.error("--title requires --date, --tags and --output")
+
+    with instrumented(args):
+        try:
+            blocks = load_blocks(read_text(args.blocks_file))
+            skipped = Counter()
+            lines = iter_markdown(blocks, skipped=skipped)
+
+            if args.title:
+                tags = [tag.strip() for tag in args.tags.split(',')]
+                validate_inputs(args.title, args.date, tags)
+                write_mdx(args.output, args.title, args.date, tags, lines)
+                print(f"✓ MDX file created: {args.output}", file=sys.stderr)
+            else:
+                with open_output(args.output) as output:
+                    output.writelines(lines)
+
+            for kind, count in sorted(skipped.items()):
+                print(f"⚠ Skipped {count} unsupported {kind} block(s)", file=sys.stderr)
+
+        except Exception as e:
+            print(f"✗ Error: {e}")
+            exit(1)
+
+
+if __name__ == '__main__':
+    main()
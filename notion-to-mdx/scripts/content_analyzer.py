@@ -5,9 +5,28 @@ Extracts key themes and suggests tags based on content analysis
 """
 
 import argparse
+import glob
+import hashlib
+import json
+import marshal
+import math
+import multiprocessing
+import os
 import re
+import sys
+import time
 from collections import Counter
-from typing import List, Set
+from itertools import compress
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple, Union
+
+from metrics import add_metrics_arguments, increment, instrumented, stage
+from text_io import DEFAULT_CACHE_DIR, iter_text_lines, open_output
+
+try:
+    import yaml
+except ImportError:  # YAML theme files are optional
+    yaml = None
 
 # Common words to exclude from tag analysis
 STOP_WORDS = {
@@ -32,12 +51,15 @@ DOMAIN_KEYWORDS = {
         'software', 'code', 'api', 'algorithm', 'programming', 'developer',
         'engineering', 'tech', 'system', 'data', 'ai', 'machine', 'learning',
         'blockchain', 'crypto', 'bitcoin', 'ethereum', 'web', 'frontend',
-        'backend', 'database', 'cloud', 'deployment', 'architecture'
+        'backend', 'database', 'cloud', 'deployment', 'architecture',
+        'machine learning', 'deep learning', 'artificial intelligence',
+        'open source', 'web development'
     ],
     'entrepreneurship': [
         'startup', 'founder', 'business', 'company', 'venture', 'entrepreneur',
         'investor', 'funding', 'revenue', 'growth', 'market', 'customer',
-        'product', 'launch', 'pivot', 'unicorn', 'accelerator', 'incubator'
+        'product', 'launch', 'pivot', 'unicorn', 'accelerator', 'incubator',
+        'product market fit', 'venture capital', 'business model'
     ],
     'personal': [
         'journey', 'experience', 'life', 'story', 'learned', 'growth',
@@ -47,7 +69,8 @@ DOMAIN_KEYWORDS = {
     'finance': [
         'money', 'financial', 'investment', 'trading', 'market', 'portfolio',
         'asset', 'derivative', 'option', 'future', 'capital', 'valuation',
-        'risk', 'return', 'fund', 'banking', 'payment', 'currency'
+        'risk', 'return', 'fund', 'banking', 'payment', 'currency',
+        'stock market', 'interest rate', 'hedge fund', 'private equity'
     ],
     'education': [
         'learning', 'university', 'school', 'student', 'education', 'research',
@@ -61,66 +84,576 @@ DOMAIN_KEYWORDS = {
     ]
 }
 
+# Bump when the compiled theme cache layout changes
+THEME_CACHE_VERSION = 2
+
+ThemeIndex = Dict[str, Tuple[str, ...]]
+
+# Files picked up when a batch input is a directory
+BATCH_PATTERNS = ('*.md', '*.mdx')
+
+_default_theme_index: Optional[ThemeIndex] = None
+
+# Phrase matchers by id of their theme index, which is kept alive with it
+_phrase_matchers: Dict[int, Tuple[ThemeIndex, 'PhraseMatcher']] = {}
+
+
+# Precompiled patterns shared by every scan
+WORD_PATTERN = re.compile(r'\b[a-z]{3,}\b')
+TERM_PATTERN = re.compile(r'\b[a-z0-9]+\b')
+# TERM_PATTERN for ASCII text without '_', where every run is word-bounded
+ASCII_TERM_PATTERN = re.compile(r'[a-z0-9]+')
+PROPER_NOUN_PATTERN = re.compile(r'\b[A-Z][a-z]+(?:[A-Z][a-z]+)*\b')
+LINK_PATTERN = re.compile(r'\[([^\]]+)\]\([^\)]+\)')
+HEADING_MARK_PATTERN = re.compile(r'(#+)(?=\s|$)')
 
-def extract_keywords(content: str, title_weight: int = 3, heading_weight: int = 2) -> Counter:
+# Inline formatting characters dropped from body text
+FORMATTING_TABLE = str.maketrans('', '', '*_`~')
+
+# Lines buffered before a batch of regex calls; bounds memory per scan
+SCAN_BATCH_LINES = 512
+
+
+def iter_lines(content: str) -> Iterator[str]:
     """
-    Extract and count significant keywords from content
+    Yield the lines of content without copying the whole document
+
+    Only '\\n' separates lines, matching how the MULTILINE regexes used
+    to see the text.
 
     Args:
-        content: The markdown content to analyze
+        content: The markdown content
+
+    Yields:
+        Each line without its trailing newline
+    """
+    start = 0
+    while True:
+        end = content.find('\n', start)
+        if end == -1:
+            yield content[start:]
+            return
+        yield content[start:end]
+        start = end + 1
+
+
+def _count_words(counter: Counter, text: str, weight: int,
+                 matcher: Optional['PhraseMatcher'] = None,
+                 terms: Optional[Counter] = None) -> None:
+    """Add weighted counts for every non-stop word, and theme term if matching"""
+    text = text.lower()
+    for word in WORD_PATTERN.findall(text):
+        if word not in STOP_WORDS:
+            counter[word] += weight
+    if matcher is not None:
+        matcher.count_words(TERM_PATTERN.findall(text), terms, weight)
+
+
+def _link_state(line: str, bracket_open: bool, target_open: bool) -> Tuple[bool, bool]:
+    """
+    Track whether a link may continue past a body line
+
+    LINK_PATTERN spans lines, so a batch only ends where no link can be
+    cut in two: every '[' has a later ']' and every '](' a later ')'.
+
+    Args:
+        line: Body line appended to the batch
+        bracket_open: Whether a '[' before this line has no ']' after it
+        target_open: Whether a '](' before this line has no ')' after it
+
+    Returns:
+        The (bracket_open, target_open) state after the line
+    """
+    last_open = line.rfind('[')
+    last_close = line.rfind(']')
+    if last_open > last_close:
+        bracket_open = True
+    elif last_close != -1:
+        bracket_open = False
+    target = line.rfind('](')
+    if target != -1:
+        target_open = line.find(')', target) == -1
+    elif target_open and ')' in line:
+        target_open = False
+    return bracket_open, target_open
+
+
+def _count_body(counter: Counter, lines: List[str],
+                matcher: Optional['PhraseMatcher'] = None,
+                terms: Optional[Counter] = None) -> None:
+    """Count body words in a batch of lines, links and formatting removed"""
+    text = '\n'.join(lines)
+    if '[' in text:
+        text = LINK_PATTERN.sub(r'\1', text)
+    text = text.translate(FORMATTING_TABLE).lower()
+    if matcher is None:
+        counter.update(WORD_PATTERN.findall(text))
+        return
+    # One tokenization serves both: the keywords are the alphabetic
+    # tokens of 3+ letters, exactly what WORD_PATTERN finds
+    words = (ASCII_TERM_PATTERN if text.isascii() else TERM_PATTERN).findall(text)
+    word_counts = Counter(words)
+    for word, n in word_counts.items():
+        if len(word) >= 3 and word.isalpha():
+            counter[word] += n
+    matcher.count_words(words, terms, 1, word_counts)
+
+
+def _scan_lines(lines: Iterable[str], title_weight: int, heading_weight: int,
+                proper_nouns: Optional[Counter] = None,
+                matcher: Optional['PhraseMatcher'] = None,
+                terms: Optional[Counter] = None) -> Counter:
+    """
+    Tokenize markdown lines in a single sweep
+
+    Plain body lines are buffered and tokenized in batches. A heading
+    marker followed only by whitespace takes its text from the next
+    non-blank line, and link text may span lines, as the old multi-line
+    regexes did. A batch is extended past SCAN_BATCH_LINES until no link
+    is left open, so batching never changes the result.
+
+    Args:
+        lines: Lines of markdown content (trailing newlines are ignored)
         title_weight: Weight multiplier for title keywords
         heading_weight: Weight multiplier for heading keywords
+        proper_nouns: Optional Counter to fill with capitalized words
+        matcher: Optional theme term matcher, run over the same text
+        terms: Counter to fill with weighted term matches (with matcher)
 
     Returns:
         Counter of keywords with weighted frequencies
     """
+    title_counts = Counter()
+    heading_counts = Counter()
+    body_counts = Counter()
+    # Term matches are kept per section too and merged in the same order
+    title_terms = Counter()
+    heading_terms = Counter()
+    body_terms = Counter()
+    body_lines = []
+    noun_lines = []
+
+    # Title is the first H1 only; 0 = searching, 1 = pending text, 2 = done
+    title_state = 0
+    heading_pending = False
+    strip_pending = False
+    bracket_open = target_open = False
+
+    for line in lines:
+        if line.endswith('\n'):
+            line = line[:-1]
+
+        if proper_nouns is not None:
+            noun_lines.append(line)
+            if len(noun_lines) >= SCAN_BATCH_LINES:
+                proper_nouns.update(PROPER_NOUN_PATTERN.findall('\n'.join(noun_lines)))
+                noun_lines.clear()
+
+        # Plain body lines skip the heading state machines entirely
+        if not (title_state == 1 or heading_pending or strip_pending
+                or line.startswith('#')):
+            body_lines.append(line)
+            if '[' in line or ']' in line or ')' in line:
+                bracket_open, target_open = _link_state(line, bracket_open, target_open)
+            if len(body_lines) >= SCAN_BATCH_LINES and not (bracket_open or target_open):
+                _count_body(body_counts, body_lines, matcher, body_terms)
+                body_lines.clear()
+            continue
+
+        has_text = bool(line) and not line.isspace()
+        level = 0
+        rest = line
+        if line.startswith('#'):
+            mark = HEADING_MARK_PATTERN.match(line)
+            if mark:
+                level = len(mark.group(1))
+                rest = line[mark.end():]
+        rest_has_text = bool(rest) and not rest.isspace()
+
+        # Extract title (first H1)
+        if title_state == 1:
+            if has_text:
+                _count_words(title_counts, line, title_weight, matcher, title_terms)
+                title_state = 2
+        elif title_state == 0 and level == 1:
+            if rest_has_text:
+                _count_words(title_counts, rest, title_weight, matcher, title_terms)
+                title_state = 2
+            else:
+                title_state = 1
+
+        # Extract from headings (H2, H3, etc.)
+        if heading_pending:
+            if has_text:
+                _count_words(heading_counts, line, heading_weight, matcher, heading_terms)
+                heading_pending = False
+        elif level >= 2:
+            if rest_has_text:
+                _count_words(heading_counts, rest, heading_weight, matcher, heading_terms)
+            else:
+                heading_pending = True
+
+        # Extract from body text (skip headings, strip links and formatting)
+        if strip_pending:
+            strip_pending = not has_text
+            continue
+        if level:
+            strip_pending = not rest_has_text
+            continue
+        body_lines.append(line)
+        if '[' in line or ']' in line or ')' in line:
+            bracket_open, target_open = _link_state(line, bracket_open, target_open)
+
+    if body_lines:
+        _count_body(body_counts, body_lines, matcher, body_terms)
+    if noun_lines:
+        proper_nouns.update(PROPER_NOUN_PATTERN.findall('\n'.join(noun_lines)))
+
+    # Body words are counted unfiltered for speed; drop stop words once
+    for word in STOP_WORDS.intersection(body_counts):
+        del body_counts[word]
+
+    # Merge in title, heading, body order so ties rank as before
     keywords = Counter()
+    keywords.update(title_counts)
+    keywords.update(heading_counts)
+    keywords.update(body_counts)
+    if terms is not None:
+        terms.update(title_terms)
+        terms.update(heading_terms)
+        terms.update(body_terms)
+    return keywords
 
-    # Extract title (first H1 or first line)
-    title_match = re.search(r'^#\s+(.+)$', content, re.MULTILINE)
-    if title_match:
-        title = title_match.group(1).lower()
-        title_words = re.findall(r'\b[a-z]{3,}\b', title)
-        for word in title_words:
-            if word not in STOP_WORDS:
-                keywords[word] += title_weight
-
-    # Extract from headings (H2, H3, etc.)
-    headings = re.findall(r'^#{2,}\s+(.+)$', content, re.MULTILINE)
-    for heading in headings:
-        heading_words = re.findall(r'\b[a-z]{3,}\b', heading.lower())
-        for word in heading_words:
-            if word not in STOP_WORDS:
-                keywords[word] += heading_weight
-
-    # Extract from body text (remove markdown formatting)
-    body = re.sub(r'^#+\s+.+$', '', content, flags=re.MULTILINE)  # Remove headings
-    body = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', body)  # Remove links, keep text
-    body = re.sub(r'[*_`~]', '', body)  # Remove formatting
-    body_words = re.findall(r'\b[a-z]{3,}\b', body.lower())
-
-    for word in body_words:
-        if word not in STOP_WORDS:
-            keywords[word] += 1
 
+def scan_content(content: Union[str, Iterable[str]], title_weight: int = 3,
+                 heading_weight: int = 2, terms: Optional[Counter] = None,
+                 theme_index: Optional[ThemeIndex] = None) -> Tuple[Counter, Counter]:
+    """
+    Extract weighted keywords and proper nouns in one pass
+
+    Args:
+        content: The markdown content, or an iterable of its lines
+        title_weight: Weight multiplier for title keywords
+        heading_weight: Weight multiplier for heading keywords
+        terms: Optional Counter to fill with weighted theme term and
+            phrase matches, found in the same pass
+        theme_index: Keyword -> themes index whose terms are matched
+            (defaults to DOMAIN_KEYWORDS)
+
+    Returns:
+        Tuple of (weighted keyword Counter, proper noun Counter)
+    """
+    if isinstance(content, str):
+        content = iter_lines(content)
+    proper_nouns = Counter()
+    matcher = None
+    if terms is not None:
+        matcher = get_phrase_matcher(theme_index)
+    with stage('tokenize'):
+        keywords = _scan_lines(content, title_weight, heading_weight, proper_nouns,
+                               matcher, terms)
+    increment('keywords_counted', len(keywords))
+    return keywords, proper_nouns
+
+
+def extract_keywords(content: Union[str, Iterable[str]], title_weight: int = 3,
+                     heading_weight: int = 2) -> Counter:
+    """
+    Extract and count significant keywords from content
+
+    Args:
+        content: The markdown content to analyze, or an iterable of its lines
+        title_weight: Weight multiplier for title keywords
+        heading_weight: Weight multiplier for heading keywords
+
+    Returns:
+        Counter of keywords with weighted frequencies
+    """
+    if isinstance(content, str):
+        content = iter_lines(content)
+    with stage('tokenize'):
+        keywords = _scan_lines(content, title_weight, heading_weight)
+    increment('keywords_counted', len(keywords))
     return keywords
 
 
-def identify_themes(keywords: Counter) -> List[str]:
+def build_theme_index(domains: Dict[str, List[str]]) -> ThemeIndex:
+    """
+    Build an inverted index from keyword to the themes that list it
+
+    Args:
+        domains: Mapping of theme name to its keywords
+
+    Returns:
+        Dict of keyword or phrase (words joined by single spaces) -> tuple
+        of theme names, in vocabulary order
+    """
+    index = {}
+    for theme, theme_keywords in domains.items():
+        for word in theme_keywords:
+            # Phrases are keyed by their words, so 'Product-Market Fit' and
+            # 'product market fit' are the same term
+            word = ' '.join(TERM_PATTERN.findall(word.lower()))
+            if not word:
+                continue
+            themes = index.get(word, ())
+            if theme not in themes:
+                index[word] = themes + (theme,)
+    return index
+
+
+def get_theme_index() -> ThemeIndex:
+    """
+    Return the inverted index for DOMAIN_KEYWORDS, building it on first use
+
+    Returns:
+        Dict of keyword -> tuple of theme names
+    """
+    global _default_theme_index
+    if _default_theme_index is None:
+        _default_theme_index = build_theme_index(DOMAIN_KEYWORDS)
+    return _default_theme_index
+
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over the words of theme phrases
+
+    Terms may be single words of any length ('ai') or phrases ('machine
+    learning'). Text is split into words by one regex call; single-word
+    terms are then counted with one hash lookup per distinct word, and the
+    words are fed through the automaton to find every phrase in a single
+    linear pass however many phrases there are. Overlapping matches all
+    count: 'machine learning' also counts 'machine' and 'learning'.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self.single_terms = set()
+        # State 0 is the root; goto[state] maps the next word to a state
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[Tuple[str, ...]] = [()]
+
+        for term in terms:
+            if ' ' not in term:
+                self.single_terms.add(term)
+                continue
+            state = 0
+            for word in term.split(' '):
+                next_state = self.goto[state].get(word)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][word] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(())
+                state = next_state
+            if term not in self.output[state]:
+                self.output[state] += (term,)
+
+        # Breadth-first, so each failure target is complete before use
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for word, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and word not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(word, 0)
+                self.fail[next_state] = target
+                self.output[next_state] += self.output[target]
+
+        # Every word that appears in some phrase
+        self.vocabulary = frozenset(word for edges in self.goto for word in edges)
+
+    def count(self, text: str, counter: Counter, weight: int = 1) -> None:
+        """
+        Add weighted counts for every term occurrence in text
+
+        Args:
+            text: Lowercased text
+            counter: Counter to add term counts to
+            weight: Amount added per occurrence
+        """
+        self.count_words(TERM_PATTERN.findall(text), counter, weight)
+
+    def count_words(self, words: List[str], counter: Counter, weight: int = 1,
+                    word_counts: Optional[Counter] = None) -> None:
+        """
+        Add weighted counts for every term occurrence in a word sequence
+
+        A word outside every phrase sends the automaton back to the root,
+        so only the positions of phrase words are visited, picked out by
+        C-level itertools; a gap between positions resets the state.
+
+        Args:
+            words: Lowercased words, as split by TERM_PATTERN
+            counter: Counter to add term counts to
+            weight: Amount added per occurrence
+            word_counts: Counter of words, if the caller already has one
+        """
+        if word_counts is None:
+            word_counts = Counter(words)
+        # In order of first use, so ties between themes rank as keywords do
+        single_terms = self.single_terms
+        for word, n in word_counts.items():
+            if word in single_terms:
+                counter[word] += n * weight
+        if self.vocabulary.isdisjoint(word_counts):
+            return
+
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        state = 0
+        previous = -2
+        for position in compress(range(len(words)), map(self.vocabulary.__contains__, words)):
+            if position != previous + 1:
+                state = 0
+            previous = position
+            word = words[position]
+            next_state = goto[state].get(word)
+            while next_state is None and state:
+                state = fail[state]
+                next_state = goto[state].get(word)
+            state = next_state or 0
+            for term in output[state]:
+                counter[term] += weight
+
+
+def get_phrase_matcher(theme_index: Optional[ThemeIndex] = None) -> PhraseMatcher:
+    """
+    Return the compiled matcher for a theme index, building it on first use
+
+    Single-word stop words are left out, as they are from keywords.
+
+    Args:
+        theme_index: Keyword -> themes index (defaults to DOMAIN_KEYWORDS)
+
+    Returns:
+        PhraseMatcher over the index's terms
+    """
+    if theme_index is None:
+        theme_index = get_theme_index()
+    cached = _phrase_matchers.get(id(theme_index))
+    if cached is None or cached[0] is not theme_index:
+        matcher = PhraseMatcher(term for term in theme_index if term not in STOP_WORDS)
+        cached = _phrase_matchers[id(theme_index)] = (theme_index, matcher)
+    return cached[1]
+
+
+def match_terms(content: Union[str, Iterable[str]],
+                theme_index: Optional[ThemeIndex] = None) -> Counter:
+    """
+    Count the theme terms and phrases in content
+
+    Args:
+        content: The markdown content, or an iterable of its lines
+        theme_index: Keyword -> themes index (defaults to DOMAIN_KEYWORDS)
+
+    Returns:
+        Counter of terms with weighted frequencies, as for keywords
+    """
+    terms = Counter()
+    scan_content(content, terms=terms, theme_index=theme_index)
+    return terms
+
+
+def _parse_theme_file(path: Path) -> Dict[str, List[str]]:
+    """
+    Parse a JSON or YAML theme vocabulary file
+
+    Args:
+        path: Path to a file mapping theme names to lists of keywords
+
+    Returns:
+        Mapping of theme name to keywords
+
+    Raises:
+        ValueError: If the file is not a mapping of theme to keyword list
+        ImportError: If a YAML file is given and PyYAML is not installed
+    """
+    text = path.read_text(encoding='utf-8')
+    if path.suffix.lower() in ('.yaml', '.yml'):
+        if yaml is None:
+            raise ImportError("PyYAML is required to load YAML theme files")
+        domains = yaml.safe_load(text)
+    else:
+        domains = json.loads(text)
+
+    if not isinstance(domains, dict):
+        raise ValueError(f"Theme file must map theme names to keyword lists: {path}")
+    for theme, theme_keywords in domains.items():
+        if not isinstance(theme_keywords, list):
+            raise ValueError(f"Keywords for theme '{theme}' must be a list: {path}")
+    return {str(theme): [str(word) for word in words] for theme, words in domains.items()}
+
+
+def load_theme_index(path: Union[str, Path],
+                     cache_dir: Optional[Path] = DEFAULT_CACHE_DIR) -> ThemeIndex:
+    """
+    Load a theme vocabulary file as an inverted index
+
+    The compiled index is cached on disk and reused until the source
+    file's size or modification time changes.
+
+    Args:
+        path: JSON or YAML file mapping theme names to lists of keywords
+        cache_dir: Directory for the compiled cache (None disables caching)
+
+    Returns:
+        Dict of keyword -> tuple of theme names
+    """
+    path = Path(path).resolve()
+    stat = path.stat()
+    stamp = (THEME_CACHE_VERSION, str(path), stat.st_mtime_ns, stat.st_size)
+
+    cache_path = None
+    if cache_dir is not None:
+        digest = hashlib.sha1(str(path).encode('utf-8')).hexdigest()[:16]
+        cache_path = Path(cache_dir) / f"themes-{digest}.marshal"
+        try:
+            cached_stamp, index = marshal.loads(cache_path.read_bytes())
+            if cached_stamp == stamp:
+                return index
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+
+    index = build_theme_index(_parse_theme_file(path))
+
+    if cache_path is not None:
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_bytes(marshal.dumps((stamp, index)))
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass  # The cache is only an optimization
+
+    return index
+
+
+def identify_themes(keywords: Counter, theme_index: Optional[ThemeIndex] = None) -> List[str]:
     """
     Identify themes based on keyword clusters
 
     Args:
-        keywords: Counter of extracted keywords
+        keywords: Counter of theme term matches (see match_terms), or of
+            extracted keywords, which only covers single words of 3+ letters
+        theme_index: Keyword -> themes index (defaults to DOMAIN_KEYWORDS)
 
     Returns:
         List of identified theme names
     """
+    if theme_index is None:
+        theme_index = get_theme_index()
+
     theme_scores = Counter()
 
     for word, count in keywords.items():
-        for theme, theme_keywords in DOMAIN_KEYWORDS.items():
-            if word in theme_keywords:
+        themes = theme_index.get(word)
+        if themes:
+            for theme in themes:
                 theme_scores[theme] += count
 
     # Return themes with score > 0, sorted by score
@@ -128,22 +661,56 @@ def identify_themes(keywords: Counter) -> List[str]:
     return identified[:3]  # Limit to top 3 themes
 
 
-def suggest_tags(content: str, max_tags: int = 5) -> List[str]:
+def rank_keywords(keywords: Counter, document_frequency: Dict[str, int],
+                  document_count: int) -> List[Tuple[str, int]]:
     """
-    Main function: analyze content and suggest tags
+    Rank keywords by TF-IDF against a corpus
+
+    Uses the smoothed idf log((1 + N) / (1 + df)) + 1, so words unseen in
+    the corpus rank highest and words found in every post still count.
 
     Args:
-        content: The markdown content to analyze
+        keywords: Counter of weighted keyword frequencies for one post
+        document_frequency: Number of corpus posts containing each word
+        document_count: Number of posts in the corpus
+
+    Returns:
+        List of (word, count) pairs ordered by descending TF-IDF score
+    """
+    def score(item: Tuple[str, int]) -> float:
+        word, count = item
+        df = document_frequency.get(word, 0)
+        return count * (math.log((1 + document_count) / (1 + df)) + 1)
+
+    return sorted(keywords.items(), key=score, reverse=True)
+
+
+def analyze_content(content: Union[str, Iterable[str]], max_tags: int = 5,
+                    theme_index: Optional[ThemeIndex] = None,
+                    corpus_index: Optional[dict] = None) -> Tuple[List[str], List[str]]:
+    """
+    Analyze content and return both suggested tags and identified themes
+
+    Args:
+        content: The markdown content to analyze, or an iterable of its lines
         max_tags: Maximum number of tags to suggest
+        theme_index: Keyword -> themes index (defaults to DOMAIN_KEYWORDS)
+        corpus_index: Optional corpus index from corpus_index.py; when given,
+            keywords are ranked by TF-IDF instead of raw frequency
 
     Returns:
-        List of suggested tags
+        Tuple of (suggested tags, identified themes)
     """
-    # Extract keywords
-    keywords = extract_keywords(content)
+    if theme_index is None:
+        theme_index = get_theme_index()
+
+    # Extract keywords, proper nouns and theme terms in a single sweep
+    terms = Counter()
+    keywords, proper_noun_counts = scan_content(content, terms=terms, theme_index=theme_index)
 
     # Identify themes
-    themes = identify_themes(keywords)
+    with stage('themes'):
+        themes = identify_themes(terms, theme_index)
 
     # Combine themes and high-frequency keywords
     suggested = []
@@ -152,55 +719,311 @@ def suggest_tags(content: str, max_tags: int = 5) -> List[str]:
     for theme in themes[:2]:  # Top 2 themes
         suggested.append(theme)
 
-    # Add high-frequency specific keywords (not in themes)
-    theme_words = set()
-    for theme_keywords in DOMAIN_KEYWORDS.values():
-        theme_words.update(theme_keywords)
+    # Multi-word concepts appearing 2+ times, hyphenated (machine-learning)
+    for term, count in terms.most_common():
+        if count >= 2 and ' ' in term and len(suggested) < max_tags:
+            tag = term.replace(' ', '-')
+            if tag not in suggested:
+                suggested.append(tag)
 
-    # Find proper nouns and important keywords
     # Proper nouns: words that appear capitalized in original content
-    proper_nouns = re.findall(r'\b[A-Z][a-z]+(?:[A-Z][a-z]+)*\b', content)
-    proper_noun_counts = Counter(proper_nouns)
-
     # Add significant proper nouns (appearing 2+ times)
     for noun, count in proper_noun_counts.most_common():
         if count >= 2 and noun.lower() not in STOP_WORDS and len(suggested) < max_tags:
             suggested.append(noun)
 
-    # Add other high-frequency keywords
-    for word, count in keywords.most_common(20):
+    # Add other high-frequency keywords (not in themes)
+    if corpus_index is None:
+        candidates = keywords.most_common(20)
+    else:
+        candidates = rank_keywords(
+            keywords, corpus_index['df'], len(corpus_index['documents'])
+        )[:20]
+
+    for word, count in candidates:
         if len(suggested) >= max_tags:
             break
-        if word not in theme_words and word not in [s.lower() for s in suggested]:
+        if word not in theme_index and word not in [s.lower() for s in suggested]:
             # Prefer specific technical terms
             if count >= 3:
                 suggested.append(word)
 
-    return suggested[:max_tags]
+    return suggested[:max_tags], themes
+
+
+def suggest_tags(content: Union[str, Iterable[str]], max_tags: int = 5,
+                 theme_index: Optional[ThemeIndex] = None,
+                 corpus_index: Optional[dict] = None) -> List[str]:
+    """
+    Main function: analyze content and suggest tags
+
+    Args:
+        content: The markdown content to analyze, or an iterable of its lines
+        max_tags: Maximum number of tags to suggest
+        theme_index: Keyword -> themes index (defaults to DOMAIN_KEYWORDS)
+        corpus_index: Optional corpus index from corpus_index.py; when given,
+            keywords are ranked by TF-IDF instead of raw frequency
+
+    Returns:
+        List of suggested tags
+    """
+    return analyze_content(content, max_tags, theme_index, corpus_index)[0]
+
+
+def strip_frontmatter(lines: Iterator[str]) -> Iterator[str]:
+    """
+    Skip a leading YAML frontmatter block
+
+    Args:
+        lines: Lines of a post
+
+    Yields:
+        Lines after the closing '---' (all lines if there is no frontmatter)
+    """
+    first = next(lines, None)
+    if first is None:
+        return
+    if first.rstrip() != '---':
+        yield first
+    else:
+        for line in lines:
+            if line.rstrip() == '---':
+                break
+    yield from lines
+
+
+def expand_batch_inputs(inputs: List[str]) -> List[Path]:
+    """
+    Expand directories, glob patterns and file paths into a file list
+
+    Args:
+        inputs: Directories (searched recursively for BATCH_PATTERNS),
+            glob patterns, or plain file paths
+
+    Returns:
+        Files in the order given, without duplicates
+    """
+    files = []
+    seen = set()
+
+    def add(path: Path) -> None:
+        if path not in seen:
+            seen.add(path)
+            files.append(path)
+
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            for pattern in BATCH_PATTERNS:
+                for found in sorted(path.rglob(pattern)):
+                    if found.is_file():
+                        add(found)
+        elif glob.has_magic(item):
+            for found in sorted(glob.glob(item, recursive=True)):
+                if os.path.isfile(found):
+                    add(Path(found))
+        else:
+            # Missing files are kept so they are reported as errors
+            add(path)
+    return files
+
+
+# Per-process state for batch workers, set once by _init_batch_worker
+_batch_options = {}
+
+
+def _init_batch_worker(max_tags: int, themes_path: Optional[str],
+                       corpus_path: Optional[str], theme_cache_dir: Optional[Path]) -> None:
+    """Load theme and corpus indexes once per worker process"""
+    theme_index = None
+    if themes_path:
+        theme_index = load_theme_index(themes_path, theme_cache_dir)
+    corpus_index = None
+    if corpus_path:
+        from corpus_index import load_corpus_index
+        corpus_index = load_corpus_index(corpus_path)
+    _batch_options.update(
+        max_tags=max_tags, theme_index=theme_index, corpus_index=corpus_index
+    )
+
+
+def analyze_file(path: Union[str, Path]) -> dict:
+    """
+    Analyze one file inside a batch worker
+
+    Keyword counters stay in the worker; only the small result dict is
+    sent back to the parent process.
+
+    Args:
+        path: Markdown or MDX file (frontmatter is skipped)
+
+    Returns:
+        Dict with path, tags, themes and seconds, or path and error
+    """
+    start = time.perf_counter()
+    try:
+        with open(path, encoding='utf-8') as f:
+            tags, themes = analyze_content(
+                strip_frontmatter(iter(f)),
+                _batch_options.get('max_tags', 5),
+                _batch_options.get('theme_index'),
+                _batch_options.get('corpus_index'),
+            )
+    except Exception as e:
+        return {'path': str(path), 'error': str(e)}
+    return {
+        'path': str(path),
+        'tags': tags,
+        'themes': themes,
+        'seconds': round(time.perf_counter() - start, 6),
+    }
+
+
+def run_batch(files: List[Path], max_tags: int = 5, themes_path: Optional[str] = None,
+              corpus_path: Optional[str] = None, workers: Optional[int] = None,
+              output: TextIO = sys.stdout,
+              theme_cache_dir: Optional[Path] = DEFAULT_CACHE_DIR) -> int:
+    """
+    Analyze many files in a process pool and stream JSON lines
+
+    Results are written as each file finishes, so the output order is not
+    the input order.
+
+    Args:
+        files: Files to analyze
+        max_tags: Maximum number of tags per file
+        themes_path: Optional theme vocabulary file
+        corpus_path: Optional corpus index file
+        workers: Number of worker processes (default: CPU count; 1 runs inline)
+        output: Stream for JSON lines
+        theme_cache_dir: Compiled theme cache directory (None disables it)
+
+    Returns:
+        Number of files that failed
+    """
+    workers = workers or os.cpu_count() or 1
+    initargs = (max_tags, themes_path, corpus_path, theme_cache_dir)
+
+    if themes_path and theme_cache_dir is not None:
+        # Compile the theme cache once so workers only load it
+        load_theme_index(themes_path, theme_cache_dir)
+    failures = 0
+
+    if workers == 1 or len(files) <= 1:
+        _init_batch_worker(*initargs)
+        results = map(analyze_file, files)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers, _init_batch_worker, initargs)
+        # Small chunks keep output streaming while amortizing IPC
+        chunksize = max(1, min(32, len(files) // (workers * 4)))
+        results = pool.imap_unordered(analyze_file, files, chunksize)
+
+    try:
+        for result in results:
+            if 'error' in result:
+                failures += 1
+            output.write(json.dumps(result, ensure_ascii=False) + '\n')
+            output.flush()
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return failures
 
 
 def main():
     parser = argparse.ArgumentParser(
         description='Analyze content and suggest tags for blog posts'
     )
-    parser.add_argument(
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
         '--content',
-        required=True,
         help='Content to analyze (markdown text)'
     )
+    source.add_argument(
+        '--content-file',
+        metavar='FILE',
+        help='Read content to analyze from FILE (- for stdin)'
+    )
+    source.add_argument(
+        '--batch',
+        nargs='+',
+        metavar='PATH',
+        help='Directories, glob patterns or files to analyze; prints one JSON line per file'
+    )
+    source.add_argument(
+        '--files-from',
+        metavar='FILE',
+        help='Read batch file paths from FILE, one per line (- for stdin)'
+    )
     parser.add_argument(
         '--max-tags',
         type=int,
         default=5,
         help='Maximum number of tags to suggest (default: 5)'
     )
+    parser.add_argument(
+        '--themes',
+        help='JSON or YAML file mapping theme names to keywords (default: built-in themes)'
+    )
+    parser.add_argument(
+        '--no-theme-cache',
+        action='store_true',
+        help='Parse the --themes file without reading or writing the compiled cache'
+    )
+    parser.add_argument(
+        '--corpus-index',
+        help='Corpus index built by corpus_index.py; ranks keywords by TF-IDF'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='Worker processes for batch mode (default: CPU count)'
+    )
+    parser.add_argument(
+        '--output',
+        help='Write tags (or batch JSON lines) to this file instead of stdout'
+    )
+    add_metrics_arguments(parser)
     args = parser.parse_args()
 
-    tags = suggest_tags(args.content, args.max_tags)
+    with instrumented(args):
+        if args.batch or args.files_from:
+            if args.files_from:
+                inputs = [line.strip() for line in iter_text_lines(args.files_from) if line.strip()]
+            else:
+                inputs = args.batch
+            with open_output(args.output) as output:
+                failures = run_batch(
+                    expand_batch_inputs(inputs), args.max_tags, args.themes,
+                    args.corpus_index, args.workers, output,
+                    theme_cache_dir=None if args.no_theme_cache else DEFAULT_CACHE_DIR
+                )
+            exit(1 if failures else 0)
+
+        corpus_index = None
+        if args.corpus_index:
+            from corpus_index import load_corpus_index
+            corpus_index = load_corpus_index(args.corpus_index)
+
+        theme_index = None
+        if args.themes:
+            cache_dir = None if args.no_theme_cache else DEFAULT_CACHE_DIR
+            theme_index = load_theme_index(args.themes, cache_dir)
+
+        # Files are streamed line by line rather than loaded whole
+        content = args.content
+        if args.content_file:
+            content = iter_text_lines(args.content_file)
+
+        tags = suggest_tags(content, args.max_tags, theme_index, corpus_index)
 
-    # Output tags one per line for easy parsing
-    for tag in tags:
-        print(tag)
+        # Output tags one per line for easy parsing
+        with open_output(args.output) as output:
+            for tag in tags:
+                output.write(f"{tag}\n")
 
 
 if __name__ == '__main__':
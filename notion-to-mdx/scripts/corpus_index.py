@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Corpus document-frequency index for TF-IDF tag scoring
+Tracks which keywords appear in each post so tags can favour words
+that are distinctive for a post rather than common across the blog
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple, Union
+
+from content_analyzer import extract_keywords, iter_lines, strip_frontmatter
+
+# Bump when the on-disk layout changes; older files are rebuilt
+INDEX_VERSION = 1
+
+# Post files picked up when scanning a posts directory
+POST_PATTERNS = ('*.md', '*.mdx')
+
+
+def new_corpus_index() -> dict:
+    """
+    Create an empty corpus index
+
+    Returns:
+        Index dict with 'documents' (key -> entry) and 'df' (word -> count)
+    """
+    return {'version': INDEX_VERSION, 'documents': {}, 'df': {}}
+
+
+def load_corpus_index(path: Union[str, Path]) -> dict:
+    """
+    Load a corpus index from disk
+
+    Args:
+        path: Path to a gzipped JSON index written by save_corpus_index
+
+    Returns:
+        Index dict (empty if the file is missing or from an older version)
+    """
+    path = Path(path)
+    if not path.exists():
+        return new_corpus_index()
+
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('version') != INDEX_VERSION:
+        return new_corpus_index()
+
+    # Terms are stored as ids into a shared vocabulary to keep the file small
+    vocabulary = data['vocabulary']
+    documents = {}
+    for key, (sha1, mtime_ns, size, term_ids) in data['documents'].items():
+        documents[key] = {
+            'sha1': sha1,
+            'mtime_ns': mtime_ns,
+            'size': size,
+            'terms': [vocabulary[i] for i in term_ids],
+        }
+    df = dict(zip(vocabulary, data['df']))
+    return {'version': INDEX_VERSION, 'documents': documents, 'df': df}
+
+
+def save_corpus_index(index: dict, path: Union[str, Path]) -> None:
+    """
+    Write a corpus index atomically as gzipped JSON
+
+    Args:
+        index: Index dict
+        path: Destination path
+    """
+    path = Path(path)
+    vocabulary = [word for word, count in index['df'].items() if count > 0]
+    term_ids = {word: i for i, word in enumerate(vocabulary)}
+
+    data = {
+        'version': INDEX_VERSION,
+        'vocabulary': vocabulary,
+        'df': [index['df'][word] for word in vocabulary],
+        'documents': {
+            key: [doc['sha1'], doc['mtime_ns'], doc['size'],
+                  [term_ids[term] for term in doc['terms']]]
+            for key, doc in index['documents'].items()
+        },
+    }
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def document_terms(content: str) -> List[str]:
+    """
+    Get the distinct keywords a post contributes to the corpus
+
+    Args:
+        content: Post text, optionally with frontmatter
+
+    Returns:
+        Keywords found in the post
+    """
+    keywords = extract_keywords(strip_frontmatter(iter_lines(content)))
+    return [word for word, count in keywords.items() if count > 0]
+
+
+def remove_document(index: dict, key: str) -> bool:
+    """
+    Remove a post and its document-frequency counts from the index
+
+    Args:
+        index: Index dict
+        key: Post key (path relative to the posts directory)
+
+    Returns:
+        True if the post was indexed
+    """
+    doc = index['documents'].pop(key, None)
+    if doc is None:
+        return False
+
+    df = index['df']
+    for term in doc['terms']:
+        remaining = df.get(term, 0) - 1
+        if remaining > 0:
+            df[term] = remaining
+        else:
+            df.pop(term, None)
+    return True
+
+
+def update_document(index: dict, key: str, content: str,
+                    mtime_ns: int = 0, size: int = 0) -> bool:
+    """
+    Add or refresh one post; only that post's counts are touched
+
+    Args:
+        index: Index dict
+        key: Post key (path relative to the posts directory)
+        content: Post text
+        mtime_ns: Source modification time, used to skip unchanged files
+        size: Source size in bytes, used to skip unchanged files
+
+    Returns:
+        True if the index changed
+    """
+    sha1 = hashlib.sha1(content.encode('utf-8')).hexdigest()
+    doc = index['documents'].get(key)
+    if doc is not None and doc['sha1'] == sha1:
+        doc['mtime_ns'] = mtime_ns
+        doc['size'] = size
+        return False
+
+    remove_document(index, key)
+    terms = document_terms(content)
+    df = index['df']
+    for term in terms:
+        df[term] = df.get(term, 0) + 1
+    index['documents'][key] = {
+        'sha1': sha1,
+        'mtime_ns': mtime_ns,
+        'size': size,
+        'terms': terms,
+    }
+    return True
+
+
+def iter_posts(posts_dir: Path) -> Iterator[Tuple[str, Path]]:
+    """
+    Find post files under a posts directory
+
+    Args:
+        posts_dir: Root of the posts tree
+
+    Yields:
+        (key, path) pairs where key is the POSIX path relative to posts_dir
+    """
+    seen = set()
+    for pattern in POST_PATTERNS:
+        for path in posts_dir.rglob(pattern):
+            if path.is_file() and path not in seen:
+                seen.add(path)
+                yield path.relative_to(posts_dir).as_posix(), path
+
+
+def sync_corpus(index: dict, posts_dir: Union[str, Path]) -> Dict[str, int]:
+    """
+    Bring the index in line with a posts directory
+
+    Files whose size and modification time match the index are skipped
+    without being read; changed files are re-hashed and re-counted.
+
+    Args:
+        index: Index dict
+        posts_dir: Root of the posts tree
+
+    Returns:
+        Counts of 'added', 'updated', 'removed' and 'unchanged' posts, plus
+        'touched' for files whose timestamp changed but content did not
+    """
+    posts_dir = Path(posts_dir)
+    stats = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0, 'touched': 0}
+    documents = index['documents']
+    present = set()
+
+    for key, path in iter_posts(posts_dir):
+        present.add(key)
+        stat = path.stat()
+        doc = documents.get(key)
+        if doc is not None and doc['mtime_ns'] == stat.st_mtime_ns and doc['size'] == stat.st_size:
+            stats['unchanged'] += 1
+            continue
+
+        content = path.read_text(encoding='utf-8')
+        if update_document(index, key, content, stat.st_mtime_ns, stat.st_size):
+            stats['added' if doc is None else 'updated'] += 1
+        else:
+            stats['touched'] += 1
+
+    for key in [key for key in documents if key not in present]:
+        remove_document(index, key)
+        stats['removed'] += 1
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build or update the corpus index used for TF-IDF tag scoring'
+    )
+    parser.add_argument(
+        '--posts-dir',
+        required=True,
+        help='Directory containing blog posts (*.md, *.mdx)'
+    )
+    parser.add_argument(
+        '--index',
+        required=True,
+        help='Path to the corpus index file (e.g. corpus-index.json.gz)'
+    )
+    parser.add_argument(
+        '--post',
+        action='append',
+        help='Only refresh this post (relative to --posts-dir); may be repeated'
+    )
+    args = parser.parse_args()
+
+    try:
+        index = load_corpus_index(args.index)
+        posts_dir = Path(args.posts_dir)
+
+        if args.post:
+            stats = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0, 'touched': 0}
+            for key in args.post:
+                path = posts_dir / key
+                key = path.relative_to(posts_dir).as_posix()
+                if not path.exists():
+                    stats['removed'] += remove_document(index, key)
+                    continue
+                existed = key in index['documents']
+                stat = path.stat()
+                content = path.read_text(encoding='utf-8')
+                if update_document(index, key, content, stat.st_mtime_ns, stat.st_size):
+                    stats['updated' if existed else 'added'] += 1
+                else:
+                    stats['touched'] += 1
+        else:
+            stats = sync_corpus(index, posts_dir)
+
+        if stats['added'] or stats['updated'] or stats['removed'] or stats['touched']:
+            save_corpus_index(index, args.index)
+
+        print(f"✓ Corpus index: {args.index}")
+        print(f"  Posts: {len(index['documents'])}  Terms: {len(index['df'])}")
+        print(f"  Added: {stats['added']}  Updated: {stats['updated']}  "
+              f"Removed: {stats['removed']}  Unchanged: {stats['unchanged'] + stats['touched']}")
+
+    except Exception as e:
+        print(f"✗ Error: {e}")
+        exit(1)
+
+
+if __name__ == '__main__':
+    main()
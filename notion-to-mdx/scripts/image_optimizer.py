@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Image optimizer for Notion to MDX
+Creates resized and WebP/AVIF variants of downloaded images so posts can
+serve a srcset instead of the full-resolution original
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is only needed for the optimization stage
+    Image = None
+
+from image_store import file_sha256, link_into
+from text_io import DEFAULT_CACHE_DIR, open_output
+
+DEFAULT_VARIANT_CACHE = DEFAULT_CACHE_DIR / 'variants'
+
+# Bump when encoding changes so cached variants are rebuilt
+OPTIMIZER_VERSION = 1
+
+# Variant widths in pixels; posts are shown at up to 700px, so 1400 covers 2x screens
+DEFAULT_WIDTHS = (480, 960, 1400)
+
+# Modern encodes, best first; formats this Pillow build cannot write are skipped
+DEFAULT_FORMATS = ('avif', 'webp')
+
+DEFAULT_QUALITY = 75
+
+# Source formats that get resized fallbacks in their own format. Others
+# (e.g. animated GIFs) are left untouched.
+FALLBACK_FORMATS = {'JPEG': 'jpg', 'PNG': 'png'}
+
+# Files picked up when a folder is given on the command line
+SOURCE_SUFFIXES = ('.jpg', '.jpeg', '.png')
+
+# EXIF orientations that swap width and height when applied
+ORIENTATION_TAG = 0x0112
+ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+
+# Pillow format names for variant extensions
+SAVE_FORMATS = {'avif': 'AVIF', 'webp': 'WEBP', 'jpg': 'JPEG', 'png': 'PNG'}
+
+
+def supported_formats(formats: Iterable[str]) -> List[str]:
+    """
+    Keep only the formats this Pillow build can encode
+
+    Args:
+        formats: Extensions such as 'avif' and 'webp'
+
+    Returns:
+        Encodable extensions, in the given order
+    """
+    if Image is None:
+        return []
+    Image.init()
+    return [fmt for fmt in formats if SAVE_FORMATS.get(fmt) in Image.SAVE]
+
+
+def variant_widths(width: int, widths: Sequence[int]) -> List[int]:
+    """
+    Widths to produce for a source image, never upscaling
+
+    Args:
+        width: Source width
+        widths: Requested widths
+
+    Returns:
+        Sorted widths below the source width, plus the source width itself
+        when it is no larger than the largest request
+    """
+    chosen = sorted({w for w in widths if w < width})
+    if not chosen or width <= max(widths):
+        chosen.append(width)
+    return chosen
+
+
+def variant_name(sha256: str, width: int, fmt: str, quality: int) -> str:
+    """Cache filename of one variant; encodes every parameter that affects the output"""
+    return f"{sha256}-{width}w-q{quality}-v{OPTIMIZER_VERSION}.{fmt}"
+
+
+def encode_variants(source: Path, sha256: str, widths: Sequence[int], formats: Sequence[str],
+                    quality: int, cache_dir: Path) -> dict:
+    """
+    Decode an image once and write any missing variants to the cache
+
+    Args:
+        source: Image file
+        sha256: Content hash of the image
+        widths: Requested widths
+        formats: Modern formats to encode
+        quality: Encoder quality (0-100)
+        cache_dir: Variant cache directory
+
+    Returns:
+        Dict with the source width, height and fallback format
+        (None when the image is not optimized)
+    """
+    bucket = cache_dir / sha256[:2]
+    bucket.mkdir(parents=True, exist_ok=True)
+
+    with Image.open(source) as image:
+        fallback = FALLBACK_FORMATS.get(image.format)
+        if fallback is None or getattr(image, 'is_animated', False):
+            return {'width': image.width, 'height': image.height, 'fallback': None}
+
+        width, height = image.size
+        if image.getexif().get(ORIENTATION_TAG) in ROTATED_ORIENTATIONS:
+            width, height = height, width
+
+        # Let the JPEG decoder scale down by a power of two when it can
+        image.draft('RGB', (max(widths), max(widths)))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+        for target in reversed(variant_widths(width, widths)):
+            resized = None
+            for fmt in (*formats, fallback):
+                dest = bucket / variant_name(sha256, target, fmt, quality)
+                if dest.exists():
+                    continue
+                if resized is None:
+                    size = (target, max(1, round(height * target / width)))
+                    resized = image if size == image.size else image.resize(size, Image.LANCZOS)
+                frame = resized
+                if fmt == 'jpg' and frame.mode != 'RGB' and frame.mode != 'L':
+                    frame = frame.convert('RGB')
+                tmp_path = dest.with_name(f".{dest.name}.{os.getpid()}.tmp")
+                options = {'optimize': True} if fmt == 'png' else {'quality': quality}
+                frame.save(tmp_path, SAVE_FORMATS[fmt], **options)
+                os.replace(tmp_path, dest)
+
+    return {'width': width, 'height': height, 'fallback': fallback}
+
+
+def load_source_info(cache_dir: Path, sha256: str) -> Optional[dict]:
+    """Read the recorded dimensions of an already optimized image"""
+    path = cache_dir / sha256[:2] / f"{sha256}.json"
+    if not path.exists():
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_source_info(cache_dir: Path, sha256: str, info: dict) -> None:
+    """Record the dimensions of an optimized image so cache hits skip decoding"""
+    path = cache_dir / sha256[:2] / f"{sha256}.json"
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(info), encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def planned_variants(info: dict, sha256: str,
+                     cache_dir: Path) -> List[Tuple[Path, int, str, str]]:
+    """
+    List the variants an optimized image has
+
+    Args:
+        info: Source info saved by optimize_image
+        sha256: Content hash of the image
+        cache_dir: Variant cache directory
+
+    Returns:
+        (cached file, width, format, name suffix) for each variant,
+        smallest first
+    """
+    if info['fallback'] is None:
+        return []
+    params = info['params']
+    return [
+        (cache_dir / sha256[:2] / variant_name(sha256, target, fmt, params['quality']),
+         target, fmt, f"-{target}w.{fmt}")
+        for target in variant_widths(info['width'], params['widths'])
+        for fmt in (*params['formats'], info['fallback'])
+    ]
+
+
+def optimize_image(path: Union[str, Path], widths: Sequence[int] = DEFAULT_WIDTHS,
+                   formats: Sequence[str] = DEFAULT_FORMATS, quality: int = DEFAULT_QUALITY,
+                   cache_dir: Path = DEFAULT_VARIANT_CACHE) -> dict:
+    """
+    Produce resized and re-encoded variants of one image next to it
+
+    Variants are cached by content hash and parameters, so an unchanged
+    image is neither decoded nor encoded again; its variants are only
+    linked into place.
+
+    Args:
+        path: Downloaded image (variants are written to the same folder)
+        widths: Requested widths in pixels
+        formats: Modern formats to encode
+        quality: Encoder quality (0-100)
+        cache_dir: Variant cache directory
+
+    Returns:
+        Dict with path, width, height, cached and variants (dicts with
+        path, width and format, smallest first), or path and error
+    """
+    if Image is None:
+        raise ImportError("Pillow is required to optimize images (pip install Pillow)")
+
+    path = Path(path)
+    cache_dir = Path(cache_dir)
+    formats = supported_formats(formats)
+    sha256 = file_sha256(path)
+
+    params = {'widths': sorted(widths), 'formats': list(formats), 'quality': quality}
+    info = load_source_info(cache_dir, sha256)
+    cached = (info is not None and info.get('params') == params
+              and all(source.exists() for source, _, _, _ in planned_variants(info, sha256, cache_dir)))
+    if not cached:
+        info = encode_variants(path, sha256, widths, formats, quality, cache_dir)
+        info['params'] = params
+        save_source_info(cache_dir, sha256, info)
+
+    variants = []
+    for source, target, fmt, dest_name in planned_variants(info, sha256, cache_dir):
+        dest = path.with_name(f"{path.stem}{dest_name}")
+        if not dest.exists() or not os.path.samefile(source, dest):
+            link_into(source, dest)
+        variants.append({'path': str(dest), 'width': target, 'format': fmt})
+
+    return {
+        'path': str(path),
+        'width': info['width'],
+        'height': info['height'],
+        'cached': cached,
+        'variants': variants,
+    }
+
+
+# Per-process state for pool workers, set once by _init_optimize_worker
+_optimize_options = {}
+
+
+def _init_optimize_worker(widths: Tuple[int, ...], formats: Tuple[str, ...],
+                          quality: int, cache_dir: Path) -> None:
+    """Store the optimization parameters once per worker process"""
+    _optimize_options.update(
+        widths=widths, formats=formats, quality=quality, cache_dir=cache_dir
+    )
+
+
+def _optimize_file(path: str) -> dict:
+    """Optimize one image inside a pool worker, reporting errors as data"""
+    start = time.perf_counter()
+    try:
+        result = optimize_image(path, **_optimize_options)
+    except Exception as e:
+        return {'path': path, 'error': str(e)}
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def optimize_images(paths: Iterable[Union[str, Path]], widths: Sequence[int] = DEFAULT_WIDTHS,
+                    formats: Sequence[str] = DEFAULT_FORMATS, quality: int = DEFAULT_QUALITY,
+                    cache_dir: Path = DEFAULT_VARIANT_CACHE,
+                    workers: Optional[int] = None) -> List[dict]:
+    """
+    Optimize many images in a process pool
+
+    Decoding and encoding are CPU-bound, so they run in processes rather
+    than the download threads.
+
+    Args:
+        paths: Downloaded images
+        widths: Requested widths in pixels
+        formats: Modern formats to encode
+        quality: Encoder quality (0-100)
+        cache_dir: Variant cache directory
+        workers: Number of worker processes (default: CPU count; 1 runs inline)
+
+    Returns:
+        One result dict per path (see optimize_image), in input order
+    """
+    paths = [str(path) for path in dict.fromkeys(paths)]
+    workers = workers or os.cpu_count() or 1
+    initargs = (tuple(widths), tuple(formats), quality, Path(cache_dir))
+
+    if Image is None:
+        raise ImportError("Pillow is required to optimize images (pip install Pillow)")
+
+    if workers == 1 or len(paths) <= 1:
+        _init_optimize_worker(*initargs)
+        results = list(map(_optimize_file, paths))
+    else:
+        with multiprocessing.Pool(min(workers, len(paths)), _init_optimize_worker, initargs) as pool:
+            results = pool.map(_optimize_file, paths, chunksize=1)
+
+    return results
+
+
+def relative_variants(result: dict, image_path: str) -> List[dict]:
+    """
+    Point a result's variants at the folder used in the MDX
+
+    Args:
+        result: Result from optimize_image
+        image_path: Relative path of the original (e.g. ./photos/image.jpg)
+
+    Returns:
+        Variants with paths relative to the post
+    """
+    folder = image_path.rsplit('/', 1)[0] if '/' in image_path else '.'
+    return [
+        {**variant, 'path': f"{folder}/{Path(variant['path']).name}"}
+        for variant in result.get('variants', [])
+    ]
+
+
+def is_variant(path: Path) -> bool:
+    """Whether a file is a variant written by optimize_image (name ends in -<width>w)"""
+    suffix = path.stem.rsplit('-', 1)[-1]
+    return suffix[:-1].isdigit() and suffix.endswith('w')
+
+
+def parse_list(value: str) -> List[str]:
+    """Split a comma-separated command-line value"""
+    return [item.strip().lower() for item in value.split(',') if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Create resized WebP/AVIF variants of downloaded images'
+    )
+    parser.add_argument(
+        'images',
+        nargs='+',
+        help='Image files, or folders of images (e.g. a post photos folder)'
+    )
+    parser.add_argument(
+        '--widths',
+        default=','.join(map(str, DEFAULT_WIDTHS)),
+        help=f"Comma-separated variant widths (default: {','.join(map(str, DEFAULT_WIDTHS))})"
+    )
+    parser.add_argument(
+        '--formats',
+        default=','.join(DEFAULT_FORMATS),
+        help=f"Comma-separated modern formats (default: {','.join(DEFAULT_FORMATS)})"
+    )
+    parser.add_argument(
+        '--quality',
+        type=int,
+        default=DEFAULT_QUALITY,
+        help=f'Encoder quality 0-100 (default: {DEFAULT_QUALITY})'
+    )
+    parser.add_argument(
+        '--cache',
+        default=str(DEFAULT_VARIANT_CACHE),
+        help=f'Variant cache directory (default: {DEFAULT_VARIANT_CACHE})'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='Number of worker processes (default: CPU count)'
+    )
+    parser.add_argument(
+        '--output',
+        help='Write JSON results to this file instead of stdout'
+    )
+    args = parser.parse_args()
+
+    try:
+        widths = [int(width) for width in parse_list(args.widths)]
+        paths = []
+        for name in args.images:
+            path = Path(name)
+            if path.is_dir():
+                paths.extend(p for p in sorted(path.iterdir())
+                             if p.suffix.lower() in SOURCE_SUFFIXES and not is_variant(p))
+            else:
+                paths.append(path)
+
+        results = optimize_images(
+            paths, widths, parse_list(args.formats), args.quality, Path(args.cache), args.workers
+        )
+        with open_output(args.output) as output:
+            json.dump(results, output, indent=2)
+            output.write('\n')
+
+        failed = sum(1 for result in results if 'error' in result)
+        print(f"Optimized {len(results) - failed}/{len(results)} images", file=sys.stderr)
+        exit(1 if failed else 0)
+
+    except Exception as e:
+        print(f"✗ Error: {e}")
+        exit(1)
+
+
+if __name__ == '__main__':
+    main()
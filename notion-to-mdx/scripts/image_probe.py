@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Image dimension probe for Notion to MDX
+Reads width and height from the first bytes of PNG, JPEG, GIF, WebP and
+AVIF/HEIF files without decoding them, so markup can reserve space
+"""
+
+import argparse
+import json
+import struct
+import sys
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+# Give up on files whose header does not fit in this many bytes
+MAX_PROBE_BYTES = 512 * 1024
+
+# First read when probing a file; grown only for large JPEG metadata
+INITIAL_PROBE_BYTES = 4096
+
+# JPEG start-of-frame markers (excluding DHT, JPG and DAC, which share the range)
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# EXIF orientations that swap width and height when applied
+ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+
+# ISO-BMFF brands of AVIF and HEIF images
+HEIF_BRANDS = {b'avif', b'avis', b'heic', b'heix', b'heim', b'heis', b'hevc', b'hevx', b'mif1', b'msf1'}
+
+Size = Tuple[int, int]
+
+
+def _png_size(data: bytes) -> Optional[Size]:
+    if len(data) < 24:
+        return None
+    return struct.unpack('>II', data[16:24])
+
+
+def _gif_size(data: bytes) -> Optional[Size]:
+    if len(data) < 10:
+        return None
+    return struct.unpack('<HH', data[6:10])
+
+
+def _webp_size(data: bytes) -> Optional[Size]:
+    if len(data) < 30:
+        return None
+    chunk = data[12:16]
+    if chunk == b'VP8 ':
+        width, height = struct.unpack('<HH', data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L':
+        bits = int.from_bytes(data[21:25], 'little')
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X':
+        return int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1
+    return None
+
+
+def _exif_orientation(segment: bytes) -> Optional[int]:
+    """Read the orientation tag from an APP1 Exif segment body"""
+    if segment[:6] != b'Exif\0\0' or len(segment) < 14:
+        return None
+    tiff = segment[6:]
+    endian = {b'II': '<', b'MM': '>'}.get(tiff[:2])
+    if endian is None:
+        return None
+    (offset,) = struct.unpack(endian + 'I', tiff[4:8])
+    if offset + 2 > len(tiff):
+        return None
+    (count,) = struct.unpack(endian + 'H', tiff[offset:offset + 2])
+    for i in range(count):
+        entry = offset + 2 + i * 12
+        if entry + 12 > len(tiff):
+            return None
+        tag, _, _, value = struct.unpack(endian + 'HHIH', tiff[entry:entry + 10])
+        if tag == 0x0112:
+            return value
+    return None
+
+
+def _jpeg_size(data: bytes) -> Optional[Size]:
+    orientation = None
+    pos = 2
+    end = len(data)
+    while pos + 4 <= end:
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # Fill byte
+            pos += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:  # Markers without a length
+            pos += 2
+            continue
+        (length,) = struct.unpack('>H', data[pos + 2:pos + 4])
+        if marker in JPEG_SOF_MARKERS:
+            if pos + 9 > end:
+                return None
+            height, width = struct.unpack('>HH', data[pos + 5:pos + 9])
+            if orientation in ROTATED_ORIENTATIONS:
+                return height, width
+            return width, height
+        if marker == 0xE1 and orientation is None:
+            if pos + 2 + length > end:
+                return None
+            orientation = _exif_orientation(data[pos + 4:pos + 2 + length])
+        pos += 2 + length
+    return None
+
+
+def _iter_boxes(data: bytes, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """Yield (type, body start, body end) for ISO-BMFF boxes in data[start:end]"""
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack('>I4s', data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                return
+            (size,) = struct.unpack('>Q', data[pos + 8:pos + 16])
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield kind, pos + header, min(pos + size, end)
+        pos += size
+
+
+def _heif_size(data: bytes) -> Optional[Size]:
+    meta = next(((s, e) for kind, s, e in _iter_boxes(data, 0, len(data)) if kind == b'meta'), None)
+    if meta is None:
+        return None
+
+    primary = None
+    properties = []  # (type, body start, body end), indexed from 1 by ipma
+    associations = {}
+    # meta is a full box: skip its version and flags
+    for kind, start, end in _iter_boxes(data, meta[0] + 4, meta[1]):
+        if kind == b'pitm':
+            version = data[start]
+            fmt = '>H' if version == 0 else '>I'
+            (primary,) = struct.unpack_from(fmt, data, start + 4)
+        elif kind == b'iprp':
+            for sub, sub_start, sub_end in _iter_boxes(data, start, end):
+                if sub == b'ipco':
+                    properties = list(_iter_boxes(data, sub_start, sub_end))
+                elif sub == b'ipma':
+                    associations = _parse_ipma(data, sub_start, sub_end)
+
+    indexes = associations.get(primary)
+    if indexes is None:
+        indexes = range(1, len(properties) + 1)
+
+    size = None
+    rotation = 0
+    for index in indexes:
+        if not 0 < index <= len(properties):
+            continue
+        kind, start, end = properties[index - 1]
+        if kind == b'ispe' and start + 12 <= end:
+            found = struct.unpack_from('>II', data, start + 4)
+            # Without a primary item, take the largest image (not a thumbnail)
+            if size is None or found[0] * found[1] > size[0] * size[1]:
+                size = found
+        elif kind == b'irot' and start < end:
+            rotation = data[start] & 0x03
+    if size is None:
+        return None
+    if rotation % 2:
+        return size[1], size[0]
+    return size
+
+
+def _parse_ipma(data: bytes, start: int, end: int) -> Dict[int, List[int]]:
+    """Map item ids to their 1-based property indexes from an ipma box"""
+    version = data[start]
+    flags = int.from_bytes(data[start + 1:start + 4], 'big')
+    pos = start + 4
+    (count,) = struct.unpack_from('>I', data, pos)
+    pos += 4
+    associations = {}
+    for _ in range(count):
+        if version < 1:
+            (item,) = struct.unpack_from('>H', data, pos)
+            pos += 2
+        else:
+            (item,) = struct.unpack_from('>I', data, pos)
+            pos += 4
+        entries = data[pos]
+        pos += 1
+        indexes = []
+        for _ in range(entries):
+            if flags & 1:
+                (value,) = struct.unpack_from('>H', data, pos)
+                indexes.append(value & 0x7FFF)
+                pos += 2
+            else:
+                indexes.append(data[pos] & 0x7F)
+                pos += 1
+        associations[item] = indexes
+        if pos > end:
+            break
+    return associations
+
+
+def probe_image_size(data: bytes) -> Optional[Size]:
+    """
+    Read display dimensions from the start of an image file
+
+    JPEG EXIF orientation and HEIF rotation are applied, so portrait
+    phone photos report their upright size.
+
+    Args:
+        data: Leading bytes of the file (a few KB is usually enough)
+
+    Returns:
+        (width, height), or None if the format is unknown or data is too
+        short to contain the header
+    """
+    try:
+        if data[:8] == b'\x89PNG\r\n\x1a\n':
+            return _png_size(data)
+        if data[:3] == b'\xff\xd8\xff':
+            return _jpeg_size(data)
+        if data[:6] in (b'GIF87a', b'GIF89a'):
+            return _gif_size(data)
+        if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+            return _webp_size(data)
+        if data[4:8] == b'ftyp' and data[8:12] in HEIF_BRANDS:
+            return _heif_size(data)
+    except (struct.error, IndexError):  # Header cut short
+        return None
+    return None
+
+
+class SizeProbe:
+    """
+    Finds image dimensions while a download streams
+
+    Chunks are buffered only until the header has been read, so the probe
+    costs no second read of the file.
+    """
+
+    def __init__(self, limit: int = MAX_PROBE_BYTES):
+        self.limit = limit
+        self.reset()
+
+    def reset(self) -> None:
+        """Start over, e.g. when a download is retried"""
+        self.size = None
+        self._buffer = bytearray()
+        self._done = False
+
+    def feed(self, chunk: bytes) -> None:
+        """Add the next chunk of the file"""
+        if self._done:
+            return
+        self._buffer += chunk
+        self.size = probe_image_size(bytes(self._buffer))
+        if self.size is not None or len(self._buffer) >= self.limit:
+            self._done = True
+            self._buffer = bytearray()
+
+
+def probe_stream(stream: BinaryIO, limit: int = MAX_PROBE_BYTES) -> Optional[Size]:
+    """
+    Read display dimensions from an open binary stream
+
+    Reads a small first block and grows it only while the header is
+    incomplete, so archive members are probed without being extracted.
+
+    Args:
+        stream: Stream positioned at the start of the image
+        limit: Maximum bytes to read
+
+    Returns:
+        (width, height), or None if they cannot be found
+    """
+    data = stream.read(INITIAL_PROBE_BYTES)
+    while True:
+        size = probe_image_size(data)
+        if size is not None or len(data) >= limit:
+            return size
+        more = stream.read(min(len(data) * 3, limit - len(data)))
+        if not more:
+            return None
+        data += more
+
+
+def probe_file(path: Union[str, Path], limit: int = MAX_PROBE_BYTES) -> Optional[Size]:
+    """
+    Read display dimensions of an image file from its header
+
+    Args:
+        path: Image file
+        limit: Maximum bytes to read
+
+    Returns:
+        (width, height), or None if they cannot be found
+    """
+    with open(path, 'rb') as f:
+        return probe_stream(f, limit)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Print image dimensions read from file headers'
+    )
+    parser.add_argument(
+        'images',
+        nargs='+',
+        help='Image files'
+    )
+    args = parser.parse_args()
+
+    failed = 0
+    for name in args.images:
+        try:
+            size = probe_file(name)
+        except OSError as e:
+            size = None
+            print(f"✗ Error: {name}: {e}", file=sys.stderr)
+        if size is None:
+            failed += 1
+            print(json.dumps({'path': name, 'error': 'unknown size'}))
+        else:
+            print(json.dumps({'path': name, 'width': size[0], 'height': size[1]}))
+    exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
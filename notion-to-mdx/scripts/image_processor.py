@@ -5,11 +5,77 @@ Downloads images and generates alt text using OCR/vision
 """
 
 import argparse
+import base64
+import hashlib
+import html
+import json
+import os
+import random
 import re
-import requests
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Callable, Iterable, List, Optional, TypeVar, Union
 from urllib.parse import urlparse
 
+import requests
+from requests.adapters import HTTPAdapter
+
+from image_probe import SizeProbe
+from metrics import add_metrics_arguments, increment, instrumented, stage
+from text_io import STDIO, fsync_directory, iter_text_lines, open_output, read_text
+
+T = TypeVar('T')
+
+# Status codes worth retrying; anything else is a permanent failure
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+# Errors that may succeed on another attempt
+RETRY_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+# Longest wait honoured from a Retry-After header, unless backoff is already longer
+MAX_RETRY_AFTER = 60.0
+
+# Display widths of the styled wrapper (75% of the column, at most 700px), for srcset
+IMAGE_SIZES = '(max-width: 933px) 75vw, 700px'
+
+# Bytes read from the socket and written per call; large chunks keep
+# per-chunk Python overhead low on multi-megabyte photos
+CHUNK_SIZE = 256 * 1024
+
+# Downloads larger than this are refused (override with max_bytes / --max-size)
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+
+# Response headers that may carry a SHA-256 of the body (RFC 3230/9530, S3)
+DIGEST_HEADERS = ('Repr-Digest', 'Digest')
+DIGEST_PATTERN = re.compile(r'sha-?256\s*=\s*:?([A-Za-z0-9+/=]+):?', re.IGNORECASE)
+S3_CHECKSUM_HEADER = 'x-amz-checksum-sha256'
+
+
+class DownloadTooLarge(requests.RequestException):
+    """The response is larger than the allowed maximum"""
+
+
+class ContentMismatch(requests.exceptions.ChunkedEncodingError):
+    """The body is shorter than Content-Length or fails its checksum; retried"""
+
+
+class ResumeRejected(ContentMismatch):
+    """A Range resume got 416 or the wrong range; retried from the first byte"""
+
+
+# Images referenced by markdown ![alt](url) or HTML <img src="url">
+IMAGE_URL_PATTERN = re.compile(
+    r'!\[[^\]\n]*\]\(\s*<?(https?://[^)\s>]+)>?(?:\s+"[^"]*")?\s*\)'
+    r'|<img\s[^>]*?src\s*=\s*["\'](https?://[^"\']+)["\']',
+    re.IGNORECASE
+)
+
 
 def sanitize_filename(text: str) -> str:
     """
@@ -34,7 +100,300 @@ def sanitize_filename(text: str) -> str:
     return text
 
 
-def download_image(image_url: str, output_dir: Path, filename: str = None) -> Path:
+def new_session(pool_size: int = 8) -> requests.Session:
+    """
+    Create a session whose keep-alive pool is shared by all download workers
+
+    Args:
+        pool_size: Connections kept per host and hosts kept in the pool
+
+    Returns:
+        Configured session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def retry_delay(attempt: int, backoff: float, response: Optional[requests.Response] = None) -> float:
+    """
+    Seconds to wait before the next attempt
+
+    Uses exponential backoff with jitter, or the server's Retry-After
+    header when it gives a number of seconds. Retry-After is capped at
+    MAX_RETRY_AFTER (or the backoff, if longer) so one response cannot
+    stall a worker indefinitely.
+
+    Args:
+        attempt: Zero-based number of the attempt that just failed
+        backoff: Base delay in seconds
+        response: Failed response, if any
+
+    Returns:
+        Delay in seconds
+    """
+    if response is not None:
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            return min(float(retry_after), max(backoff * (2 ** attempt), MAX_RETRY_AFTER))
+    return backoff * (2 ** attempt) * (0.5 + random.random() / 2)
+
+
+def fetch_with_retries(http, url: str, handle: Callable[[requests.Response], T],
+                       timeout: float = 30.0, retries: int = 3, backoff: float = 0.5,
+                       headers: Union[dict, Callable[[], Optional[dict]], None] = None) -> T:
+    """
+    GET a URL as a stream and pass the response to handle, with retries
+
+    Connection errors, timeouts, broken streams and retryable statuses
+    are retried with backoff; the whole request and handle call is
+    repeated, so handle must be safe to run again. Other error statuses
+    raise immediately. A 304 response, and a 416 answer to a Range
+    request, are passed to handle unchanged.
+
+    Args:
+        http: Session (or the requests module) used to send the request
+        url: URL to fetch
+        handle: Callback that consumes the streaming response
+        timeout: Connect and read timeout in seconds for each attempt
+        retries: Extra attempts after a retryable failure
+        backoff: Base delay for exponential backoff between attempts
+        headers: Optional request headers, or a callable returning them
+            for each attempt (used to resume with a Range request)
+
+    Returns:
+        Whatever handle returns
+
+    Raises:
+        requests.RequestException: If every attempt fails
+    """
+    with stage('download'):
+        return _fetch_with_retries(http, url, handle, timeout, retries, backoff, headers)
+
+
+def _fetch_with_retries(http, url: str, handle: Callable[[requests.Response], T],
+                        timeout: float, retries: int, backoff: float,
+                        headers: Union[dict, Callable[[], Optional[dict]], None]) -> T:
+    """Attempt loop of fetch_with_retries, timed as one download"""
+    for attempt in range(retries + 1):
+        if attempt:
+            increment('download_retries')
+        response = None
+        try:
+            request_headers = headers() if callable(headers) else headers
+            response = http.get(url, stream=True, timeout=timeout, headers=request_headers)
+            if response.status_code in RETRY_STATUSES and attempt < retries:
+                time.sleep(retry_delay(attempt, backoff, response))
+                continue
+            if not (response.status_code == 416 and request_headers
+                    and 'Range' in request_headers):
+                response.raise_for_status()
+            return handle(response)
+        except RETRY_ERRORS:
+            if attempt == retries:
+                raise
+            time.sleep(retry_delay(attempt, backoff))
+        finally:
+            if response is not None:
+                response.close()
+
+
+def expected_sha256(headers) -> Optional[str]:
+    """
+    Get the SHA-256 a server sent for the full body, if any
+
+    Args:
+        headers: Response headers of a full (200) response
+
+    Returns:
+        Hex digest, or None when no usable checksum header is present
+    """
+    for name in DIGEST_HEADERS:
+        match = DIGEST_PATTERN.search(headers.get(name, ''))
+        if match:
+            encoded = match.group(1)
+            break
+    else:
+        encoded = headers.get(S3_CHECKSUM_HEADER)
+        if not encoded:
+            return None
+    try:
+        digest = base64.b64decode(encoded, validate=True)
+    except ValueError:
+        return None
+    return digest.hex() if len(digest) == 32 else None
+
+
+class FileDownload:
+    """
+    Streams a response body into a temporary file that survives retries
+
+    Used as the handle of fetch_with_retries. When a stream breaks, the
+    next attempt asks only for the missing bytes with a Range request
+    (guarded by If-Range), and falls back to a full download if the server
+    does not honour it. A 416, or a 206 for a range other than the one
+    asked for, discards the partial file and restarts from the first byte
+    on the next attempt. The body is hashed as it arrives, checked against
+    Content-Length and any checksum header, and only moved into place
+    after an fsync, so readers never see a partial image.
+    """
+
+    def __init__(self, tmp_path: Path, max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+                 sha256: Optional[str] = None,
+                 on_chunk: Optional[Callable[[bytes], None]] = None,
+                 on_reset: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            tmp_path: Temporary file to stream into
+            max_bytes: Refuse bodies larger than this (None for no limit)
+            sha256: Expected hex digest of the body, if known
+            on_chunk: Called with every chunk, e.g. SizeProbe.feed
+            on_reset: Called when the body restarts from the first byte
+        """
+        self.tmp_path = tmp_path
+        self.max_bytes = max_bytes
+        self.sha256 = sha256
+        self.on_chunk = on_chunk
+        self.on_reset = on_reset
+        self.size = 0
+        self.digest = hashlib.sha256()
+        self.validator = None
+        self.response_headers = {}
+
+    def headers(self, base: Optional[dict] = None) -> Optional[dict]:
+        """
+        Request headers for the next attempt
+
+        Args:
+            base: Headers for a fresh request (e.g. conditional headers)
+
+        Returns:
+            base, or Range/If-Range headers when a partial body can be resumed
+        """
+        # Images are already compressed; identity keeps byte ranges and
+        # Content-Length meaningful
+        headers = {'Accept-Encoding': 'identity'}
+        if self.size and self.validator:
+            headers.update({'Range': f"bytes={self.size}-", 'If-Range': self.validator})
+        elif base:
+            headers.update(base)
+        return headers
+
+    def _reset(self) -> None:
+        self.size = 0
+        self.digest = hashlib.sha256()
+        if self.on_reset is not None:
+            self.on_reset()
+
+    def _restart(self) -> None:
+        """Drop the partial body so the next attempt fetches it whole"""
+        self._reset()
+        self.validator = None
+        self.discard()
+
+    def __call__(self, response: requests.Response) -> None:
+        resumed = False
+        if response.status_code == 416:
+            self._restart()
+            raise ResumeRejected("range not satisfiable; restarting download")
+        if response.status_code == 206 and self.size:
+            content_range = response.headers.get('Content-Range', '')
+            resumed = content_range.startswith(f"bytes {self.size}-")
+            if not resumed:
+                self._restart()
+                raise ResumeRejected(f"expected bytes {self.size}-, got {content_range!r}; "
+                                     "restarting download")
+        if not resumed:
+            self._reset()
+            self.response_headers = response.headers
+            etag = response.headers.get('ETag', '')
+            # Weak ETags may not be used with If-Range
+            self.validator = (etag if etag and not etag.startswith('W/')
+                              else response.headers.get('Last-Modified'))
+
+        # Lengths and checksums describe the bytes before any decoding
+        encoded = response.headers.get('Content-Encoding', 'identity') != 'identity'
+        length = response.headers.get('Content-Length')
+        expected = None
+        if length and length.isdigit() and not encoded:
+            expected = self.size + int(length)
+        if self.max_bytes is not None and expected is not None and expected > self.max_bytes:
+            raise DownloadTooLarge(f"{expected} bytes exceeds the {self.max_bytes} byte limit")
+
+        start_size = self.size
+        with open(self.tmp_path, 'ab' if resumed else 'wb') as f:
+            try:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    self.size += len(chunk)
+                    if self.max_bytes is not None and self.size > self.max_bytes:
+                        raise DownloadTooLarge(f"body exceeds the {self.max_bytes} byte limit")
+                    self.digest.update(chunk)
+                    if self.on_chunk is not None:
+                        self.on_chunk(chunk)
+                    f.write(chunk)
+            finally:
+                # Keep what arrived so a retry can resume from it
+                f.flush()
+                os.fsync(f.fileno())
+                increment('bytes_downloaded', self.size - start_size)
+
+        if expected is not None and self.size != expected:
+            raise ContentMismatch(f"received {self.size} of {expected} bytes")
+
+        wanted = self.sha256
+        if wanted is None and not encoded:
+            wanted = expected_sha256(self.response_headers)
+        if wanted and self.digest.hexdigest() != wanted.lower():
+            self._reset()
+            self.validator = None
+            raise ContentMismatch("checksum mismatch")
+
+    def commit(self, dest: Path) -> None:
+        """
+        Move the finished body into place atomically
+
+        Args:
+            dest: Final path (replaced if it exists)
+        """
+        os.replace(self.tmp_path, dest)
+        fsync_directory(dest.parent)
+        increment('images_downloaded')
+
+    def discard(self) -> None:
+        """Remove the temporary file, if any"""
+        try:
+            self.tmp_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def image_filename(image_url: str) -> str:
+    """
+    Derive a safe filename from an image URL
+
+    Args:
+        image_url: URL of the image
+
+    Returns:
+        Sanitized filename with an extension
+    """
+    parsed_url = urlparse(image_url)
+    original_name = Path(parsed_url.path).name
+    filename = sanitize_filename(original_name)
+
+    # Ensure filename has extension
+    if '.' not in filename:
+        filename += '.jpg'
+    return filename
+
+
+def download_image(image_url: str, output_dir: Path, filename: str = None,
+                   session: Optional[requests.Session] = None, timeout: float = 30.0,
+                   retries: int = 3, backoff: float = 0.5, verbose: bool = True,
+                   probe: Optional[SizeProbe] = None,
+                   max_bytes: Optional[int] = DEFAULT_MAX_BYTES) -> Path:
     """
     Download image from URL
 
@@ -42,18 +401,28 @@ def download_image(image_url: str, output_dir: Path, filename: str = None) -> Pa
         image_url: URL of the image
         output_dir: Directory to save image
         filename: Optional custom filename (auto-generated if not provided)
+        session: Optional session to reuse pooled connections
+        timeout: Connect and read timeout in seconds for each attempt
+        retries: Extra attempts after a retryable failure
+        backoff: Base delay for exponential backoff between attempts
+        verbose: Print a line when the download finishes
+        probe: Optional SizeProbe fed with the streamed bytes, so the
+            image dimensions are known without reading the file again
+        max_bytes: Refuse images larger than this (None for no limit)
 
     Returns:
         Path to downloaded image
+
+    Raises:
+        requests.RequestException: If every attempt fails, or the image
+            is too large (DownloadTooLarge)
     """
     # Create output directory
     output_dir.mkdir(parents=True, exist_ok=True)
 
     # Generate filename if not provided
     if not filename:
-        parsed_url = urlparse(image_url)
-        original_name = Path(parsed_url.path).name
-        filename = sanitize_filename(original_name)
+        filename = image_filename(image_url)
 
     # Ensure filename has extension
     if '.' not in filename:
@@ -61,18 +430,193 @@ def download_image(image_url: str, output_dir: Path, filename: str = None) -> Pa
 
     output_path = output_dir / filename
 
-    # Download image
-    response = requests.get(image_url, stream=True)
-    response.raise_for_status()
-
-    with open(output_path, 'wb') as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            f.write(chunk)
+    download = FileDownload(
+        output_path.with_name(f".{output_path.name}.part"), max_bytes,
+        on_chunk=probe.feed if probe is not None else None,
+        on_reset=probe.reset if probe is not None else None
+    )
 
-    print(f"✓ Downloaded: {output_path}")
+    # Download image, retrying (and resuming) transient failures
+    try:
+        fetch_with_retries(
+            session or requests, image_url, download, timeout, retries, backoff, download.headers
+        )
+        download.commit(output_path)
+    finally:
+        download.discard()
+
+    if verbose:
+        print(f"✓ Downloaded: {output_path}")
     return output_path
 
 
+def extract_image_urls(markdown: str) -> List[str]:
+    """
+    Find remote image URLs in markdown or MDX
+
+    Args:
+        markdown: Markdown text with ![alt](url) images or <img> tags
+
+    Returns:
+        Unique image URLs in order of appearance
+    """
+    urls = (match.group(1) or match.group(2) for match in IMAGE_URL_PATTERN.finditer(markdown))
+    return list(dict.fromkeys(urls))
+
+
+def unique_filenames(image_urls: List[str], reserved: Iterable[str] = ()) -> dict:
+    """
+    Pick a distinct filename for each URL of a batch
+
+    Notion serves many images under the same basename (image.png,
+    Untitled.png); later URLs with a name already taken get a short hash
+    of the URL added, so concurrent downloads never share a file.
+
+    Args:
+        image_urls: Unique URLs
+        reserved: Names already used in the destination (e.g. local
+            images of the same page), which no URL may take
+
+    Returns:
+        Dict of url -> filename
+    """
+    names = {}
+    taken = set(reserved)
+    for url in image_urls:
+        name = image_filename(url)
+        if name in taken:
+            stem, suffix = os.path.splitext(name)
+            name = f"{stem}-{hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]}{suffix}"
+        taken.add(name)
+        names[url] = name
+    return names
+
+
+def download_images(image_urls: Iterable[str], output_dir: Path, workers: int = 8,
+                    timeout: float = 30.0, retries: int = 3, backoff: float = 0.5,
+                    session: Optional[requests.Session] = None,
+                    store_dir: Optional[Path] = None, revalidate: bool = False,
+                    max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+                    manifest: Optional[dict] = None, save_manifest: bool = True,
+                    reserved_names: Iterable[str] = ()) -> List[dict]:
+    """
+    Download many images concurrently over a shared connection pool
+
+    Args:
+        image_urls: URLs to download (duplicates are fetched once)
+        output_dir: Directory to save images
+        workers: Maximum concurrent downloads
+        timeout: Per-request timeout in seconds
+        retries: Extra attempts per image after a retryable failure
+        backoff: Base delay for exponential backoff between attempts
+        session: Optional session to reuse (a pooled one is created otherwise)
+        store_dir: Optional content-addressed store (see image_store.py);
+            known images are then linked from the store instead of fetched
+        revalidate: With a store, send conditional requests for known images
+        max_bytes: Refuse images larger than this (None for no limit)
+        manifest: With a store, its manifest already loaded by the caller
+            (kept in memory across calls; it is still saved afterwards)
+        save_manifest: Save the store manifest when done; callers that
+            merge entries from several processes save it themselves
+        reserved_names: Files in output_dir that downloads must not
+            replace, such as local images of the same page (with a store,
+            place_object already keeps different images apart)
+
+    Returns:
+        One dict per URL, in input order, with url, path, bytes, seconds,
+        status ('downloaded', 'cached' or 'not-modified') and width/height
+        read from the image header (None if unknown), or url and error
+    """
+    image_urls = list(dict.fromkeys(image_urls))
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    if store_dir is None:
+        manifest = None
+        filenames = unique_filenames(image_urls, reserved_names)
+    else:
+        from image_store import (
+            load_image_manifest, save_image_manifest, store_image, stored_image_size
+        )
+        if manifest is None:
+            manifest = load_image_manifest(store_dir)
+
+    own_session = session is None
+    if own_session:
+        session = new_session(workers)
+
+    def fetch(url: str) -> dict:
+        start = time.perf_counter()
+        status = 'downloaded'
+        try:
+            if manifest is None:
+                probe = SizeProbe()
+                path = download_image(
+                    url, output_dir, filenames[url], session=session, timeout=timeout,
+                    retries=retries, backoff=backoff, verbose=False, probe=probe,
+                    max_bytes=max_bytes
+                )
+                size = probe.size
+            else:
+                path, status = store_image(
+                    url, output_dir, store_dir=store_dir, manifest=manifest,
+                    session=session, timeout=timeout, retries=retries,
+                    backoff=backoff, revalidate=revalidate, max_bytes=max_bytes
+                )
+                size = stored_image_size(manifest, url, store_dir)
+        except Exception as e:
+            return {'url': url, 'error': str(e), 'seconds': round(time.perf_counter() - start, 3)}
+        width, height = size or (None, None)
+        return {
+            'url': url,
+            'path': str(path),
+            'bytes': path.stat().st_size,
+            'seconds': round(time.perf_counter() - start, 3),
+            'status': status,
+            'width': width,
+            'height': height,
+        }
+
+    results = {}
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(fetch, url): url for url in image_urls}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+    finally:
+        if own_session:
+            session.close()
+        if manifest is not None and save_manifest:
+            save_image_manifest(manifest, store_dir)
+
+    return [results[url] for url in image_urls]
+
+
+def summarize_downloads(results: List[dict], elapsed: float) -> dict:
+    """
+    Build a summary report for a batch download
+
+    Args:
+        results: Results from download_images
+        elapsed: Wall-clock seconds for the batch
+
+    Returns:
+        Dict with counts (reused counts images served from the store),
+        total bytes, timing and the failed URLs
+    """
+    succeeded = [r for r in results if 'error' not in r]
+    failed = [r for r in results if 'error' in r]
+    total_bytes = sum(r['bytes'] for r in succeeded)
+    return {
+        'downloaded': len(succeeded),
+        'reused': sum(1 for r in succeeded if r.get('status') in ('cached', 'not-modified')),
+        'failed': len(failed),
+        'bytes': total_bytes,
+        'seconds': round(elapsed, 3),
+        'bytes_per_second': round(total_bytes / elapsed) if elapsed > 0 else 0,
+        'failures': [{'url': r['url'], 'error': r['error']} for r in failed],
+    }
+
+
 def generate_alt_text_from_context(image_context: str) -> str:
     """
     Generate alt text from surrounding context
@@ -99,20 +643,91 @@ def generate_alt_text_from_context(image_context: str) -> str:
     return alt_text
 
 
-def wrap_image_with_styling(image_path: str, alt_text: str) -> str:
+# Formats as written in file suffixes and variant dicts, to <source> MIME types
+IMAGE_MIME_TYPES = {
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+    'gif': 'image/gif',
+    'webp': 'image/webp',
+    'avif': 'image/avif',
+}
+
+
+def picture_markup(image_path: str, alt_text: str, variants: List[dict],
+                   width: Optional[int] = None, height: Optional[int] = None) -> str:
+    """
+    Build a responsive <picture> for an image and its optimized variants
+
+    Modern formats become <source> elements, best first; the resized
+    copies in the original format form the <img> srcset fallback. Known
+    dimensions are set on the <img> so the browser reserves its space.
+
+    Args:
+        image_path: Relative path to the original image
+        alt_text: Alt text for the image
+        variants: Dicts with relative path, width and format (see
+            image_optimizer.py); may be empty
+        width: Intrinsic width of the image, if known
+        height: Intrinsic height of the image, if known
+
+    Returns:
+        JSX <picture> element
+    """
+    by_format = {}
+    for variant in variants:
+        by_format.setdefault(variant['format'], []).append(variant)
+
+    fallback_format = image_path.rsplit('.', 1)[-1].lower()
+    if fallback_format == 'jpeg':
+        fallback_format = 'jpg'
+    fallback = by_format.pop(fallback_format, [])
+
+    def srcset(items: List[dict]) -> str:
+        return ', '.join(f"{item['path']} {item['width']}w" for item in items)
+
+    lines = ['<picture>']
+    for fmt, items in by_format.items():
+        mime = IMAGE_MIME_TYPES.get(fmt, f'image/{fmt}')
+        lines.append(f'  <source type="{mime}" srcSet="{srcset(items)}" sizes="{IMAGE_SIZES}" />')
+    src = fallback[-1]['path'] if fallback else image_path
+    img = f'  <img src="{src}" alt="{html.escape(alt_text)}"'
+    if fallback:
+        img += f' srcSet="{srcset(fallback)}" sizes="{IMAGE_SIZES}"'
+    style = "width: '100%', height: 'auto'"
+    if width and height:
+        img += f' width={{{width}}} height={{{height}}}'
+        style += f", aspectRatio: '{width} / {height}'"
+    img += f' loading="lazy" decoding="async" style={{{{ {style} }}}} />'
+    lines.append(img)
+    lines.append('</picture>')
+    return '\n'.join(lines)
+
+
+def wrap_image_with_styling(image_path: str, alt_text: str,
+                            variants: Optional[List[dict]] = None,
+                            width: Optional[int] = None, height: Optional[int] = None) -> str:
     """
     Wrap image markdown with centered div styling and caption
 
     Args:
         image_path: Relative path to image (e.g., ./photos/image.jpg)
         alt_text: Alt text for the image
+        variants: Optional optimized variants with relative paths
+        width: Optional intrinsic width (see image_probe.py)
+        height: Optional intrinsic height
 
     Returns:
-        Formatted MDX with div styling and caption
+        Formatted MDX with div styling and caption; with variants or
+        dimensions, a <picture> replaces the plain markdown image
     """
+    if variants or (width and height):
+        image = picture_markup(image_path, alt_text, variants or [], width, height)
+    else:
+        image = f"![{alt_text}]({image_path})"
     return f"""<div style={{{{ textAlign: 'center', margin: '2rem 0' }}}}>
   <div style={{{{ display: 'inline-block', width: '75%', maxWidth: '700px' }}}}>
-![{alt_text}]({image_path})
+{image}
     <div style={{{{ fontSize: '0.9rem', color: '#666', marginTop: '0.5rem', fontStyle: 'italic' }}}}>
       {alt_text}
     </div>
@@ -124,11 +739,21 @@ def main():
     parser = argparse.ArgumentParser(
         description='Process images for Notion to MDX conversion'
     )
-    parser.add_argument(
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
         '--url',
-        required=True,
         help='Image URL to download'
     )
+    source.add_argument(
+        '--urls-file',
+        metavar='FILE',
+        help='Batch mode: download every URL in FILE, one per line (- for stdin)'
+    )
+    source.add_argument(
+        '--from-markdown',
+        metavar='FILE',
+        help='Batch mode: download every image referenced in a markdown FILE (- for stdin)'
+    )
     parser.add_argument(
         '--output-dir',
         required=True,
@@ -146,34 +771,210 @@ def main():
         '--context',
         help='Surrounding text context to help generate alt text'
     )
+    parser.add_argument(
+        '--context-file',
+        metavar='FILE',
+        help='Read the surrounding text context from FILE (- for stdin)'
+    )
+    parser.add_argument(
+        '--output',
+        help='Write only the MDX snippet to this file (- for stdout)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=8,
+        help='Batch mode: maximum concurrent downloads (default: 8)'
+    )
+    parser.add_argument(
+        '--timeout',
+        type=float,
+        default=30.0,
+        help='Per-request timeout in seconds (default: 30)'
+    )
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=3,
+        help='Retries for transient failures, with exponential backoff (default: 3)'
+    )
+    parser.add_argument(
+        '--max-size',
+        type=float,
+        default=DEFAULT_MAX_BYTES / (1024 * 1024),
+        metavar='MB',
+        help=f'Refuse images larger than this many MB, 0 for no limit '
+             f'(default: {DEFAULT_MAX_BYTES // (1024 * 1024)})'
+    )
+    parser.add_argument(
+        '--store',
+        metavar='DIR',
+        help='Content-addressed image store (default: ~/.cache/notion-to-mdx/images)'
+    )
+    parser.add_argument(
+        '--no-store',
+        action='store_true',
+        help='Download straight to --output-dir without the image store'
+    )
+    parser.add_argument(
+        '--revalidate',
+        action='store_true',
+        help='Send conditional requests for images already in the store instead of skipping them'
+    )
+    parser.add_argument(
+        '--optimize',
+        action='store_true',
+        help='Create resized WebP/AVIF variants and emit a srcset <picture> (needs Pillow)'
+    )
+    parser.add_argument(
+        '--widths',
+        help='With --optimize: comma-separated variant widths (default: 480,960,1400)'
+    )
+    parser.add_argument(
+        '--formats',
+        help='With --optimize: comma-separated modern formats (default: avif,webp)'
+    )
+    parser.add_argument(
+        '--quality',
+        type=int,
+        help='With --optimize: encoder quality 0-100 (default: 75)'
+    )
+    parser.add_argument(
+        '--report',
+        help='Batch mode: write the JSON summary report to this file'
+    )
 
+    add_metrics_arguments(parser)
     args = parser.parse_args()
 
-    try:
-        # Download image
-        output_dir = Path(args.output_dir)
-        image_path = download_image(args.url, output_dir, args.filename)
-
-        # Generate alt text
-        if args.alt_text:
-            alt_text = args.alt_text
-        elif args.context:
-            alt_text = generate_alt_text_from_context(args.context)
-        else:
-            alt_text = "Image"
-
-        # Generate relative path for MDX
-        relative_path = f"./photos/{image_path.name}"
-
-        # Output formatted MDX
-        mdx_output = wrap_image_with_styling(relative_path, alt_text)
-        print("\n--- MDX Output ---")
-        print(mdx_output)
-        print("\nAlt text:", alt_text)
-
-    except Exception as e:
-        print(f"✗ Error: {e}")
-        exit(1)
+    with instrumented(args):
+        store_dir = None
+        if not args.no_store:
+            from image_store import DEFAULT_IMAGE_STORE
+            store_dir = Path(args.store) if args.store else DEFAULT_IMAGE_STORE
+
+        max_bytes = int(args.max_size * 1024 * 1024) or None
+
+        optimize_options = {}
+        if args.optimize:
+            from image_optimizer import optimize_images, parse_list, relative_variants
+            if args.widths:
+                optimize_options['widths'] = [int(width) for width in parse_list(args.widths)]
+            if args.formats:
+                optimize_options['formats'] = parse_list(args.formats)
+            if args.quality is not None:
+                optimize_options['quality'] = args.quality
+
+        if args.urls_file or args.from_markdown:
+            if args.urls_file:
+                urls = [line.strip() for line in iter_text_lines(args.urls_file) if line.strip()]
+            else:
+                urls = extract_image_urls(read_text(args.from_markdown))
+
+            start = time.perf_counter()
+            results = download_images(
+                urls, Path(args.output_dir), args.workers, args.timeout, args.retries,
+                store_dir=store_dir, revalidate=args.revalidate, max_bytes=max_bytes
+            )
+            if args.optimize:
+                optimized = optimize_images(
+                    [r['path'] for r in results if 'error' not in r], **optimize_options
+                )
+                by_path = {r['path']: r for r in optimized}
+                for result in results:
+                    done = by_path.get(result.get('path'))
+                    if done is None:
+                        continue
+                    if 'error' in done:
+                        result['optimize_error'] = done['error']
+                    else:
+                        result['variants'] = done['variants']
+            report = summarize_downloads(results, time.perf_counter() - start)
+            report['results'] = results
+
+            # Keep status lines out of a JSON report written to stdout
+            log = sys.stderr if args.report == STDIO else sys.stdout
+            for result in results:
+                if 'error' in result:
+                    print(f"✗ Failed: {result['url']} ({result['error']})", file=log)
+                elif result['status'] == 'downloaded':
+                    print(f"✓ Downloaded: {result['path']}", file=log)
+                else:
+                    print(f"✓ Reused: {result['path']}", file=log)
+            print(f"\nDownloaded {report['downloaded']}/{len(results)} images "
+                  f"({report['reused']} reused from store), "
+                  f"{report['bytes']} bytes in {report['seconds']}s", file=log)
+            if args.report:
+                with open_output(args.report) as output:
+                    json.dump(report, output, indent=2)
+                    output.write('\n')
+            exit(1 if report['failed'] else 0)
+
+        # Keep status lines out of an MDX snippet written to stdout
+        log = sys.stderr if args.output == STDIO else sys.stdout
+        try:
+            # Download image
+            output_dir = Path(args.output_dir)
+            if store_dir is None:
+                probe = SizeProbe()
+                image_path = download_image(
+                    args.url, output_dir, args.filename, timeout=args.timeout,
+                    retries=args.retries, verbose=False, probe=probe, max_bytes=max_bytes
+                )
+                size = probe.size
+                print(f"✓ Downloaded: {image_path}", file=log)
+            else:
+                from image_store import (
+                    load_image_manifest, save_image_manifest, store_image, stored_image_size
+                )
+                manifest = load_image_manifest(store_dir)
+                image_path, status = store_image(
+                    args.url, output_dir, args.filename, store_dir, manifest,
+                    timeout=args.timeout, retries=args.retries, revalidate=args.revalidate,
+                    max_bytes=max_bytes
+                )
+                size = stored_image_size(manifest, args.url, store_dir)
+                save_image_manifest(manifest, store_dir)
+                print(f"✓ {'Downloaded' if status == 'downloaded' else 'Reused'}: {image_path}",
+                      file=log)
+
+            # Generate alt text
+            context = args.context
+            if args.context_file:
+                context = read_text(args.context_file)
+            if args.alt_text:
+                alt_text = args.alt_text
+            elif context:
+                alt_text = generate_alt_text_from_context(context)
+            else:
+                alt_text = "Image"
+
+            # Generate relative path for MDX
+            relative_path = f"./photos/{image_path.name}"
+
+            variants = None
+            if args.optimize:
+                optimized = optimize_images([image_path], **optimize_options)[0]
+                if 'error' in optimized:
+                    raise RuntimeError(f"Could not optimize {image_path}: {optimized['error']}")
+                variants = relative_variants(optimized, relative_path)
+                size = (optimized['width'], optimized['height'])
+                print(f"✓ Optimized: {len(variants)} variants", file=log)
+
+            # Output formatted MDX
+            width, height = size or (None, None)
+            mdx_output = wrap_image_with_styling(relative_path, alt_text, variants, width, height)
+            if args.output:
+                with open_output(args.output) as output:
+                    output.write(mdx_output + '\n')
+            else:
+                print("\n--- MDX Output ---")
+                print(mdx_output)
+                print("\nAlt text:", alt_text)
+
+        except Exception as e:
+            print(f"✗ Error: {e}", file=log)
+            exit(1)
 
 
 if __name__ == '__main__':
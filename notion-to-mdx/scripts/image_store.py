@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Content-addressed image store for Notion to MDX
+Keeps one copy of every image by content hash, links it into each post's
+photos folder, and remembers where each source URL came from so re-runs
+can skip the download or make a conditional request
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+import requests
+
+from image_probe import SizeProbe, probe_file
+from image_processor import DEFAULT_MAX_BYTES, FileDownload, fetch_with_retries, image_filename
+from text_io import DEFAULT_CACHE_DIR
+
+DEFAULT_IMAGE_STORE = DEFAULT_CACHE_DIR / 'images'
+
+MANIFEST_NAME = 'manifest.json'
+
+# Query parameters of signed URLs (Notion's S3 and file.notion.so links)
+# that change on every export without changing the file they point to;
+# lowercase, as names are compared case-insensitively
+SIGNED_URL_PARAMS = {
+    'x-amz-algorithm', 'x-amz-content-sha256', 'x-amz-credential', 'x-amz-date',
+    'x-amz-expires', 'x-amz-security-token', 'x-amz-signature', 'x-amz-signedheaders',
+    'awsaccesskeyid', 'signature', 'expires', 'key-pair-id', 'policy',
+    'expirationtimestamp',
+}
+
+# Writes to the manifest dict from download threads
+_manifest_lock = threading.Lock()
+
+# Name checks and links in photo folders, so two images never claim one name
+_place_lock = threading.Lock()
+
+
+def url_key(url: str) -> str:
+    """
+    Identify an image URL independently of its signature
+
+    Args:
+        url: Source URL
+
+    Returns:
+        URL with signed-URL query parameters removed
+    """
+    parsed = urlparse(url)
+    if not parsed.query:
+        return url
+    query = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+             if k.lower() not in SIGNED_URL_PARAMS]
+    return urlunparse(parsed._replace(query=urlencode(query)))
+
+
+def load_image_manifest(store_dir: Union[str, Path] = DEFAULT_IMAGE_STORE) -> dict:
+    """
+    Load the store manifest
+
+    Args:
+        store_dir: Image store directory
+
+    Returns:
+        Dict of url key -> entry with sha256, object, size, width, height,
+        etag and last_modified (empty if the store is new)
+    """
+    path = Path(store_dir) / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    for entry in manifest.values():
+        # Older manifests kept the full signed URL; drop it on the next save
+        entry.pop('url', None)
+    return manifest
+
+
+def save_image_manifest(manifest: dict, store_dir: Union[str, Path] = DEFAULT_IMAGE_STORE) -> None:
+    """
+    Write the store manifest atomically
+
+    Args:
+        manifest: Manifest dict
+        store_dir: Image store directory
+    """
+    path = Path(store_dir) / MANIFEST_NAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with _manifest_lock:
+        data = json.dumps(manifest, indent=1, sort_keys=True)
+    tmp_path.write_text(data, encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def stored_image_size(manifest: dict, image_url: str,
+                      store_dir: Path = DEFAULT_IMAGE_STORE) -> Optional[Tuple[int, int]]:
+    """
+    Get the dimensions of a stored image
+
+    They are recorded while downloading; entries from older manifests
+    are probed from the stored file's header once and updated.
+
+    Args:
+        manifest: Manifest dict
+        image_url: Source URL
+        store_dir: Image store directory
+
+    Returns:
+        (width, height), or None if unknown
+    """
+    key = url_key(image_url)
+    with _manifest_lock:
+        entry = manifest.get(key)
+    if entry is None:
+        return None
+    if 'width' not in entry:
+        size = probe_file(Path(store_dir) / entry['object'])
+        with _manifest_lock:
+            entry['width'], entry['height'] = size or (None, None)
+    if entry['width'] is None:
+        return None
+    return entry['width'], entry['height']
+
+
+def object_path(store_dir: Path, sha256: str) -> Path:
+    """
+    Path of a stored object, fanned out by the first two hash digits
+
+    Objects are named by digest alone, so the same bytes served as .jpg
+    and .jpeg are stored once; the placed copy keeps the post's filename.
+    """
+    return store_dir / 'objects' / sha256[:2] / sha256
+
+
+def link_into(source: Path, dest: Path) -> None:
+    """
+    Hard-link a stored object to dest, copying if linking is not possible
+
+    Args:
+        source: Object in the store
+        dest: Destination path (replaced if it exists)
+    """
+    tmp_dest = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        os.link(source, tmp_dest)
+    except OSError:
+        shutil.copyfile(source, tmp_dest)
+    os.replace(tmp_dest, dest)
+
+
+def place_object(source: Path, output_dir: Path, filename: str, sha256: str) -> Path:
+    """
+    Put a stored object into output_dir under filename
+
+    If a different image already has that name, the hash is added to the
+    name instead of overwriting it.
+
+    Args:
+        source: Object in the store
+        output_dir: Post photos directory
+        filename: Preferred filename
+        sha256: Content hash of the object
+
+    Returns:
+        Path of the placed file
+    """
+    with _place_lock:
+        dest = output_dir / filename
+        if dest.exists():
+            if os.path.samefile(source, dest):
+                return dest
+            if dest.stat().st_size == source.stat().st_size and file_sha256(dest) == sha256:
+                return dest
+            stem, suffix = os.path.splitext(filename)
+            dest = output_dir / f"{stem}-{sha256[:8]}{suffix}"
+            if dest.exists() and os.path.samefile(source, dest):
+                return dest
+        link_into(source, dest)
+        return dest
+
+
+def file_sha256(path: Path) -> str:
+    """Hash a file in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def store_image(image_url: str, output_dir: Path, filename: str = None,
+                store_dir: Path = DEFAULT_IMAGE_STORE, manifest: Optional[dict] = None,
+                session: Optional[requests.Session] = None, timeout: float = 30.0,
+                retries: int = 3, backoff: float = 0.5,
+                revalidate: bool = False,
+                max_bytes: Optional[int] = DEFAULT_MAX_BYTES) -> Tuple[Path, str]:
+    """
+    Fetch an image through the content-addressed store
+
+    Known URLs are served from the store without any request, or with a
+    conditional request when revalidate is set. New content is hashed
+    while streaming, stored once, and linked into output_dir.
+
+    Args:
+        image_url: URL of the image
+        output_dir: Directory to place the image in
+        filename: Optional custom filename (auto-generated if not provided)
+        store_dir: Image store directory
+        manifest: Manifest dict to read and update (loaded if not given;
+            the caller saves it)
+        session: Optional session to reuse pooled connections
+        timeout: Per-request timeout in seconds
+        retries: Extra attempts after a retryable failure
+        backoff: Base delay for exponential backoff between attempts
+        revalidate: Send If-None-Match/If-Modified-Since for known URLs
+        max_bytes: Refuse images larger than this (None for no limit)
+
+    Returns:
+        Tuple of (placed path, status), where status is 'cached',
+        'not-modified' or 'downloaded'
+    """
+    store_dir = Path(store_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if manifest is None:
+        manifest = load_image_manifest(store_dir)
+    if not filename:
+        filename = image_filename(image_url)
+    if '.' not in filename:
+        filename += '.jpg'
+
+    key = url_key(image_url)
+    with _manifest_lock:
+        entry = manifest.get(key)
+    known = None
+    if entry is not None:
+        known = store_dir / entry['object']
+        if not known.exists():
+            entry = known = None
+
+    if known is not None and not revalidate:
+        return place_object(known, output_dir, filename, entry['sha256']), 'cached'
+
+    headers = {}
+    if entry is not None:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+    tmp_dir = store_dir / 'tmp'
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    probe = SizeProbe()
+    download = FileDownload(
+        tmp_dir / f"{os.getpid()}.{threading.get_ident()}.part", max_bytes,
+        on_chunk=probe.feed, on_reset=probe.reset
+    )
+
+    def save(response: requests.Response) -> Optional[dict]:
+        if response.status_code == 304:
+            return None
+        download(response)
+        width, height = probe.size or (None, None)
+        return {
+            'sha256': download.digest.hexdigest(),
+            'size': download.size,
+            'width': width,
+            'height': height,
+            'etag': download.response_headers.get('ETag'),
+            'last_modified': download.response_headers.get('Last-Modified'),
+        }
+
+    try:
+        fetched = fetch_with_retries(
+            session or requests, image_url, save, timeout, retries, backoff,
+            lambda: download.headers(headers)
+        )
+        if fetched is None:
+            return place_object(known, output_dir, filename, entry['sha256']), 'not-modified'
+
+        # Identical bytes from any URL or post are stored once
+        target = object_path(store_dir, fetched['sha256'])
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            download.commit(target)
+    finally:
+        download.discard()
+
+    # The key is the URL without its signature; the signed URL itself
+    # carries credentials and is never written to disk
+    fetched['object'] = target.relative_to(store_dir).as_posix()
+    with _manifest_lock:
+        manifest[key] = fetched
+
+    return place_object(target, output_dir, filename, fetched['sha256']), 'downloaded'
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Link title resolver for Notion to MDX
+Fetches page <title>/OpenGraph titles so links get descriptive text,
+with a persistent cache so re-converting a page needs no network calls
+"""
+
+import argparse
+import html
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from text_io import DEFAULT_CACHE_DIR, open_output, read_text
+
+DEFAULT_TITLE_CACHE = DEFAULT_CACHE_DIR / 'link_titles.sqlite3'
+
+# How long resolved titles and definitive misses stay valid (seconds)
+TITLE_TTL = 30 * 24 * 3600
+NEGATIVE_TTL = 24 * 3600
+
+# Only the start of a page is needed to find its title
+MAX_TITLE_BYTES = 64 * 1024
+
+# Statuses that say for certain a page has no title to offer
+DEFINITIVE_MISS_STATUSES = {404, 410}
+
+# Returned by fetch_title when the lookup failed for a reason that may pass
+# (timeout, connection error, 429, 5xx); never cached
+UNAVAILABLE = object()
+
+USER_AGENT = 'notion-to-mdx link-title resolver'
+
+OG_TITLE_PATTERN = re.compile(
+    r'<meta\s[^>]*?(?:property|name)\s*=\s*["\'](?:og:title|twitter:title)["\'][^>]*>',
+    re.IGNORECASE
+)
+CONTENT_ATTR_PATTERN = re.compile(r'content\s*=\s*(?:"([^"]*)"|\'([^\']*)\')', re.IGNORECASE)
+TITLE_PATTERN = re.compile(r'<title[^>]*>(.*?)</title\s*>', re.IGNORECASE | re.DOTALL)
+
+
+class HostRateLimiter:
+    """
+    Spaces out requests to the same host by a minimum interval
+
+    Slots are reserved under a lock and waited for outside it, so requests
+    to different hosts never block each other.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host: str) -> None:
+        """Block until a request to host is allowed"""
+        if self.interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def open_title_cache(path: Union[str, Path] = DEFAULT_TITLE_CACHE) -> sqlite3.Connection:
+    """
+    Open (creating if needed) the SQLite title cache
+
+    Args:
+        path: Database file
+
+    Returns:
+        Open connection
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path))
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS titles ('
+        ' url TEXT PRIMARY KEY,'
+        ' title TEXT,'
+        ' fetched_at REAL NOT NULL)'
+    )
+    return conn
+
+
+def get_cached_titles(conn: sqlite3.Connection, urls: Iterable[str],
+                      ttl: float = TITLE_TTL,
+                      negative_ttl: float = NEGATIVE_TTL) -> Dict[str, Optional[str]]:
+    """
+    Look up fresh cache entries
+
+    Args:
+        conn: Title cache connection
+        urls: URLs to look up
+        ttl: Maximum age of a resolved title
+        negative_ttl: Maximum age of a failed lookup
+
+    Returns:
+        Dict of url -> title for fresh entries; None marks a cached failure
+    """
+    now = time.time()
+    found = {}
+    for url in urls:
+        row = conn.execute(
+            'SELECT title, fetched_at FROM titles WHERE url = ?', (url,)
+        ).fetchone()
+        if row is None:
+            continue
+        title, fetched_at = row
+        max_age = ttl if title is not None else negative_ttl
+        if now - fetched_at < max_age:
+            found[url] = title
+    return found
+
+
+def store_titles(conn: sqlite3.Connection, titles: Dict[str, Optional[str]]) -> None:
+    """
+    Save resolved titles, with None recording a failed lookup
+
+    Args:
+        conn: Title cache connection
+        titles: Dict of url -> title
+    """
+    now = time.time()
+    with conn:
+        conn.executemany(
+            'INSERT OR REPLACE INTO titles (url, title, fetched_at) VALUES (?, ?, ?)',
+            [(url, title, now) for url, title in titles.items()]
+        )
+
+
+def extract_title(page: str) -> Optional[str]:
+    """
+    Extract the best title from the start of an HTML page
+
+    OpenGraph/Twitter titles are preferred over <title>, which often
+    carries a site-name suffix.
+
+    Args:
+        page: HTML text
+
+    Returns:
+        Cleaned title, or None if the page has none
+    """
+    title = None
+    meta = OG_TITLE_PATTERN.search(page)
+    if meta:
+        content = CONTENT_ATTR_PATTERN.search(meta.group(0))
+        if content:
+            title = content.group(1) if content.group(1) is not None else content.group(2)
+    if not title:
+        match = TITLE_PATTERN.search(page)
+        if match:
+            title = match.group(1)
+    if not title:
+        return None
+
+    title = re.sub(r'\s+', ' ', html.unescape(title)).strip()
+    return title or None
+
+
+def new_session(pool_size: int) -> requests.Session:
+    """
+    Create a session with a keep-alive pool sized for the worker count
+
+    Args:
+        pool_size: Connections kept per host and hosts kept in the pool
+
+    Returns:
+        Configured session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+
+def fetch_title(session: requests.Session, url: str, timeout: float = 10.0,
+                limiter: Optional[HostRateLimiter] = None):
+    """
+    Fetch a page and return its title
+
+    Args:
+        session: HTTP session
+        url: Page URL
+        timeout: Connect and read timeout in seconds
+        limiter: Optional per-host rate limiter
+
+    Returns:
+        Title; None if the page has no title or is gone (404/410); or
+        UNAVAILABLE if it could not be fetched this time
+    """
+    if limiter is not None:
+        limiter.wait(urlparse(url).netloc.lower())
+
+    try:
+        with session.get(url, timeout=timeout, stream=True) as response:
+            if response.status_code in DEFINITIVE_MISS_STATUSES:
+                return None
+            if response.status_code >= 400:
+                return UNAVAILABLE
+            content_type = response.headers.get('Content-Type', 'text/html')
+            if 'html' not in content_type:
+                return None
+
+            data = b''
+            for chunk in response.iter_content(chunk_size=16384):
+                data += chunk
+                if len(data) >= MAX_TITLE_BYTES or b'</title' in data.lower():
+                    break
+            # requests assumes ISO-8859-1 when no charset is sent
+            encoding = response.encoding if 'charset' in content_type.lower() else 'utf-8'
+    except requests.RequestException:
+        return UNAVAILABLE
+
+    try:
+        page = data.decode(encoding, errors='replace')
+    except LookupError:  # Unknown charset name
+        page = data.decode('utf-8', errors='replace')
+    return extract_title(page)
+
+
+def resolve_link_titles(urls: Iterable[str], cache_path: Union[str, Path, None] = DEFAULT_TITLE_CACHE,
+                        workers: int = 8, per_host_interval: float = 1.0,
+                        timeout: float = 10.0, ttl: float = TITLE_TTL,
+                        negative_ttl: float = NEGATIVE_TTL,
+                        session: Optional[requests.Session] = None) -> Dict[str, Optional[str]]:
+    """
+    Resolve titles for many URLs concurrently, using the cache first
+
+    Args:
+        urls: URLs to resolve (duplicates are fetched once)
+        cache_path: SQLite cache file (None disables the cache)
+        workers: Maximum concurrent requests
+        per_host_interval: Minimum seconds between requests to one host
+        timeout: Per-request timeout in seconds
+        ttl: Maximum age of a cached title
+        negative_ttl: Maximum age of a cached failure
+        session: Optional session to reuse (a pooled one is created otherwise)
+
+    Returns:
+        Dict of url -> title (None where no title could be found)
+
+    Definitive misses are cached for negative_ttl; lookups that failed for
+    a passing reason are not cached, so the next run tries again.
+    """
+    urls = list(dict.fromkeys(urls))
+    conn = open_title_cache(cache_path) if cache_path is not None else None
+    try:
+        titles = get_cached_titles(conn, urls, ttl, negative_ttl) if conn else {}
+        missing = [url for url in urls if url not in titles]
+        if not missing:
+            return titles
+
+        own_session = session is None
+        if own_session:
+            session = new_session(workers)
+        limiter = HostRateLimiter(per_host_interval)
+        fetched = {}
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(fetch_title, session, url, timeout, limiter): url
+                    for url in missing
+                }
+                for future in as_completed(futures):
+                    fetched[futures[future]] = future.result()
+        finally:
+            if own_session:
+                session.close()
+
+        definitive = {url: title for url, title in fetched.items() if title is not UNAVAILABLE}
+        if conn is not None:
+            store_titles(conn, definitive)
+        titles.update(definitive)
+        titles.update((url, None) for url in fetched if url not in definitive)
+        return titles
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Resolve page titles for URLs, with a persistent cache'
+    )
+    parser.add_argument(
+        '--url',
+        action='append',
+        help='URL to resolve (may be repeated)'
+    )
+    parser.add_argument(
+        '--text-file',
+        metavar='FILE',
+        help='Resolve every URL found in FILE (- for stdin)'
+    )
+    parser.add_argument(
+        '--cache',
+        default=str(DEFAULT_TITLE_CACHE),
+        help=f'SQLite cache file (default: {DEFAULT_TITLE_CACHE})'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=8,
+        help='Maximum concurrent requests (default: 8)'
+    )
+    parser.add_argument(
+        '--per-host-interval',
+        type=float,
+        default=1.0,
+        help='Minimum seconds between requests to the same host (default: 1.0)'
+    )
+    parser.add_argument(
+        '--timeout',
+        type=float,
+        default=10.0,
+        help='Per-request timeout in seconds (default: 10)'
+    )
+    parser.add_argument(
+        '--output',
+        help='Write tab-separated url/title lines to this file instead of stdout'
+    )
+    args = parser.parse_args()
+
+    if not args.url and not args.text_file:
+        parser.error("Either --url or --text-file must be provided")
+
+    try:
+        urls = list(args.url or [])
+        if args.text_file:
+            from url_converter import extract_link_urls
+            urls.extend(extract_link_urls(read_text(args.text_file)))
+
+        titles = resolve_link_titles(
+            urls, args.cache, args.workers, args.per_host_interval, args.timeout
+        )
+        with open_output(args.output) as output:
+            for url in dict.fromkeys(urls):
+                output.write(f"{url}\t{titles.get(url) or ''}\n")
+
+    except Exception as e:
+        print(f"✗ Error: {e}")
+        exit(1)
+
+
+if __name__ == '__main__':
+    main()
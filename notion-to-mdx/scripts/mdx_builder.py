@@ -5,26 +5,126 @@ Ensures consistent formatting matching user's blog post format
 """
 
 import argparse
+import re
+import sys
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterable, Iterator, List, TextIO, Union
+
+from metrics import add_metrics_arguments, increment, instrumented, stage
+from text_io import STDIO, iter_text_lines, open_atomic, open_output
+
+# Strings that are safe to write as plain YAML scalars: no leading
+# indicator, number-like start or surrounding space, no ': ' / ' #'
+# lookalikes (':' and '#' are excluded outright) and nothing unprintable
+PLAIN_SCALAR_PATTERN = re.compile(
+    r'(?![-?:,\[\]{}#&*!|>\'"%@`\s])(?![+.]?\d)'
+    r'[^\x00-\x1f\x7f-\x9f:#\u2028\u2029\ufeff]*(?<!\s)\Z'
+)
+
+# Plain words YAML would read as booleans, nulls or special numbers
+YAML_RESERVED_WORDS = {
+    '~', 'null', 'true', 'false', 'yes', 'no', 'on', 'off', 'y', 'n',
+    '.inf', '+.inf', '.nan', '<<', '=',
+}
+
+# Characters escaped in double-quoted scalars
+YAML_ESCAPES = {'\\': '\\\\', '"': '\\"', '\n': '\\n', '\t': '\\t', '\r': '\\r', '\0': '\\0'}
+YAML_ESCAPE_PATTERN = re.compile(r'[\\"\x00-\x1f\x7f-\x9f\u2028\u2029\ufeff]')
+
+# Escapes understood when reading double-quoted scalars back
+YAML_UNESCAPE_PATTERN = re.compile(r'\\(x[0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|U[0-9a-fA-F]{8}|.)')
+YAML_UNESCAPES = {
+    '0': '\0', 'a': '\a', 'b': '\b', 't': '\t', '\t': '\t', 'n': '\n', 'v': '\v', 'f': '\f',
+    'r': '\r', 'e': '\x1b', ' ': ' ', '"': '"', '/': '/', '\\': '\\', 'N': '\x85',
+    '_': '\xa0', 'L': '\u2028', 'P': '\u2029',
+}
+
+# Frontmatter lines written by build_frontmatter: "key: value" and "  - item"
+FRONTMATTER_KEY_PATTERN = re.compile(r'([A-Za-z_][\w-]*)[ \t]*:(?:[ \t]+(.*?))?[ \t]*$')
+FRONTMATTER_ITEM_PATTERN = re.compile(r'[ \t]*-[ \t]+(.*?)[ \t]*$')
+
+# Footer advertisement appended to every post
+FOOTER = "\n\n---\n\n*This blog post was created using the [notion-to-mdx](https://github.com/zk1tty/notion-to-mdx) skill - converting Notion pages to beautiful MDX blog posts.*\n"
 
 
 def sanitize_title(title: str) -> str:
     """
-    Sanitize title for YAML frontmatter
-    Removes colons and other problematic characters
+    Normalize a title for YAML frontmatter
+
+    Colons, quotes and other YAML syntax are kept as written; yaml_scalar
+    quotes the title when needed. Only line breaks and surrounding
+    whitespace are removed, since the title is a single line.
 
     Args:
         title: Original title
 
     Returns:
-        Sanitized title safe for YAML
+        Title on one line
+    """
+    return ' '.join(title.split())
+
+
+def yaml_scalar(value: str) -> str:
     """
-    # Remove colons as they break YAML parsing
-    title = title.replace(':', ' -')
-    # Remove other problematic characters
-    title = title.replace('"', "'")
-    return title.strip()
+    Serialize a string as a YAML scalar that reads back unchanged
+
+    Ordinary words and sentences are written plain; anything YAML could
+    misread (colons, '#', leading indicators, number or boolean
+    lookalikes, control characters) is double-quoted with escapes.
+
+    Args:
+        value: String to serialize
+
+    Returns:
+        Plain or double-quoted scalar
+    """
+    if PLAIN_SCALAR_PATTERN.match(value) and value.lower() not in YAML_RESERVED_WORDS and value:
+        return value
+
+    def escape(match: re.Match) -> str:
+        char = match.group(0)
+        if char in YAML_ESCAPES:
+            return YAML_ESCAPES[char]
+        code = ord(char)
+        return f"\\x{code:02x}" if code <= 0xFF else f"\\u{code:04x}"
+
+    return '"' + YAML_ESCAPE_PATTERN.sub(escape, value) + '"'
+
+
+def parse_yaml_scalar(text: str) -> str:
+    """
+    Read back a scalar written by yaml_scalar (or by hand)
+
+    Plain scalars are returned as strings without type resolution, so
+    dates stay 'YYYY-MM-DD' strings.
+
+    Args:
+        text: Scalar text after 'key:' or '- '
+
+    Returns:
+        String value
+    """
+    if text.startswith('"'):
+        end = text.rfind('"')
+        if end <= 0:
+            raise ValueError(f"Unterminated quoted scalar: {text}")
+
+        def unescape(match: re.Match) -> str:
+            escape = match.group(1)
+            if len(escape) > 1:
+                return chr(int(escape[1:], 16))
+            if escape not in YAML_UNESCAPES:
+                raise ValueError(f"Unknown escape in scalar: \\{escape}")
+            return YAML_UNESCAPES[escape]
+
+        return YAML_UNESCAPE_PATTERN.sub(unescape, text[1:end])
+    if text.startswith("'"):
+        end = text.rfind("'")
+        if end <= 0:
+            raise ValueError(f"Unterminated quoted scalar: {text}")
+        return text[1:end].replace("''", "'")
+    # Drop a trailing comment
+    return text.split(' #', 1)[0].rstrip()
 
 
 def build_frontmatter(title: str, date: str, tags: List[str]) -> str:
@@ -39,17 +139,151 @@ def build_frontmatter(title: str, date: str, tags: List[str]) -> str:
     Returns:
         Formatted YAML frontmatter string
     """
-    # Sanitize title to prevent YAML parsing errors
-    safe_title = sanitize_title(title)
+    # Quote the title and tags only where YAML needs it
+    safe_title = yaml_scalar(sanitize_title(title))
+
+    lines = ["---\n", f"title: {safe_title}\n", f"date: {date}\n", "tags:\n"]
+    lines.extend(f"  - {yaml_scalar(tag)}\n" for tag in tags)
+    lines.append("---\n")
+    return ''.join(lines)
+
+
+def parse_frontmatter(lines: Iterable[str]) -> Dict[str, Union[str, List[str]]]:
+    """
+    Parse the lines between the '---' markers of a frontmatter block
+
+    Handles the layout build_frontmatter writes (scalars, block lists and
+    [inline, lists]) without a YAML library; nested mappings and block
+    scalars are not supported.
+
+    Args:
+        lines: Header lines, without the '---' markers
+
+    Returns:
+        Dict of key -> string, or key -> list of strings
+
+    Raises:
+        ValueError: If a line is not in the supported layout
+    """
+    data = {}
+    key = None
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or stripped.startswith('#'):
+            continue
+        item = FRONTMATTER_ITEM_PATTERN.match(line)
+        if item is not None and key is not None and isinstance(data[key], list):
+            data[key].append(parse_yaml_scalar(item.group(1)))
+            continue
+        match = FRONTMATTER_KEY_PATTERN.match(line)
+        if match is None:
+            raise ValueError(f"Unsupported frontmatter line: {stripped}")
+        key, value = match.group(1), match.group(2)
+        if not value:
+            data[key] = []  # A block list follows (or the value is empty)
+        elif value.startswith('[') and value.endswith(']'):
+            data[key] = [parse_yaml_scalar(part.strip())
+                         for part in value[1:-1].split(',') if part.strip()]
+        else:
+            data[key] = parse_yaml_scalar(value)
+    return data
+
+
+def read_frontmatter(path: Union[str, Path]) -> Dict[str, Union[str, List[str]]]:
+    """
+    Read the frontmatter of a post without reading its body
+
+    Lines are read only up to the closing '---', so the cost depends on
+    the header size, not the post size.
+
+    Args:
+        path: MDX or markdown file
+
+    Returns:
+        Parsed frontmatter (see parse_frontmatter); empty if the file has
+        no frontmatter block
+    """
+    with open(path, encoding='utf-8') as f:
+        if f.readline().rstrip() != '---':
+            return {}
+        header = []
+        for line in f:
+            if line.rstrip() == '---':
+                return parse_frontmatter(header)
+            header.append(line)
+    # No closing marker: not a frontmatter block
+    return {}
+
+
+def iter_body(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Strip leading and trailing whitespace from a body given in chunks
+
+    Same result as ''.join(chunks).strip(), but only a run of trailing
+    whitespace is ever held back, so chunks flow straight through.
+
+    Args:
+        chunks: Body text in pieces of any size (e.g. lines)
+
+    Yields:
+        Body pieces
+    """
+    started = False
+    pending = ''
+    for chunk in chunks:
+        if not started:
+            chunk = chunk.lstrip()
+            if not chunk:
+                continue
+            started = True
+        stripped = chunk.rstrip()
+        if not stripped:
+            pending += chunk
+            continue
+        if pending:
+            yield pending
+        yield stripped
+        pending = chunk[len(stripped):]
+
+
+def iter_mdx(title: str, date: str, tags: List[str],
+             content: Union[str, Iterable[str]]) -> Iterator[str]:
+    """
+    Generate an MDX file piece by piece: frontmatter, body, footer
 
-    frontmatter = "---\n"
-    frontmatter += f"title: {safe_title}\n"
-    frontmatter += f"date: {date}\n"
-    frontmatter += "tags:\n"
-    for tag in tags:
-        frontmatter += f"  - {tag}\n"
-    frontmatter += "---\n"
-    return frontmatter
+    Args:
+        title: Post title
+        date: Post date in YYYY-MM-DD format
+        tags: List of tags
+        content: Markdown body, as one string or an iterator of chunks
+
+    Yields:
+        Pieces of the MDX file
+    """
+    if isinstance(content, str):
+        content = (content,)
+
+    # A single blank line between frontmatter and content
+    yield build_frontmatter(title, date, tags) + "\n"
+    yield from iter_body(content)
+    yield FOOTER
+
+
+def strip_footer(content: str) -> str:
+    """
+    Remove the footer that iter_mdx appends, if the post ends with it
+
+    Args:
+        content: MDX file content
+
+    Returns:
+        Content without the footer (unchanged if it has none)
+    """
+    footer = FOOTER.strip()
+    stripped = content.rstrip()
+    if stripped.endswith(footer):
+        return stripped[:-len(footer)]
+    return content
 
 
 def build_mdx(title: str, date: str, tags: List[str], content: str) -> str:
@@ -65,16 +299,55 @@ def build_mdx(title: str, date: str, tags: List[str], content: str) -> str:
     Returns:
         Complete MDX file content with footer
     """
-    frontmatter = build_frontmatter(title, date, tags)
+    return ''.join(iter_mdx(title, date, tags, content))
 
-    # Ensure content doesn't start with extra newlines
-    content = content.strip()
 
-    # Add footer advertisement
-    footer = "\n\n---\n\n*This blog post was created using the [notion-to-mdx](https://github.com/zk1tty/notion-to-mdx) skill - converting Notion pages to beautiful MDX blog posts.*"
+def stream_mdx(output: TextIO, title: str, date: str, tags: List[str],
+               content: Union[str, Iterable[str]]) -> int:
+    """
+    Write an MDX file to an open stream without building it in memory
 
-    # Combine with a single blank line between frontmatter and content
-    return f"{frontmatter}\n{content}{footer}\n"
+    Args:
+        output: Writable text stream
+        title: Post title
+        date: Post date in YYYY-MM-DD format
+        tags: List of tags
+        content: Markdown body, as one string or an iterator of chunks
+
+    Returns:
+        Number of characters written
+    """
+    written = 0
+    with stage('write_mdx'):
+        for piece in iter_mdx(title, date, tags, content):
+            written += output.write(piece)
+    increment('mdx_chars_written', written)
+    return written
+
+
+def write_mdx(path: Union[str, Path], title: str, date: str, tags: List[str],
+              content: Union[str, Iterable[str]]) -> Path:
+    """
+    Write an MDX file atomically
+
+    The file is streamed to a temporary file next to path and renamed
+    into place only once complete, so a crash never leaves a half-written
+    post behind. Upstream stages can pass a generator of body chunks.
+
+    Args:
+        path: Output file (parent directories are created)
+        title: Post title
+        date: Post date in YYYY-MM-DD format
+        tags: List of tags
+        content: Markdown body, as one string or an iterator of chunks
+
+    Returns:
+        Path of the written file
+    """
+    path = Path(path)
+    with open_atomic(path) as output:
+        stream_mdx(output, title, date, tags, content)
+    return path
 
 
 def validate_inputs(title: str, date: str, tags: List[str]) -> None:
@@ -126,47 +399,58 @@ def main():
         required=True,
         help='Comma-separated list of tags'
     )
-    parser.add_argument(
+    content_source = parser.add_mutually_exclusive_group(required=True)
+    content_source.add_argument(
         '--content',
-        required=True,
         help='Markdown content body'
     )
+    content_source.add_argument(
+        '--content-file',
+        metavar='FILE',
+        help='Read the markdown content body from FILE (- for stdin)'
+    )
     parser.add_argument(
         '--output',
         required=True,
-        help='Output file path for the MDX file'
+        help='Output file path for the MDX file (- for stdout)'
     )
+    add_metrics_arguments(parser)
     args = parser.parse_args()
 
-    # Parse tags
-    tags = [t.strip() for t in args.tags.split(',') if t.strip()]
-
-    try:
-        # Validate inputs
-        validate_inputs(args.title, args.date, tags)
-
-        # Build MDX content
-        mdx_content = build_mdx(args.title, args.date, tags, args.content)
-
-        # Ensure output directory exists
-        output_path = Path(args.output)
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-
-        # Write to file
-        output_path.write_text(mdx_content, encoding='utf-8')
-
-        print(f"✓ MDX file created: {args.output}")
-        print(f"\nFrontmatter:")
-        print(f"  Title: {args.title}")
-        print(f"  Date: {args.date}")
-        print(f"  Tags: {', '.join(tags)}")
-
-    except ValueError as e:
-        print(f"✗ Validation error: {e}")
-        exit(1)
-    except Exception as e:
-        print(f"✗ Error: {e}")
-        exit(1)
+    with instrumented(args):
+        # Parse tags
+        tags = [t.strip() for t in args.tags.split(',') if t.strip()]
+
+        try:
+            # Validate inputs
+            validate_inputs(args.title, args.date, tags)
+
+            # Stream the body line by line rather than loading it whole
+            content = args.content
+            if args.content_file:
+                content = iter_text_lines(args.content_file)
+
+            # Write to stdout, or atomically to a file (creating the output directory)
+            if args.output == STDIO:
+                with open_output(args.output) as output:
+                    stream_mdx(output, args.title, args.date, tags, content)
+            else:
+                write_mdx(args.output, args.title, args.date, tags, content)
+
+            # Keep stdout clean when the MDX itself goes there
+            report = sys.stderr if args.output == STDIO else sys.stdout
+            print(f"✓ MDX file created: {args.output}", file=report)
+            print(f"\nFrontmatter:", file=report)
+            print(f"  Title: {args.title}", file=report)
+            print(f"  Date: {args.date}", file=report)
+            print(f"  Tags: {', '.join(tags)}", file=report)
+
+        except ValueError as e:
+            print(f"✗ Validation error: {e}")
+            exit(1)
+        except Exception as e:
+            print(f"✗ Error: {e}")
+            exit(1)
 
 
 if __name__ == '__main__':
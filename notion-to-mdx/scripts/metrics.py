@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Instrumentation for Notion to MDX
+Opt-in stage timers and counters, plus cProfile and tracemalloc hooks,
+shared by the conversion scripts
+"""
+
+import argparse
+import cProfile
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Iterator, Optional
+
+from text_io import open_output
+
+# Frames kept per allocation in tracemalloc snapshots
+TRACE_FRAMES = 10
+
+# Allocation sites printed after a --trace-memory run
+TOP_ALLOCATIONS = 10
+
+# The active collector; None keeps every hook a single global check
+_metrics = None
+
+# Returned by stage() while disabled, so no context manager is created per call
+_NULL_STAGE = nullcontext()
+
+
+class Metrics:
+    """
+    Collects stage timings and counters from any thread
+
+    Timings keep the call count, total and slowest call per stage, so
+    timing every image download costs a few additions.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings = {}  # stage -> [calls, total seconds, max seconds]
+        self.counters = Counter()
+        self._lock = threading.Lock()
+
+    def add_time(self, name: str, seconds: float) -> None:
+        """Record one timed call of a stage"""
+        with self._lock:
+            entry = self.timings.get(name)
+            if entry is None:
+                self.timings[name] = [1, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] = max(entry[2], seconds)
+
+    def increment(self, name: str, n: int = 1) -> None:
+        """Add n to a counter"""
+        with self._lock:
+            self.counters[name] += n
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as one call of a stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def merge(self, data: dict) -> None:
+        """
+        Add the timings and counters of another collector
+
+        Args:
+            data: Output of as_dict, e.g. from a worker process
+        """
+        for name, stats in data.get('stages', {}).items():
+            with self._lock:
+                entry = self.timings.setdefault(name, [0, 0.0, 0.0])
+                entry[0] += stats['calls']
+                entry[1] += stats['seconds']
+                entry[2] = max(entry[2], stats['max_seconds'])
+        for name, n in data.get('counters', {}).items():
+            self.increment(name, n)
+
+    def as_dict(self) -> dict:
+        """
+        Snapshot as plain data
+
+        Returns:
+            Dict with 'wall_seconds', 'stages' (name -> calls, seconds,
+            max_seconds) and 'counters'
+        """
+        with self._lock:
+            return {
+                'wall_seconds': round(time.perf_counter() - self.started, 6),
+                'stages': {
+                    name: {'calls': calls, 'seconds': round(total, 6), 'max_seconds': round(slowest, 6)}
+                    for name, (calls, total, slowest) in sorted(self.timings.items())
+                },
+                'counters': dict(sorted(self.counters.items())),
+            }
+
+
+def enable_metrics() -> Metrics:
+    """Start collecting in this process, returning the new collector"""
+    global _metrics
+    _metrics = Metrics()
+    return _metrics
+
+
+def disable_metrics() -> Optional[Metrics]:
+    """Stop collecting, returning the collector that was active"""
+    global _metrics
+    metrics, _metrics = _metrics, None
+    return metrics
+
+
+def get_metrics() -> Optional[Metrics]:
+    """The active collector, or None when metrics are disabled"""
+    return _metrics
+
+
+def stage(name: str):
+    """
+    Context manager timing a stage, or a shared no-op when disabled
+
+    Args:
+        name: Stage name, e.g. 'tokenize' or 'download'
+    """
+    metrics = _metrics
+    return _NULL_STAGE if metrics is None else metrics.stage(name)
+
+
+def increment(name: str, n: int = 1) -> None:
+    """Add n to a counter when metrics are enabled"""
+    metrics = _metrics
+    if metrics is not None:
+        metrics.increment(name, n)
+
+
+def add_metrics_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the --metrics-json, --profile and --trace-memory options"""
+    group = parser.add_argument_group('instrumentation')
+    group.add_argument(
+        '--metrics-json',
+        metavar='FILE',
+        help='Write stage timings and counters as JSON to FILE (- for stderr)'
+    )
+    group.add_argument(
+        '--profile',
+        metavar='FILE',
+        help='Run under cProfile and dump the stats to FILE (read with python -m pstats)'
+    )
+    group.add_argument(
+        '--trace-memory',
+        metavar='FILE',
+        help='Trace allocations and dump a tracemalloc snapshot to FILE'
+    )
+
+
+@contextmanager
+def instrumented(args: argparse.Namespace) -> Iterator[Optional[Metrics]]:
+    """
+    Apply the instrumentation options around a script's work
+
+    The metrics JSON, profile and snapshot are written when the block
+    exits, including through exit() or an error, so a failed run can be
+    inspected too.
+
+    Args:
+        args: Parsed arguments with the add_metrics_arguments options
+
+    Yields:
+        The active collector, or None without --metrics-json
+    """
+    metrics = enable_metrics() if args.metrics_json else None
+    profiler = cProfile.Profile() if args.profile else None
+    if args.trace_memory:
+        tracemalloc.start(TRACE_FRAMES)
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield metrics
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"✓ Profile written: {args.profile}", file=sys.stderr)
+        if args.trace_memory:
+            # Leave out the profiler's and the import system's own allocations
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, cProfile.__file__),
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+            ))
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            snapshot.dump(args.trace_memory)
+            print(f"✓ Memory snapshot written: {args.trace_memory} "
+                  f"(peak {peak / 1e6:.1f} MB)", file=sys.stderr)
+            for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]:
+                print(f"  {stat}", file=sys.stderr)
+        if metrics is not None:
+            disable_metrics()
+            target = args.metrics_json
+            with (nullcontext(sys.stderr) if target == '-' else open_output(target)) as output:
+                json.dump(metrics.as_dict(), output, indent=2)
+                output.write('\n')
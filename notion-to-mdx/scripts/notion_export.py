@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Notion export reader for Notion to MDX
+Reads pages and attachments from an export folder or straight from the
+"Export as Markdown & CSV" ZIP, so large exports never need unzipping
+"""
+
+import argparse
+import io
+import os
+import posixpath
+import re
+import shutil
+import struct
+import sys
+import threading
+import zipfile
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+from urllib.parse import unquote
+
+from image_probe import Size, probe_stream
+from image_store import link_into
+
+# Notion appends a 32-digit page id to exported file and folder names
+NOTION_ID_PATTERN = re.compile(r'\s+[0-9a-f]{32}$')
+
+# Archive entries that are never part of the export
+IGNORED_PREFIXES = ('__MACOSX/',)
+
+# Offsets in a ZIP local file header
+LOCAL_HEADER = struct.Struct('<4s22xHH')
+LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+
+
+def title_from_name(name: str) -> str:
+    """
+    Turn an exported file or folder name into the page title
+
+    Args:
+        name: File or folder name, e.g. 'My Page 0123...cdef.md'
+
+    Returns:
+        Name without the extension and the Notion page id
+    """
+    stem = PurePosixPath(name).stem if name.endswith('.md') else PurePosixPath(name).name
+    return NOTION_ID_PATTERN.sub('', stem)
+
+
+def resolve_reference(page_key: str, target: str) -> Optional[str]:
+    """
+    Resolve a relative link in a page to the key of an export entry
+
+    Args:
+        page_key: Key of the page containing the link
+        target: URL-encoded relative path from the markdown
+
+    Returns:
+        Export key, or None if the target is a URL or leaves the export
+    """
+    if '://' in target or target.startswith(('/', '#', 'mailto:')):
+        return None
+    key = posixpath.normpath(posixpath.join(posixpath.dirname(page_key), unquote(target)))
+    if key == '..' or key.startswith('../'):
+        return None
+    return key
+
+
+class ExportDirectory:
+    """An extracted Notion export on disk"""
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+        if not self.root.is_dir():
+            raise FileNotFoundError(f"Export folder not found: {self.root}")
+
+    def pages(self) -> List[str]:
+        """Keys (POSIX paths relative to the export root) of all pages, sorted"""
+        return sorted(path.relative_to(self.root).as_posix()
+                      for path in self.root.rglob('*.md') if path.is_file())
+
+    def exists(self, key: str) -> bool:
+        return (self.root / key).is_file()
+
+    def fingerprint(self, key: str) -> List[int]:
+        """[size, mtime_ns] of an entry, used to detect changed attachments"""
+        stat = (self.root / key).stat()
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def modified(self, key: str) -> float:
+        return (self.root / key).stat().st_mtime
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.root / key, 'rb')
+
+    def read_bytes(self, key: str) -> bytes:
+        return (self.root / key).read_bytes()
+
+    def probe_size(self, key: str) -> Optional[Size]:
+        with self.open(key) as f:
+            return probe_stream(f)
+
+    def copy_to(self, key: str, dest: Path) -> None:
+        """Hard-link (or copy) an entry to dest"""
+        link_into(self.root / key, dest)
+
+    def close(self) -> None:
+        pass
+
+
+class _MemberWindow(io.RawIOBase):
+    """
+    Seekable read-only view of a stored (uncompressed) member of an outer ZIP
+
+    Lets zipfile open a nested archive in place, reading through a file
+    handle of its own.
+    """
+
+    def __init__(self, path: Path, start: int, size: int):
+        self._file = open(path, 'rb')
+        self._start = start
+        self._size = size
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self._size}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        count = max(0, min(len(buffer), self._size - self._pos))
+        if count == 0:
+            return 0
+        self._file.seek(self._start + self._pos)
+        data = self._file.read(count)
+        buffer[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+class ExportArchive:
+    """
+    A Notion export read straight from its ZIP file
+
+    Members are streamed from the archive on demand. Large exports that
+    Notion splits into Part-N.zip files inside one outer ZIP are opened in
+    place, provided the parts are stored uncompressed in the outer file.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._archives = [zipfile.ZipFile(self.path)]
+        self._members: Dict[str, Tuple[zipfile.ZipFile, zipfile.ZipInfo]] = {}
+        try:
+            self._index(self._archives[0])
+        except Exception:
+            self.close()
+            raise
+
+    def _index(self, archive: zipfile.ZipFile) -> None:
+        for info in archive.infolist():
+            name = info.filename
+            if info.is_dir() or name.startswith(IGNORED_PREFIXES):
+                continue
+            if name.lower().endswith('.zip') and archive is self._archives[0]:
+                self._index(self._open_part(info))
+                continue
+            self._members[posixpath.normpath(name)] = (archive, info)
+
+    def _open_part(self, info: zipfile.ZipInfo) -> zipfile.ZipFile:
+        """Open a nested Part-N.zip without extracting it"""
+        if info.compress_type != zipfile.ZIP_STORED:
+            raise ValueError(
+                f"{info.filename} is compressed inside {self.path.name}; "
+                "extract the outer archive first"
+            )
+        with open(self.path, 'rb') as f:
+            f.seek(info.header_offset)
+            signature, name_length, extra_length = LOCAL_HEADER.unpack(f.read(LOCAL_HEADER.size))
+        if signature != LOCAL_HEADER_SIGNATURE:
+            raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+        start = info.header_offset + LOCAL_HEADER.size + name_length + extra_length
+        window = io.BufferedReader(_MemberWindow(self.path, start, info.file_size))
+        try:
+            part = zipfile.ZipFile(window)
+        except Exception:
+            window.close()
+            raise
+        self._archives.append(part)
+        return part
+
+    def pages(self) -> List[str]:
+        """Keys (POSIX paths inside the archive) of all pages, sorted"""
+        return sorted(key for key in self._members if key.endswith('.md'))
+
+    def exists(self, key: str) -> bool:
+        return key in self._members
+
+    def _member(self, key: str) -> Tuple[zipfile.ZipFile, zipfile.ZipInfo]:
+        try:
+            return self._members[key]
+        except KeyError:
+            raise FileNotFoundError(f"{key} is not in {self.path.name}") from None
+
+    def fingerprint(self, key: str) -> List[int]:
+        """[size, CRC-32] of a member, used to detect changed attachments"""
+        _, info = self._member(key)
+        return [info.file_size, info.CRC]
+
+    def modified(self, key: str) -> float:
+        _, info = self._member(key)
+        return datetime(*info.date_time).timestamp()
+
+    def open(self, key: str) -> BinaryIO:
+        archive, info = self._member(key)
+        return archive.open(info)
+
+    def read_bytes(self, key: str) -> bytes:
+        with self.open(key) as f:
+            return f.read()
+
+    def probe_size(self, key: str) -> Optional[Size]:
+        with self.open(key) as f:
+            return probe_stream(f)
+
+    def copy_to(self, key: str, dest: Path) -> None:
+        """Stream a member to dest, replacing it atomically"""
+        tmp_dest = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with self.open(key) as source, open(tmp_dest, 'wb') as target:
+                shutil.copyfileobj(source, target, 1 << 20)
+            os.replace(tmp_dest, dest)
+        except BaseException:
+            tmp_dest.unlink(missing_ok=True)
+            raise
+
+    def close(self) -> None:
+        for archive in reversed(self._archives):
+            window = archive.fp if archive.filename is None else None
+            archive.close()
+            if window is not None:
+                window.close()  # A ZipFile never closes a file object it was given
+
+
+def open_export(path: Union[str, Path]) -> Union[ExportDirectory, ExportArchive]:
+    """
+    Open a Notion export given as a folder or a .zip file
+
+    Args:
+        path: Export folder or ZIP archive
+
+    Returns:
+        ExportDirectory or ExportArchive (close it when done)
+    """
+    path = Path(path)
+    if path.is_file() and zipfile.is_zipfile(path):
+        return ExportArchive(path)
+    return ExportDirectory(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='List or print pages of a Notion export folder or ZIP without extracting it'
+    )
+    parser.add_argument(
+        'export',
+        help='Export folder or .zip file'
+    )
+    parser.add_argument(
+        '--cat',
+        metavar='KEY',
+        help='Print one page (e.g. to pipe into content_analyzer.py --content-file -)'
+    )
+    args = parser.parse_args()
+
+    try:
+        export = open_export(args.export)
+        try:
+            if args.cat:
+                sys.stdout.buffer.write(export.read_bytes(args.cat))
+                sys.stdout.flush()
+            else:
+                for key in export.pages():
+                    print(f"{key}\t{title_from_name(posixpath.basename(key))}")
+        finally:
+            export.close()
+
+    except Exception as e:
+        print(f"✗ Error: {e}")
+        exit(1)
+
+
+if __name__ == '__main__':
+    main()
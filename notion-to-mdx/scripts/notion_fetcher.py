@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+"""
+Notion API fetcher for Notion to MDX
+Walks pages and their block children through the Notion API within its
+rate limit, keeping a local block cache so unchanged pages and subtrees
+are never fetched twice
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+import requests
+
+from image_processor import RETRY_ERRORS, RETRY_STATUSES, new_session, retry_delay
+from text_io import DEFAULT_CACHE_DIR, open_atomic, open_output
+
+DEFAULT_BLOCK_CACHE = DEFAULT_CACHE_DIR / 'notion_blocks.sqlite3'
+
+# The API root can point at a local stand-in server for testing
+DEFAULT_API_URL = os.environ.get('NOTION_API_URL', 'https://api.notion.com')
+NOTION_VERSION = '2022-06-28'
+
+# Notion allows an average of three requests per second per integration
+DEFAULT_RATE = 3.0
+
+# Largest page the block children endpoint returns
+PAGE_SIZE = 100
+
+# Blocks whose children are separate pages, rendered by title only
+CHILD_PAGE_TYPES = {'child_page', 'child_database'}
+
+PAGE_ID_PATTERN = re.compile(
+    r'([0-9a-f]{8})-?([0-9a-f]{4})-?([0-9a-f]{4})-?([0-9a-f]{4})-?([0-9a-f]{12})(?:[?#]|$)',
+    re.IGNORECASE
+)
+
+
+class NotionAPIError(requests.HTTPError):
+    """Error response from the Notion API, with its status and error code"""
+
+    def __init__(self, status: int, code: str, message: str):
+        super().__init__(f"{status} {code}: {message}")
+        self.status = status
+        self.code = code
+
+
+class TokenBucket:
+    """
+    Token-bucket scheduler shared by all request threads
+
+    Each request reserves a token under the lock and sleeps outside it
+    until the token is due, so concurrent workers together never exceed
+    the rate while short bursts up to the capacity go out at once. A 429
+    pauses the whole bucket, since Notion's limit is per integration.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a request is allowed"""
+        if self.rate <= 0:
+            # No rate limit, but a 429 pause still holds
+            with self._lock:
+                delay = self._updated - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now > self._updated:
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+            self._tokens -= 1
+            ready = self._updated + max(0.0, -self._tokens) / self.rate
+        delay = ready - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every request for seconds, e.g. after a 429"""
+        with self._lock:
+            until = time.monotonic() + seconds
+            if until > self._updated:
+                self._updated = until
+                self._tokens = min(self._tokens, 0.0)
+
+
+class NotionClient:
+    """
+    Minimal Notion API client for reading pages and block children
+
+    All requests share one keep-alive session and one token bucket, so
+    the client can be used from many threads at once.
+    """
+
+    def __init__(self, token: str, api_url: str = DEFAULT_API_URL,
+                 rate: float = DEFAULT_RATE, workers: int = 3,
+                 timeout: float = 30.0, retries: int = 5, backoff: float = 1.0):
+        self.api_url = api_url.rstrip('/')
+        self.bucket = TokenBucket(rate)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+        self.session = new_session(workers)
+        self.session.headers.update({
+            'Authorization': f"Bearer {token}",
+            'Notion-Version': NOTION_VERSION,
+        })
+
+    def count(self, key: str) -> None:
+        """Add one to a request statistic"""
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def get(self, path: str, params: Optional[dict] = None) -> dict:
+        """
+        GET an API path, waiting for the rate limit and retrying throttling
+
+        A 429 pauses the shared bucket for the Retry-After time; other
+        retryable statuses and connection errors back off per request.
+
+        Args:
+            path: Path below the API root, e.g. '/v1/pages/<id>'
+            params: Query parameters
+
+        Returns:
+            Decoded JSON response
+
+        Raises:
+            NotionAPIError: On an error response that is not retried
+        """
+        url = f"{self.api_url}{path}"
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            self.count('requests')
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except RETRY_ERRORS:
+                if attempt == self.retries:
+                    raise
+                time.sleep(retry_delay(attempt, self.backoff))
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                delay = retry_delay(attempt, self.backoff, response)
+                if response.status_code == 429:
+                    self.count('throttled')
+                    self.bucket.pause(delay)
+                else:
+                    time.sleep(delay)
+                continue
+
+            if response.status_code >= 400:
+                try:
+                    body = response.json()
+                except ValueError:
+                    body = {}
+                raise NotionAPIError(response.status_code, body.get('code', 'error'),
+                                     body.get('message', response.reason or ''))
+            return response.json()
+
+    def retrieve_page(self, page_id: str) -> dict:
+        """Fetch a page object (properties and last_edited_time)"""
+        return self.get(f"/v1/pages/{page_id}")
+
+    def list_children(self, block_id: str) -> List[dict]:
+        """
+        Fetch every child of a block or page, following pagination cursors
+
+        Args:
+            block_id: Block or page id
+
+        Returns:
+            Child blocks in order, without their own children
+        """
+        children = []
+        params = {'page_size': PAGE_SIZE}
+        while True:
+            data = self.get(f"/v1/blocks/{block_id}/children", params)
+            children.extend(data.get('results', []))
+            if not data.get('has_more') or not data.get('next_cursor'):
+                return children
+            params = {'page_size': PAGE_SIZE, 'start_cursor': data['next_cursor']}
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def page_id_from_url(value: str) -> str:
+    """
+    Get a page id from a Notion URL or a bare id
+
+    Args:
+        value: Page URL (the id is the trailing 32 hex digits) or id
+
+    Returns:
+        Dashed page id
+
+    Raises:
+        ValueError: If no id is found
+    """
+    match = PAGE_ID_PATTERN.search(value.strip())
+    if not match:
+        raise ValueError(f"No Notion page id in {value!r}")
+    return '-'.join(part.lower() for part in match.groups())
+
+
+def open_block_cache(path: Union[str, Path] = DEFAULT_BLOCK_CACHE) -> sqlite3.Connection:
+    """
+    Open (creating if needed) the SQLite block cache
+
+    Each row holds the direct children of one page or block, stored with
+    the last_edited_time of the page they belong to when they were fetched.
+
+    Args:
+        path: Database file
+
+    Returns:
+        Open connection
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path))
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS children ('
+        ' id TEXT PRIMARY KEY,'
+        ' last_edited_time TEXT NOT NULL,'
+        ' blocks TEXT NOT NULL)'
+    )
+    return conn
+
+
+def get_cached_children(conn: sqlite3.Connection, block_id: str,
+                        last_edited_time: Optional[str]) -> Optional[List[dict]]:
+    """
+    Look up the cached children of a block
+
+    Args:
+        conn: Block cache connection
+        block_id: Block or page id
+        last_edited_time: The current last_edited_time of the block's page
+
+    Returns:
+        Child blocks, or None if they are not cached or the page changed
+    """
+    if not last_edited_time:
+        return None
+    row = conn.execute(
+        'SELECT last_edited_time, blocks FROM children WHERE id = ?', (block_id,)
+    ).fetchone()
+    if row is None or row[0] != last_edited_time:
+        return None
+    return json.loads(row[1])
+
+
+def store_children(conn: sqlite3.Connection, block_id: str, last_edited_time: Optional[str],
+                   blocks: List[dict]) -> None:
+    """
+    Save the direct children of a block
+
+    Args:
+        conn: Block cache connection
+        block_id: Block or page id
+        last_edited_time: The last_edited_time of the block's page when fetched
+        blocks: Child blocks, without their own children
+    """
+    if not last_edited_time:
+        return
+    with conn:
+        conn.execute(
+            'INSERT OR REPLACE INTO children (id, last_edited_time, blocks) VALUES (?, ?, ?)',
+            (block_id, last_edited_time, json.dumps(blocks, separators=(',', ':')))
+        )
+
+
+def fetch_pages(client: NotionClient, page_ids: Iterable[str],
+                cache: Optional[sqlite3.Connection] = None,
+                workers: int = 3, refresh: bool = False) -> Dict[str, dict]:
+    """
+    Fetch pages with their full block trees
+
+    Requests for all pages run concurrently on a thread pool, paced by
+    the client's token bucket; pagination within one block follows its
+    cursors in order. Each page object is fetched first: if its
+    last_edited_time matches the cache, the whole tree is read from the
+    cache without further requests. Otherwise the whole tree is fetched
+    again. Nested blocks are validated by their page's timestamp, not
+    their own, since Notion does not always bump a container block's
+    last_edited_time when only a block inside it changes. Child pages
+    and databases are not descended into, as the converter renders them
+    by title only.
+
+    A page whose requests fail is reported in the result; the other
+    pages are still fetched. Page ids may be given dashed, undashed or
+    as page URLs; the cache and the result always use the dashed id.
+
+    Args:
+        client: API client
+        page_ids: Page ids or URLs to fetch
+        cache: Block cache connection (None disables the cache)
+        workers: Maximum concurrent requests
+        refresh: Fetch every block without reading the cache (fetched
+            blocks are still stored)
+
+    Returns:
+        Dict of page id -> {'page': page object, 'results': blocks with
+        'children' filled in}, ready for block_converter.iter_markdown,
+        or {'error': message} for a page that could not be fetched
+
+    Raises:
+        ValueError: If a page id is not a Notion id or URL
+    """
+    page_ids = list(dict.fromkeys(page_id_from_url(page_id) for page_id in page_ids))
+    pages = {}
+    failed = {}
+    # Blocks (or page stubs) waiting for their children, resolved from the
+    # cache when possible; edited is the last_edited_time of their page
+    unresolved = deque()
+    pending = {}
+
+    def resolve(parent: dict, block_id: str, edited: Optional[str], page_id: str) -> None:
+        if page_id in failed:
+            return
+        cached = None
+        if cache is not None and not refresh:
+            cached = get_cached_children(cache, block_id, edited)
+        if cached is not None:
+            client.count('cached')
+            attach(parent, block_id, edited, page_id, cached, fetched=False)
+        else:
+            future = executor.submit(client.list_children, block_id)
+            pending[future] = (parent, block_id, edited, page_id)
+
+    def attach(parent: dict, block_id: str, edited: Optional[str], page_id: str,
+               children: List[dict], fetched: bool) -> None:
+        if fetched and cache is not None:
+            store_children(cache, block_id, edited, children)
+        parent['children'] = children
+        for child in children:
+            if child.get('has_children') and child.get('type') not in CHILD_PAGE_TYPES:
+                unresolved.append((child, child['id'], edited, page_id))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for page_id in page_ids:
+            future = executor.submit(client.retrieve_page, page_id)
+            pending[future] = (None, page_id, None, page_id)
+
+        while pending or unresolved:
+            while unresolved:
+                resolve(*unresolved.popleft())
+            if not pending:
+                continue
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                parent, block_id, edited, page_id = pending.pop(future)
+                if page_id in failed:
+                    continue
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # Drop the partial tree; requests still in flight are ignored
+                    failed[page_id] = str(e)
+                    pages.pop(page_id, None)
+                    continue
+                if parent is None:
+                    # A page object: its blocks are the page's children
+                    stub = {}
+                    pages[page_id] = {'page': result, 'stub': stub}
+                    unresolved.append((stub, page_id, result.get('last_edited_time'), page_id))
+                else:
+                    attach(parent, block_id, edited, page_id, result, fetched=True)
+
+    fetched = {
+        page_id: {'page': entry['page'], 'results': entry['stub'].get('children', [])}
+        for page_id, entry in pages.items()
+    }
+    fetched.update((page_id, {'error': error}) for page_id, error in failed.items())
+    return fetched
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Fetch Notion pages as block JSON within the API rate limit, with a local cache'
+    )
+    parser.add_argument(
+        '--page',
+        action='append',
+        required=True,
+        help='Page id or URL to fetch (may be repeated)'
+    )
+    parser.add_argument(
+        '--output',
+        help='Write the page as block JSON to this file (single page; default: stdout)'
+    )
+    parser.add_argument(
+        '--output-dir',
+        help='Write each page to <page-id>.json in this directory'
+    )
+    parser.add_argument(
+        '--token',
+        default=os.environ.get('NOTION_TOKEN'),
+        help='Integration token (default: $NOTION_TOKEN)'
+    )
+    parser.add_argument(
+        '--api-url',
+        default=DEFAULT_API_URL,
+        help=f'API root, e.g. a local stand-in server (default: {DEFAULT_API_URL})'
+    )
+    parser.add_argument(
+        '--rate',
+        type=float,
+        default=DEFAULT_RATE,
+        help=f'Average requests per second (default: {DEFAULT_RATE:g})'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=3,
+        help='Maximum concurrent requests (default: 3)'
+    )
+    parser.add_argument(
+        '--cache',
+        default=str(DEFAULT_BLOCK_CACHE),
+        help=f'SQLite block cache (default: {DEFAULT_BLOCK_CACHE})'
+    )
+    parser.add_argument(
+        '--refresh',
+        action='store_true',
+        help='Ignore the cache and fetch every block (the cache is still updated)'
+    )
+    args = parser.parse_args()
+
+    if not args.token:
+        parser.error("--token or NOTION_TOKEN is required")
+    if len(args.page) > 1 and not args.output_dir:
+        parser.error("Fetching several pages requires --output-dir")
+
+    try:
+        client = NotionClient(args.token, args.api_url, args.rate, args.workers)
+        conn = open_block_cache(args.cache)
+        start = time.perf_counter()
+        try:
+            pages = fetch_pages(client, args.page, conn, args.workers, args.refresh)
+        finally:
+            client.close()
+            conn.close()
+
+        failed = 0
+        for page_id, tree in pages.items():
+            if 'error' in tree:
+                failed += 1
+                print(f"✗ {page_id}: {tree['error']}", file=sys.stderr)
+                continue
+            if args.output_dir:
+                with open_atomic(Path(args.output_dir) / f"{page_id}.json") as output:
+                    json.dump(tree, output, ensure_ascii=False)
+            else:
+                with open_output(args.output) as output:
+                    json.dump(tree, output, ensure_ascii=False)
+                    output.write('\n')
+
+        stats = client.stats
+        print(f"{'⚠' if failed else '✓'} Fetched {len(pages) - failed} page(s) "
+              f"with {stats['requests']} requests "
+              f"({stats['cached']} block lists from cache, {stats['throttled']} throttled) "
+              f"in {time.perf_counter() - start:.1f}s"
+              + (f"; {failed} failed" if failed else ''), file=sys.stderr)
+        if failed:
+            exit(1)
+
+    except Exception as e:
+        print(f"✗ Error: {e}")
+        exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+In-process conversion pipeline for Notion to MDX
+Runs analysis, link rewriting, image handling and MDX building for a
+page in one process, keeping indexes, sessions and the image manifest
+loaded between pages
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from block_converter import iter_markdown
+from content_analyzer import analyze_content, load_theme_index
+from image_processor import new_session
+from image_store import DEFAULT_IMAGE_STORE, load_image_manifest
+from mdx_builder import build_mdx, validate_inputs, write_mdx
+from metrics import add_metrics_arguments, increment, instrumented, stage
+from notion_export import open_export
+from site_builder import FALLBACK_TAG, ExportSource, page_title, rewrite_images
+from text_io import DEFAULT_CACHE_DIR, STDIO, iter_text_lines, open_output, read_text
+from url_converter import convert_urls_to_markdown, extract_link_urls
+
+# Pipeline shared by convert() calls that do not pass their own
+_default_pipeline = None
+
+
+def notion_page_title(page: dict) -> Optional[str]:
+    """
+    Get the title property of a Notion API page object
+
+    Args:
+        page: Page object (as saved by notion_fetcher.py)
+
+    Returns:
+        Plain-text title, or None if the page has none
+    """
+    for prop in (page.get('properties') or {}).values():
+        if isinstance(prop, dict) and prop.get('type') == 'title':
+            title = ''.join(item.get('plain_text', '') for item in prop.get('title', []))
+            return ' '.join(title.split()) or None
+    return None
+
+
+class Pipeline:
+    """
+    Converts pages to MDX with every stage in this process
+
+    State that is costly to set up is created once and reused for every
+    page: the theme and corpus indexes, the pooled HTTP session and the
+    image store manifest, and the exports pages refer to by path. A
+    long-lived worker keeps one Pipeline and
+    calls convert for each page; the manifest is saved after each page's
+    downloads, so a worker can be stopped between pages.
+    """
+
+    def __init__(self, max_tags: int = 5, themes_path: Optional[str] = None,
+                 corpus_index_path: Optional[str] = None, download: bool = True,
+                 store_dir: Optional[Path] = DEFAULT_IMAGE_STORE,
+                 fetch_titles: bool = False, workers: int = 8):
+        self.max_tags = max_tags
+        self.download = download
+        self.store_dir = Path(store_dir) if store_dir and download else None
+        self.fetch_titles = fetch_titles
+        self.workers = workers
+
+        self.theme_index = load_theme_index(themes_path, DEFAULT_CACHE_DIR) if themes_path else None
+        self.corpus_index = None
+        if corpus_index_path:
+            from corpus_index import load_corpus_index
+            self.corpus_index = load_corpus_index(corpus_index_path)
+
+        self.session = new_session(workers) if download else None
+        self.manifest = load_image_manifest(self.store_dir) if self.store_dir else None
+        self.exports: Dict[str, ExportSource] = {}
+
+    def export(self, source) -> Optional[ExportSource]:
+        """
+        Export a page refers to, opened once per path
+
+        Args:
+            source: Export folder or ZIP path (as sent in JSON lines), an
+                already open ExportDirectory/ExportArchive, or None
+
+        Returns:
+            Open export, or None
+        """
+        if source is None or not isinstance(source, (str, Path)):
+            return source
+        path = str(Path(source).resolve())
+        if path not in self.exports:
+            self.exports[path] = open_export(path)
+        return self.exports[path]
+
+    def markdown(self, page: dict) -> str:
+        """Page body as Markdown, from 'content' or converted from 'blocks'"""
+        if page.get('content') is not None:
+            content = page['content']
+            return content if isinstance(content, str) else ''.join(content)
+        blocks = page.get('blocks')
+        if blocks is None:
+            raise ValueError("Page needs 'content' (Markdown) or 'blocks' (Notion blocks)")
+        with stage('convert_blocks'):
+            return ''.join(iter_markdown(blocks))
+
+    def rewrite_links(self, text: str) -> str:
+        """Turn plain URLs into Markdown links, with fetched titles if enabled"""
+        link_titles = None
+        if self.fetch_titles:
+            from link_titles import resolve_link_titles
+            link_titles = resolve_link_titles(extract_link_urls(text), workers=self.workers)
+        return convert_urls_to_markdown(text, link_titles)
+
+    def place_images(self, text: str, photos_dir: Path, export=None,
+                     key: Optional[str] = None) -> Tuple[str, List[str], List[str]]:
+        """
+        Place a page's images in its photos folder and wrap them for MDX
+
+        Remote images are downloaded through the shared session and
+        manifest; local ones are copied out of the export, if given.
+
+        Args:
+            text: Page markdown
+            photos_dir: Folder the images are saved into
+            export: Export folder or archive the page comes from
+            key: Page key in the export
+
+        Returns:
+            (markdown, placed filenames, warnings)
+        """
+        return rewrite_images(
+            text, key, photos_dir, export, self.download, self.store_dir,
+            self.session, self.manifest, self.workers
+        )
+
+    def convert(self, page: dict) -> dict:
+        """
+        Convert one page
+
+        Args:
+            page: Dict with the page body as 'content' (Markdown string or
+                lines) or 'blocks' (Notion API blocks, children inline),
+                and optionally 'page' (Notion page object), 'title',
+                'date', 'tags' (skips analysis), 'output' (MDX path;
+                images go to photos/ beside it) and 'export' with 'key'
+                (the export the page is in, for local images: a folder
+                or ZIP path, or an open export)
+
+        Returns:
+            Dict with title, date, tags, themes, images (placed file
+            names), warnings (images that failed), seconds and either
+            output (written path) or mdx (the file contents, when no
+            output was given)
+        """
+        start = time.perf_counter()
+        text = self.markdown(page)
+        notion_page = page.get('page') or {}
+        output = page.get('output')
+
+        title = page.get('title') or notion_page_title(notion_page) or page_title(text, 'Untitled')
+        post_date = page.get('date') or (notion_page.get('created_time') or '')[:10] \
+            or date.today().isoformat()
+
+        themes = []
+        tags = page.get('tags')
+        if tags is None:
+            with stage('analyze'):
+                tags, themes = analyze_content(text, self.max_tags, self.theme_index, self.corpus_index)
+            tags = tags[:10] or [FALLBACK_TAG]
+        validate_inputs(title, post_date, tags)
+
+        body = self.rewrite_links(text)
+        images = []
+        warnings = []
+        if output is not None and output != STDIO:
+            with stage('images'):
+                body, images, warnings = self.place_images(
+                    body, Path(output).parent / 'photos', self.export(page.get('export')),
+                    page.get('key')
+                )
+
+        result = {'title': title, 'date': post_date, 'tags': tags, 'themes': themes}
+        if output is None:
+            result['mdx'] = build_mdx(title, post_date, tags, body)
+        elif output == STDIO:
+            with open_output(output) as stream:
+                stream.write(build_mdx(title, post_date, tags, body))
+            result['output'] = output
+        else:
+            result['output'] = str(write_mdx(output, title, post_date, tags, body))
+        result['images'] = images
+        result['warnings'] = warnings
+        result['seconds'] = round(time.perf_counter() - start, 3)
+        increment('pages_converted')
+        return result
+
+    def close(self) -> None:
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+        for export in self.exports.values():
+            export.close()
+        self.exports.clear()
+
+    def __enter__(self) -> 'Pipeline':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def convert(page: dict, pipeline: Optional[Pipeline] = None) -> dict:
+    """
+    Convert one page with a shared default pipeline
+
+    Args:
+        page: Page dict (see Pipeline.convert)
+        pipeline: Pipeline to use (a default one is created on first use)
+
+    Returns:
+        Conversion result (see Pipeline.convert)
+    """
+    global _default_pipeline
+    if pipeline is None:
+        if _default_pipeline is None:
+            _default_pipeline = Pipeline()
+        pipeline = _default_pipeline
+    return pipeline.convert(page)
+
+
+def iter_jsonl_results(pipeline: Pipeline, lines: Iterable[str]) -> Iterator[dict]:
+    """
+    Convert pages given as JSON lines, one result per page
+
+    A failing page yields an 'error' entry instead of stopping the
+    stream, so one worker can serve many requests.
+
+    Args:
+        pipeline: Pipeline to convert with
+        lines: JSON page objects, one per line
+
+    Yields:
+        Results, with the page's 'id' (if any) copied over
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        page = {}
+        try:
+            page = json.loads(line)
+            result = pipeline.convert(page)
+        except Exception as e:
+            result = {'error': str(e)}
+        if isinstance(page, dict) and 'id' in page:
+            result['id'] = page['id']
+        yield result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Convert a page to MDX in one process: tags, links, images and frontmatter'
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        '--content-file',
+        metavar='FILE',
+        help='Markdown page to convert (- for stdin)'
+    )
+    source.add_argument(
+        '--blocks-file',
+        metavar='FILE',
+        help='Notion block JSON to convert, e.g. from notion_fetcher.py (- for stdin)'
+    )
+    source.add_argument(
+        '--jsonl',
+        metavar='FILE',
+        help='Worker mode: convert one JSON page object per line of FILE (- for stdin), '
+             'printing one JSON result line each'
+    )
+    parser.add_argument(
+        '--output',
+        help='MDX file to write (images go to photos/ beside it; - for stdout)'
+    )
+    parser.add_argument(
+        '--title',
+        help='Post title (default: Notion page title or first heading)'
+    )
+    parser.add_argument(
+        '--date',
+        help='Post date in YYYY-MM-DD format (default: page creation date or today)'
+    )
+    parser.add_argument(
+        '--tags',
+        help='Comma-separated tags (default: suggested by the content analyzer)'
+    )
+    parser.add_argument(
+        '--max-tags',
+        type=int,
+        default=5,
+        help='Maximum number of suggested tags (default: 5)'
+    )
+    parser.add_argument(
+        '--themes',
+        metavar='FILE',
+        help='Theme vocabulary file (JSON or YAML) used for tag analysis'
+    )
+    parser.add_argument(
+        '--corpus-index',
+        help='Corpus index built by corpus_index.py; ranks keywords by TF-IDF'
+    )
+    parser.add_argument(
+        '--fetch-titles',
+        action='store_true',
+        help='Use fetched page titles as link text (cached)'
+    )
+    parser.add_argument(
+        '--no-download',
+        action='store_true',
+        help='Leave remote images as links instead of downloading them'
+    )
+    parser.add_argument(
+        '--store',
+        metavar='DIR',
+        help='Content-addressed image store (default: ~/.cache/notion-to-mdx/images)'
+    )
+    parser.add_argument(
+        '--no-store',
+        action='store_true',
+        help='Download images without the image store'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=8,
+        help='Maximum concurrent image downloads (default: 8)'
+    )
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    if not args.jsonl and not args.output:
+        parser.error("--output is required unless --jsonl is used")
+
+    with instrumented(args):
+        store_dir = None
+        if not args.no_store:
+            store_dir = Path(args.store) if args.store else DEFAULT_IMAGE_STORE
+
+        try:
+            with Pipeline(args.max_tags, args.themes, args.corpus_index, not args.no_download,
+                          store_dir, args.fetch_titles, args.workers) as pipeline:
+                if args.jsonl:
+                    failed = 0
+                    for result in iter_jsonl_results(pipeline, iter_text_lines(args.jsonl)):
+                        failed += 'error' in result
+                        sys.stdout.write(json.dumps(result, ensure_ascii=False) + '\n')
+                        sys.stdout.flush()
+                    exit(1 if failed else 0)
+
+                page = {'output': args.output, 'title': args.title, 'date': args.date}
+                if args.tags:
+                    page['tags'] = [tag.strip() for tag in args.tags.split(',') if tag.strip()]
+                if args.content_file:
+                    page['content'] = read_text(args.content_file)
+                else:
+                    data = json.loads(read_text(args.blocks_file))
+                    if isinstance(data, dict):
+                        page['page'] = data.get('page')
+                        data = data.get('results', [])
+                    page['blocks'] = data
+                result = pipeline.convert(page)
+
+            report = sys.stderr if args.output == STDIO else sys.stdout
+            failed = result['warnings']
+            print(f"✓ MDX file created: {result['output']} ({result['seconds']}s)", file=report)
+            print(f"  Title: {result['title']}", file=report)
+            print(f"  Date: {result['date']}", file=report)
+            print(f"  Tags: {', '.join(result['tags'])}", file=report)
+            if result['images'] or failed:
+                print(f"  Images: {len(result['images'])} placed, {len(failed)} failed",
+                      file=report)
+            for warning in failed:
+                print(f"  ! {warning}", file=report)
+
+        except ValueError as e:
+            print(f"✗ Validation error: {e}")
+            exit(1)
+        except Exception as e:
+            print(f"✗ Error: {e}")
+            exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Tag and search index generator for Notion to MDX
+Writes a tag -> posts map and a sharded inverted index of post keywords
+that the site can lazy-load in the browser, updating only what a changed
+post touches
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Union
+
+from content_analyzer import extract_keywords, iter_lines, strip_frontmatter
+from corpus_index import iter_posts
+from mdx_builder import read_frontmatter, strip_footer
+from text_io import open_atomic
+
+# Bump when the output layout changes; older indexes are rebuilt
+SEARCH_INDEX_VERSION = 2
+
+# Private bookkeeping kept next to the published files
+STATE_NAME = '.search-state.json.gz'
+
+# Term shards; at a few hundred terms each, a shard is a few KB gzipped
+DEFAULT_SHARDS = 64
+
+# Keywords kept per post, highest weight first
+MAX_TERMS_PER_POST = 200
+
+FNV_OFFSET = 0x811C9DC5
+FNV_PRIME = 0x01000193
+
+
+def term_shard(term: str, shards: int) -> int:
+    """
+    Pick the shard a term lives in
+
+    FNV-1a over the UTF-8 bytes, so the browser can compute the same
+    shard with a few lines of JavaScript.
+
+    Args:
+        term: Lowercase keyword
+        shards: Number of shards
+
+    Returns:
+        Shard number in [0, shards)
+    """
+    value = FNV_OFFSET
+    for byte in term.encode('utf-8'):
+        value = ((value ^ byte) * FNV_PRIME) & 0xFFFFFFFF
+    return value % shards
+
+
+def shard_path(output_dir: Path, shard: int) -> Path:
+    """Path of one term shard"""
+    return output_dir / 'terms' / f"{shard:03d}.json"
+
+
+def post_slug(key: str) -> str:
+    """Slug of a post from its key (slug/index.mdx or slug.mdx)"""
+    path = Path(key)
+    if path.stem == 'index' and path.parent.name:
+        return path.parent.as_posix()
+    return path.with_suffix('').as_posix()
+
+
+def new_search_state(shards: int = DEFAULT_SHARDS) -> dict:
+    """
+    Create empty index state
+
+    Returns:
+        State dict with 'documents' (key -> entry), 'next_id' and 'shards'
+    """
+    return {'version': SEARCH_INDEX_VERSION, 'shards': shards, 'next_id': 0, 'documents': {}}
+
+
+def load_search_state(output_dir: Union[str, Path]) -> dict:
+    """
+    Load the state of a previously written index
+
+    Args:
+        output_dir: Index directory
+
+    Returns:
+        State dict (empty if missing or from an older version)
+    """
+    path = Path(output_dir) / STATE_NAME
+    if not path.exists():
+        return new_search_state()
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        state = json.load(f)
+    if state.get('version') != SEARCH_INDEX_VERSION:
+        return new_search_state()
+    return state
+
+
+def save_search_state(state: dict, output_dir: Union[str, Path]) -> None:
+    """Write the index state atomically as gzipped JSON"""
+    path = Path(output_dir) / STATE_NAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        json.dump(state, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def read_post(path: Path) -> dict:
+    """
+    Read the searchable fields of one post
+
+    Args:
+        path: MDX or markdown file
+
+    Returns:
+        Dict with sha1, title, date, tags and terms (keyword -> weight)
+    """
+    content = path.read_text(encoding='utf-8')
+    frontmatter = read_frontmatter(path)
+    # The footer is the same on every post and would only add noise postings
+    keywords = extract_keywords(strip_frontmatter(iter_lines(strip_footer(content))))
+
+    title = frontmatter.get('title')
+    title = title if isinstance(title, str) else ''
+    tags = frontmatter.get('tags')
+    if isinstance(tags, str):
+        tags = [tags]
+
+    # The frontmatter title is not in the body; weigh its words like a heading title
+    for word, count in extract_keywords(f"# {title}").items():
+        keywords[word] += count
+
+    return {
+        'sha1': hashlib.sha1(content.encode('utf-8')).hexdigest(),
+        'title': title,
+        'date': str(frontmatter.get('date') or ''),
+        'tags': [tag for tag in tags or [] if tag],
+        'terms': dict(keywords.most_common(MAX_TERMS_PER_POST)),
+    }
+
+
+def _write_json(path: Path, data) -> None:
+    with open_atomic(path) as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+
+
+def _index_version(output_dir: Path) -> Optional[int]:
+    """Version recorded in meta.json (None if there is no index)"""
+    path = output_dir / 'meta.json'
+    if not path.exists():
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f).get('version')
+
+
+def _load_shard(path: Path) -> Dict[str, List[int]]:
+    if not path.exists():
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _update_shards(output_dir: Path, shards: int, changes: List[tuple], rebuild: bool) -> int:
+    """
+    Apply posting changes to the shards they touch
+
+    Args:
+        output_dir: Index directory
+        shards: Number of shards
+        changes: (doc id, old terms, new terms) for each changed post;
+            terms are keyword -> weight dicts
+        rebuild: Start every shard empty instead of reading it
+
+    Returns:
+        Number of shard files written
+    """
+    dirty: Dict[int, Set[int]] = {}
+    for doc_id, old_terms, new_terms in changes:
+        for term in (*old_terms, *new_terms):
+            dirty.setdefault(term_shard(term, shards), set()).add(doc_id)
+    if rebuild:
+        for shard in range(shards):
+            dirty.setdefault(shard, set())
+
+    for shard, doc_ids in dirty.items():
+        path = shard_path(output_dir, shard)
+        postings = {} if rebuild else _load_shard(path)
+        # Postings are flat [id, weight, id, weight, ...] lists to keep shards small
+        entries = {term: dict(zip(flat[::2], flat[1::2])) for term, flat in postings.items()}
+        for doc_id, old_terms, new_terms in changes:
+            for term in old_terms:
+                if term_shard(term, shards) == shard and term in entries:
+                    entries[term].pop(doc_id, None)
+            for term, weight in new_terms.items():
+                if term_shard(term, shards) == shard:
+                    entries.setdefault(term, {})[doc_id] = weight
+
+        postings = {}
+        for term, weights in entries.items():
+            if weights:
+                ranked = sorted(weights.items(), key=lambda item: (-item[1], item[0]))
+                postings[term] = [value for pair in ranked for value in pair]
+        _write_json(path, postings)
+
+    return len(dirty)
+
+
+def _write_catalog(output_dir: Path, state: dict) -> None:
+    """Rewrite docs.json, tags.json and meta.json from the state"""
+    documents = sorted(state['documents'].items(), key=lambda item: item[1]['id'])
+    docs = {
+        str(doc['id']): {'slug': post_slug(key), 'title': doc['title'],
+                         'date': doc['date'], 'tags': doc['tags']}
+        for key, doc in documents
+    }
+
+    tags: Dict[str, List[int]] = {}
+    for _, doc in sorted(documents, key=lambda item: (item[1]['date'], item[1]['id']), reverse=True):
+        for tag in dict.fromkeys(doc['tags']):
+            tags.setdefault(tag, []).append(doc['id'])
+
+    _write_json(output_dir / 'docs.json', docs)
+    _write_json(output_dir / 'tags.json', tags)
+    _write_json(output_dir / 'meta.json', {
+        'version': SEARCH_INDEX_VERSION,
+        'shards': state['shards'],
+        'hash': 'fnv1a32',
+        'documents': 'docs.json',
+        'tags': 'tags.json',
+        'terms': 'terms/{shard:03d}.json',
+    })
+
+
+def sync_search_index(posts_dir: Union[str, Path], output_dir: Union[str, Path],
+                      shards: int = DEFAULT_SHARDS,
+                      posts: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """
+    Bring the tag and search index in line with a posts directory
+
+    Files whose size and modification time match the state are skipped
+    without being read. Only the term shards holding a changed post's old
+    or new keywords are rewritten; docs.json and tags.json are small and
+    rewritten whenever anything changed.
+
+    Args:
+        posts_dir: Root of the posts tree
+        output_dir: Index directory (e.g. public/search)
+        shards: Number of term shards; changing it rebuilds the index
+        posts: Only refresh these posts (relative to posts_dir) instead
+            of scanning the tree
+
+    Returns:
+        Counts of 'added', 'updated', 'removed', 'unchanged' and 'touched'
+        posts, plus 'shards' written
+    """
+    posts_dir = Path(posts_dir)
+    output_dir = Path(output_dir)
+    state = load_search_state(output_dir)
+    # Shards of another version (or another shard count) are not patched in place
+    rebuild = state['shards'] != shards or _index_version(output_dir) != SEARCH_INDEX_VERSION
+    if rebuild:
+        # Every posting moves when the shard count changes; keep doc ids
+        state['shards'] = shards
+    documents = state['documents']
+
+    stats = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0, 'touched': 0}
+    changes = []
+
+    if posts is None:
+        found = list(iter_posts(posts_dir))
+        removed = set(documents) - {key for key, _ in found}
+    else:
+        found = []
+        removed = set()
+        for name in posts:
+            path = posts_dir / name
+            key = path.relative_to(posts_dir).as_posix()
+            if path.exists():
+                found.append((key, path))
+            elif key in documents:
+                removed.add(key)
+
+    for key, path in found:
+        stat = path.stat()
+        doc = documents.get(key)
+        if doc is not None and doc['mtime_ns'] == stat.st_mtime_ns and doc['size'] == stat.st_size:
+            stats['unchanged'] += 1
+            continue
+
+        entry = read_post(path)
+        entry['mtime_ns'] = stat.st_mtime_ns
+        entry['size'] = stat.st_size
+        if doc is not None and doc['sha1'] == entry['sha1']:
+            doc['mtime_ns'], doc['size'] = stat.st_mtime_ns, stat.st_size
+            stats['touched'] += 1
+            continue
+
+        if doc is None:
+            entry['id'] = state['next_id']
+            state['next_id'] += 1
+            stats['added'] += 1
+        else:
+            entry['id'] = doc['id']
+            stats['updated'] += 1
+        changes.append((entry['id'], doc['terms'] if doc else {}, entry['terms']))
+        documents[key] = entry
+
+    for key in removed:
+        doc = documents.pop(key)
+        changes.append((doc['id'], doc['terms'], {}))
+        stats['removed'] += 1
+
+    if rebuild:
+        changes = [(doc['id'], {}, doc['terms']) for doc in documents.values()]
+
+    stats['shards'] = _update_shards(output_dir, shards, changes, rebuild) if changes or rebuild else 0
+    if changes or rebuild:
+        _write_catalog(output_dir, state)
+    if changes or rebuild or stats['touched']:
+        save_search_state(state, output_dir)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build or update the tag index and sharded search index for a posts tree'
+    )
+    parser.add_argument(
+        '--posts-dir',
+        required=True,
+        help='Directory containing blog posts (*.md, *.mdx)'
+    )
+    parser.add_argument(
+        '--output-dir',
+        required=True,
+        help='Directory to write docs.json, tags.json, meta.json and terms/ into'
+    )
+    parser.add_argument(
+        '--post',
+        action='append',
+        help='Only refresh this post (relative to --posts-dir); may be repeated'
+    )
+    parser.add_argument(
+        '--shards',
+        type=int,
+        default=DEFAULT_SHARDS,
+        help=f'Number of term shards (default: {DEFAULT_SHARDS}; changing it rebuilds the index)'
+    )
+    args = parser.parse_args()
+
+    try:
+        if args.shards < 1:
+            raise ValueError("--shards must be at least 1")
+        stats = sync_search_index(args.posts_dir, args.output_dir, args.shards, args.post)
+        state = load_search_state(args.output_dir)
+
+        print(f"✓ Search index: {args.output_dir}")
+        print(f"  Posts: {len(state['documents'])}  Shards written: {stats['shards']}/{args.shards}")
+        print(f"  Added: {stats['added']}  Updated: {stats['updated']}  "
+              f"Removed: {stats['removed']}  Unchanged: {stats['unchanged'] + stats['touched']}")
+
+    except Exception as e:
+        print(f"✗ Error: {e}")
+        exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,640 @@
+#!/usr/bin/env python3
+"""
+Site builder for Notion to MDX
+Converts a whole Notion markdown export (folder or ZIP) into
+slug/index.mdx + photos/ folders in parallel, skipping pages whose inputs
+have not changed
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+import time
+from collections import ChainMap
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional, TextIO, Tuple, Union
+from urllib.parse import unquote
+
+from content_analyzer import analyze_content, load_theme_index
+from image_processor import (
+    download_images, generate_alt_text_from_context, sanitize_filename, wrap_image_with_styling
+)
+from image_store import DEFAULT_IMAGE_STORE, load_image_manifest, save_image_manifest
+from mdx_builder import validate_inputs, write_mdx
+from metrics import add_metrics_arguments, enable_metrics, get_metrics, increment, instrumented, stage
+from notion_export import ExportArchive, ExportDirectory, open_export, resolve_reference, title_from_name
+from text_io import DEFAULT_CACHE_DIR, open_atomic, open_output
+from url_converter import convert_urls_to_markdown
+
+# Bump when the manifest layout changes; older manifests trigger a full rebuild
+BUILD_VERSION = 1
+
+MANIFEST_NAME = '.notion-to-mdx-build.json'
+
+# Sources whose code decides the output; any edit to them rebuilds every page
+PIPELINE_SCRIPTS = (
+    'content_analyzer.py', 'image_probe.py', 'image_processor.py', 'image_store.py',
+    'mdx_builder.py', 'notion_export.py', 'site_builder.py', 'text_io.py', 'url_converter.py',
+)
+
+TITLE_PATTERN = re.compile(r'^#[ \t]+(.+?)[ \t#]*$', re.MULTILINE)
+
+# Date properties Notion lists under the title, and the formats it uses
+DATE_PROPERTY_PATTERN = re.compile(
+    r'^(?:Date|Created|Created time|Published)[ \t]*:[ \t]*(.+?)[ \t]*$',
+    re.MULTILINE | re.IGNORECASE
+)
+DATE_FORMATS = ('%Y-%m-%d', '%B %d, %Y %I:%M %p', '%B %d, %Y', '%Y/%m/%d')
+
+# Markdown images; the target may be a URL or a path into the export
+IMAGE_PATTERN = re.compile(r'!\[([^\]\n]*)\]\(\s*<?([^)\s>]+)>?(?:\s+"[^"]*")?\s*\)')
+
+# Inline markdown removed from titles
+TITLE_MARKUP_PATTERN = re.compile(r'\[([^\]]*)\]\([^)]*\)|[*_`~]+')
+
+# Tag used when a page yields no keywords, since posts need at least one
+FALLBACK_TAG = 'notion'
+
+ExportSource = Union[ExportDirectory, ExportArchive]
+
+# Per-process state for build workers, set once by _init_build_worker
+_build_options = {}
+
+
+def script_version() -> str:
+    """
+    Fingerprint the pipeline code
+
+    Returns:
+        Short hash of the pipeline scripts' source
+    """
+    digest = hashlib.sha256()
+    scripts_dir = Path(__file__).resolve().parent
+    for name in PIPELINE_SCRIPTS:
+        digest.update(name.encode())
+        digest.update((scripts_dir / name).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def load_build_manifest(output_dir: Path) -> dict:
+    """
+    Load the manifest of a previous build
+
+    Args:
+        output_dir: Site output directory
+
+    Returns:
+        Manifest with 'version', 'script_version', 'options' and 'pages'
+        (key -> entry); empty if there is none or its layout is outdated
+    """
+    path = output_dir / MANIFEST_NAME
+    empty = {'version': BUILD_VERSION, 'script_version': None, 'options': None, 'pages': {}}
+    if not path.exists():
+        return empty
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != BUILD_VERSION:
+        return empty
+    return manifest
+
+
+def save_build_manifest(manifest: dict, output_dir: Path) -> None:
+    """Write the build manifest atomically"""
+    with open_atomic(output_dir / MANIFEST_NAME) as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+
+def page_title(text: str, key: str) -> str:
+    """
+    Get a page title from its first heading, or its file name
+
+    Args:
+        text: Page markdown
+        key: Page key in the export
+
+    Returns:
+        Title without markdown formatting or the Notion page id
+    """
+    match = TITLE_PATTERN.search(text)
+    if match:
+        title = TITLE_MARKUP_PATTERN.sub(lambda m: m.group(1) or '', match.group(1))
+    else:
+        title = title_from_name(Path(key).name)
+    return ' '.join(title.split())
+
+
+def page_date(text: str, modified: float) -> str:
+    """
+    Get a page date from a Notion date property, or the file time
+
+    Args:
+        text: Page markdown
+        modified: Modification time of the page file (seconds since the epoch)
+
+    Returns:
+        Date in YYYY-MM-DD format
+    """
+    for match in DATE_PROPERTY_PATTERN.finditer(text):
+        value = match.group(1)
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.strptime(value, fmt).date().isoformat()
+            except ValueError:
+                continue
+    return date.fromtimestamp(modified).isoformat()
+
+
+def local_images(text: str, key: str, export: ExportSource) -> List[str]:
+    """
+    Resolve the export entries a page embeds as images
+
+    Args:
+        text: Page markdown
+        key: Page key in the export
+        export: Export the page comes from
+
+    Returns:
+        Keys of existing image entries, in order of first use
+    """
+    keys = {}
+    for match in IMAGE_PATTERN.finditer(text):
+        image_key = resolve_reference(key, match.group(2))
+        if image_key is not None and export.exists(image_key):
+            keys.setdefault(image_key, None)
+    return list(keys)
+
+
+def unique_slug(title: str, key: str, taken: set) -> str:
+    """
+    Pick a folder name for a page
+
+    Args:
+        title: Page title
+        key: Page key, used to tell apart pages with the same title
+        taken: Slugs already assigned (updated)
+
+    Returns:
+        Lowercase hyphenated slug
+    """
+    slug = sanitize_filename(title).strip('.') or 'untitled'
+    if slug in taken:
+        slug = f"{slug}-{hashlib.sha1(key.encode()).hexdigest()[:8]}"
+    taken.add(slug)
+    return slug
+
+
+def plan_build(export: ExportSource, manifest: dict, options: dict,
+               version: str, force: bool = False) -> Tuple[List[dict], Dict[str, dict]]:
+    """
+    Decide which pages need converting
+
+    A page is skipped when its markdown hash and the fingerprint (size
+    and mtime, or size and CRC inside a ZIP) of every image it embeds
+    match the manifest, and the build options and script version are
+    unchanged.
+
+    Args:
+        export: Notion export folder or archive
+        manifest: Manifest of the previous build
+        options: Options that affect the output
+        version: Current script version
+        force: Convert every page
+
+    Returns:
+        (jobs, unchanged) where jobs are dicts for convert_page and
+        unchanged maps keys of skipped pages to their manifest entries
+    """
+    previous = manifest['pages']
+    reusable = (not force and manifest.get('options') == options
+                and manifest.get('script_version') == version)
+
+    pages = []
+    for key in export.pages():
+        data = export.read_bytes(key)
+        text = data.decode('utf-8', errors='replace')
+        pages.append({
+            'key': key,
+            'sha256': hashlib.sha256(data).hexdigest(),
+            'title': page_title(text, key),
+            'date': page_date(text, export.modified(key)),
+            'assets': {image: export.fingerprint(image) for image in local_images(text, key, export)},
+        })
+
+    unchanged = {}
+    for page in pages:
+        entry = previous.get(page['key'])
+        if (reusable and entry is not None
+                and entry['sha256'] == page['sha256']
+                and entry['assets'] == page['assets']
+                and all((Path(options['output_dir']) / output).exists()
+                        for output in entry['outputs'])):
+            unchanged[page['key']] = entry
+
+    # Unchanged pages keep their slugs; the rest get free ones
+    taken = {entry['slug'] for entry in unchanged.values()}
+    jobs = []
+    for page in pages:
+        if page['key'] in unchanged:
+            continue
+        page['slug'] = unique_slug(page['title'], page['key'], taken)
+        jobs.append(page)
+    return jobs, unchanged
+
+
+def _init_build_worker(options: dict, export_path: str, worker_metrics: bool = False) -> None:
+    """
+    Load the theme index and open the export once per worker process
+
+    The image store manifest is also loaded once and only read here: pages
+    return the entries they add, and the parent saves them in one write.
+    With worker_metrics, each page collects its own timings and counters
+    and returns them for the parent to merge.
+    """
+    theme_index = None
+    if options.get('themes'):
+        theme_index = load_theme_index(options['themes'])
+    image_manifest = load_image_manifest(options['store_dir']) if options.get('store_dir') else None
+    _build_options.update(options, theme_index=theme_index, export=open_export(export_path),
+                          image_manifest=image_manifest, worker_metrics=worker_metrics)
+
+
+def rewrite_images(text: str, key: Optional[str], photos_dir: Path,
+                   export: Optional[ExportSource] = None, download: bool = True,
+                   store_dir: Optional[Path] = None, session=None,
+                   manifest: Optional[dict] = None, save_manifest: bool = True,
+                   workers: int = 4) -> Tuple[str, List[str], List[str]]:
+    """
+    Copy a page's images into its photos folder and wrap them for MDX
+
+    Local images are linked from an export folder or streamed out of an
+    export ZIP; remote ones are downloaded through the image store unless
+    downloads are disabled.
+
+    Args:
+        text: Page markdown
+        key: Page key in the export (None when the page has no export)
+        photos_dir: Destination photos folder
+        export: Export the page comes from, for local images
+        download: Download remote images
+        store_dir: Image store for downloads (None disables it)
+        session: Optional HTTP session to reuse for downloads
+        manifest: Optional image store manifest already in memory
+        save_manifest: Save the image store manifest after downloading
+        workers: Maximum concurrent downloads
+
+    Returns:
+        (markdown, placed filenames, warnings)
+    """
+    placed = {}  # source (path or URL) -> (filename, width, height)
+    names = set()
+    warnings = []
+
+    def claim(name: str) -> str:
+        stem, dot, suffix = name.rpartition('.')
+        if not dot:
+            stem, suffix = name, 'jpg'
+        stem = stem or 'image'
+        candidate = f"{stem}.{suffix}"
+        counter = 2
+        while candidate in names:
+            candidate = f"{stem}-{counter}.{suffix}"
+            counter += 1
+        names.add(candidate)
+        return candidate
+
+    remote = []
+    for match in IMAGE_PATTERN.finditer(text):
+        target = match.group(2)
+        if '://' in target:
+            if download:
+                remote.append(target)
+            continue
+        if export is None or key is None:
+            continue
+        image_key = resolve_reference(key, target)
+        if target in placed or image_key is None or not export.exists(image_key):
+            continue
+        photos_dir.mkdir(parents=True, exist_ok=True)
+        name = claim(sanitize_filename(Path(image_key).name))
+        export.copy_to(image_key, photos_dir / name)
+        placed[target] = (name, *(export.probe_size(image_key) or (None, None)))
+
+    if remote:
+        results = download_images(
+            remote, photos_dir, workers=workers, session=session,
+            store_dir=store_dir, manifest=manifest, save_manifest=save_manifest,
+            reserved_names=names
+        )
+        for result in results:
+            if 'error' in result:
+                warnings.append(f"{result['url']}: {result['error']}")
+            else:
+                name = Path(result['path']).name
+                names.add(name)
+                placed[result['url']] = (name, result['width'], result['height'])
+
+    def replace(match: re.Match) -> str:
+        found = placed.get(match.group(2))
+        if found is None:
+            return match.group(0)
+        name, width, height = found
+        alt_text = match.group(1).strip()
+        source_name = Path(unquote(match.group(2)))
+        if not alt_text or alt_text in (source_name.name, source_name.stem):
+            # Notion uses the file name as alt text; fall back to a generic one
+            alt_text = generate_alt_text_from_context('')
+        return wrap_image_with_styling(f"./photos/{name}", alt_text, width=width, height=height)
+
+    return IMAGE_PATTERN.sub(replace, text), [found[0] for found in placed.values()], warnings
+
+
+def convert_page(job: dict) -> dict:
+    """
+    Convert one exported page into slug/index.mdx inside a build worker
+
+    Args:
+        job: Page dict from plan_build
+
+    Returns:
+        Manifest entry plus key, seconds and warnings, or key and error;
+        both carry the image store entries the page added
+    """
+    start = time.perf_counter()
+    metrics = enable_metrics() if _build_options.get('worker_metrics') else None
+    image_manifest = _build_options.get('image_manifest')
+    # New store entries land in the first map; the worker's copy stays read-only
+    added = {}
+    manifest = ChainMap(added, image_manifest) if image_manifest is not None else None
+    try:
+        slug_dir = Path(_build_options['output_dir']) / job['slug']
+        text = _build_options['export'].read_bytes(job['key']).decode('utf-8')
+
+        with stage('analyze'):
+            tags, _ = analyze_content(
+                text, _build_options.get('max_tags', 5), _build_options.get('theme_index')
+            )
+        tags = tags[:10] or [FALLBACK_TAG]
+        validate_inputs(job['title'], job['date'], tags)
+
+        body = convert_urls_to_markdown(text)
+        with stage('images'):
+            store_dir = _build_options.get('store_dir')
+            body, images, warnings = rewrite_images(
+                body, job['key'], slug_dir / 'photos', _build_options['export'],
+                _build_options.get('download_images', True), Path(store_dir) if store_dir else None,
+                manifest=manifest, save_manifest=False
+            )
+        write_mdx(slug_dir / 'index.mdx', job['title'], job['date'], tags, body)
+        increment('pages_converted')
+    except Exception as e:
+        result = {'key': job['key'], 'error': str(e), 'image_entries': added}
+        if metrics is not None:
+            result['metrics'] = metrics.as_dict()
+        return result
+    finally:
+        if image_manifest is not None:
+            # Later pages in this worker reuse what this one downloaded
+            image_manifest.update(added)
+
+    outputs = [f"{job['slug']}/index.mdx"] + [f"{job['slug']}/photos/{name}" for name in images]
+    return {
+        'key': job['key'],
+        'slug': job['slug'],
+        'title': job['title'],
+        'sha256': job['sha256'],
+        'assets': job['assets'],
+        'tags': tags,
+        'outputs': outputs,
+        'warnings': warnings,
+        'seconds': round(time.perf_counter() - start, 3),
+        'image_entries': added,
+        'metrics': metrics.as_dict() if metrics is not None else None,
+    }
+
+
+def build_site(export_dir: Union[str, Path], output_dir: Union[str, Path],
+               workers: Optional[int] = None, max_tags: int = 5,
+               themes_path: Optional[str] = None, download: bool = True,
+               store_dir: Optional[Path] = DEFAULT_IMAGE_STORE, force: bool = False,
+               prune: bool = False, log: TextIO = sys.stdout) -> dict:
+    """
+    Convert a Notion export into a folder of posts, incrementally
+
+    An export ZIP is read in place: pages and images are streamed from
+    the archive, so it never has to be extracted.
+
+    Args:
+        export_dir: Root of the Notion markdown export, or its .zip file
+        output_dir: Posts directory to write slug/index.mdx folders into
+        workers: Number of worker processes (default: CPU count; 1 runs inline)
+        max_tags: Maximum number of tags per post
+        themes_path: Optional theme vocabulary file
+        download: Download remote images into each post's photos folder
+        store_dir: Image store for downloads (None disables it)
+        force: Rebuild every page
+        prune: Delete folders of pages that were removed or renamed
+        log: Stream for one progress line per page
+
+    Returns:
+        Summary with counts of 'built', 'unchanged', 'failed' and
+        'removed' pages, 'seconds' and the 'failures'
+    """
+    start = time.perf_counter()
+    export_path = str(Path(export_dir).resolve())
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    options = {
+        'output_dir': str(output_dir.resolve()),
+        'max_tags': max_tags,
+        'themes': str(Path(themes_path).resolve()) if themes_path else None,
+        'download_images': download,
+        'store_dir': str(store_dir) if store_dir and download else None,
+    }
+    version = script_version()
+    manifest = load_build_manifest(output_dir)
+    export = open_export(export_path)
+    try:
+        jobs, unchanged = plan_build(export, manifest, options, version, force)
+    finally:
+        export.close()
+
+    if themes_path:
+        # Compile the theme cache once so workers only load it
+        load_theme_index(themes_path, DEFAULT_CACHE_DIR)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) <= 1:
+        _init_build_worker(options, export_path)
+        results = map(convert_page, jobs)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(min(workers, len(jobs)), _init_build_worker,
+                                    (options, export_path, get_metrics() is not None))
+        results = pool.imap_unordered(convert_page, jobs)
+
+    previous = manifest['pages']
+    pages = dict(unchanged)
+    built = []
+    failed = []
+    image_entries = {}
+    try:
+        for result in results:
+            key = result.pop('key')
+            image_entries.update(result.pop('image_entries'))
+            worker_metrics = result.pop('metrics', None)
+            if worker_metrics and get_metrics() is not None:
+                get_metrics().merge(worker_metrics)
+            if 'error' in result:
+                failed.append({'key': key, 'error': result['error']})
+                print(f"✗ {key}: {result['error']}", file=log)
+                if key in previous:
+                    # Keep the old entry, marked so the page is retried next run
+                    pages[key] = dict(previous[key], sha256=None)
+                continue
+            for warning in result.pop('warnings'):
+                print(f"  ! {key}: {warning}", file=log)
+            result.pop('seconds')
+            pages[key] = result
+            built.append(key)
+            print(f"✓ {key} -> {result['slug']}/index.mdx", file=log)
+
+            # Drop images the page no longer uses
+            if key in previous and previous[key]['slug'] == result['slug']:
+                for output in set(previous[key]['outputs']) - set(result['outputs']):
+                    (output_dir / output).unlink(missing_ok=True)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        else:
+            _build_options.pop('export').close()
+            _build_options.pop('image_manifest', None)
+        if image_entries:
+            # One read-merge-write of the store manifest for the whole build
+            image_manifest = load_image_manifest(options['store_dir'])
+            image_manifest.update(image_entries)
+            save_image_manifest(image_manifest, options['store_dir'])
+
+    present = set(unchanged) | {job['key'] for job in jobs}
+    removed = [key for key in previous if key not in present]
+    if prune:
+        live_slugs = {entry['slug'] for entry in pages.values()}
+        for entry in previous.values():
+            stale = output_dir / entry['slug']
+            if entry['slug'] not in live_slugs and stale.is_dir():
+                shutil.rmtree(stale)
+
+    save_build_manifest({
+        'version': BUILD_VERSION,
+        'script_version': version,
+        'options': options,
+        'pages': pages,
+    }, output_dir)
+
+    return {
+        'built': len(built),
+        'unchanged': len(unchanged),
+        'failed': len(failed),
+        'removed': len(removed),
+        'seconds': round(time.perf_counter() - start, 3),
+        'failures': failed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Convert a whole Notion export into MDX post folders, skipping unchanged pages'
+    )
+    parser.add_argument(
+        '--export-dir',
+        '--export',
+        dest='export_dir',
+        required=True,
+        help='Root of the Notion markdown export, or the export .zip (read without extracting)'
+    )
+    parser.add_argument(
+        '--output-dir',
+        required=True,
+        help='Posts directory to write <slug>/index.mdx and <slug>/photos/ into'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='Number of worker processes (default: CPU count)'
+    )
+    parser.add_argument(
+        '--max-tags',
+        type=int,
+        default=5,
+        help='Maximum number of tags per post (default: 5)'
+    )
+    parser.add_argument(
+        '--themes',
+        metavar='FILE',
+        help='Theme vocabulary file (JSON or YAML) used for tag analysis'
+    )
+    parser.add_argument(
+        '--no-download',
+        action='store_true',
+        help='Leave remote images as links instead of downloading them'
+    )
+    parser.add_argument(
+        '--store',
+        metavar='DIR',
+        help='Content-addressed image store (default: ~/.cache/notion-to-mdx/images)'
+    )
+    parser.add_argument(
+        '--no-store',
+        action='store_true',
+        help='Download images without the image store'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Rebuild every page, ignoring the manifest'
+    )
+    parser.add_argument(
+        '--prune',
+        action='store_true',
+        help='Delete post folders of pages that were removed or renamed'
+    )
+    parser.add_argument(
+        '--report',
+        help='Write the JSON build summary to this file'
+    )
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    with instrumented(args):
+        store_dir = None
+        if not args.no_store:
+            store_dir = Path(args.store) if args.store else DEFAULT_IMAGE_STORE
+
+        try:
+            summary = build_site(
+                args.export_dir, args.output_dir, args.workers, args.max_tags, args.themes,
+                not args.no_download, store_dir, args.force, args.prune
+            )
+            print(f"\nBuilt {summary['built']} pages, {summary['unchanged']} unchanged, "
+                  f"{summary['failed']} failed, {summary['removed']} removed "
+                  f"in {summary['seconds']}s")
+            if args.report:
+                with open_output(args.report) as output:
+                    json.dump(summary, output, indent=2)
+                    output.write('\n')
+            exit(1 if summary['failed'] else 0)
+
+        except Exception as e:
+            print(f"✗ Error: {e}")
+            exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Tests for the benchmark harness
+Checks that synthetic pages carry the images their size class calls for
+and that stages without samples are reported as skipped
+
+Run with: python -m pytest scripts/test_benchmark.py
+      or: python -m unittest discover -s scripts
+"""
+
+import re
+import unittest
+
+from benchmark import SIZE_CLASSES, compare, generate_page, run_benchmarks, summarize
+
+IMAGE_PATTERN = re.compile(r'!\[[^\]]*\]\(http')
+
+
+class GeneratePageTest(unittest.TestCase):
+
+    def test_image_count_follows_page_size(self):
+        for size in ('small', 'medium', 'large'):
+            for seed in range(3):
+                with self.subTest(size=size, seed=seed):
+                    page = generate_page(size, seed)
+                    expected = len(page.encode('utf-8')) / 1024 * SIZE_CLASSES[size]['images_per_kb']
+                    self.assertLessEqual(abs(len(IMAGE_PATTERN.findall(page)) - expected), 1)
+
+    def test_same_seed_same_page(self):
+        self.assertEqual(generate_page('small', 3), generate_page('small', 3))
+        self.assertNotEqual(generate_page('small', 3), generate_page('small', 4))
+
+
+class SkippedStageTest(unittest.TestCase):
+
+    def test_no_samples_is_skipped_not_zero(self):
+        self.assertEqual(summarize([], 0, 0), {'calls': 0, 'skipped': True})
+
+    def test_small_page_downloads_its_image(self):
+        results = run_benchmarks(['small'], ['download_image'], pages=1, log=None)
+        self.assertEqual(results['results']['download_image']['small']['calls'], 1)
+
+    def test_skipped_stage_is_not_compared(self):
+        results = run_benchmarks(['small'], ['build_mdx'], pages=0, log=None)
+        self.assertTrue(results['results']['build_mdx']['small']['skipped'])
+        baseline = run_benchmarks(['small'], ['build_mdx'], pages=1, repeat=1, log=None)
+        self.assertEqual(list(compare(results, baseline)), [])
+        self.assertEqual(list(compare(baseline, results)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
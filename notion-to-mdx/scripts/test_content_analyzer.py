@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Regression tests for the content analyzer
+Checks the single-pass scanner against the original regex implementation
+
+Run with: python -m pytest scripts/test_content_analyzer.py
+      or: python -m unittest discover -s scripts
+"""
+
+import random
+import re
+import unittest
+from collections import Counter
+from typing import List
+from unittest import mock
+
+import content_analyzer
+from content_analyzer import STOP_WORDS, extract_keywords, iter_lines, suggest_tags
+
+# Theme vocabulary before multi-word phrases were added (single words only)
+BASELINE_DOMAIN_KEYWORDS = {
+    theme: [word for word in words if ' ' not in word]
+    for theme, words in content_analyzer.DOMAIN_KEYWORDS.items()
+}
+
+
+def baseline_extract_keywords(content: str, title_weight: int = 3,
+                              heading_weight: int = 2) -> Counter:
+    """extract_keywords as it was before the single-pass scanner"""
+    keywords = Counter()
+
+    title_match = re.search(r'^#\s+(.+)$', content, re.MULTILINE)
+    if title_match:
+        title = title_match.group(1).lower()
+        for word in re.findall(r'\b[a-z]{3,}\b', title):
+            if word not in STOP_WORDS:
+                keywords[word] += title_weight
+
+    for heading in re.findall(r'^#{2,}\s+(.+)$', content, re.MULTILINE):
+        for word in re.findall(r'\b[a-z]{3,}\b', heading.lower()):
+            if word not in STOP_WORDS:
+                keywords[word] += heading_weight
+
+    body = re.sub(r'^#+\s+.+$', '', content, flags=re.MULTILINE)
+    body = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', body)
+    body = re.sub(r'[*_`~]', '', body)
+    for word in re.findall(r'\b[a-z]{3,}\b', body.lower()):
+        if word not in STOP_WORDS:
+            keywords[word] += 1
+
+    return keywords
+
+
+def baseline_suggest_tags(content: str, max_tags: int = 5) -> List[str]:
+    """suggest_tags as it was before the single-pass scanner"""
+    keywords = baseline_extract_keywords(content)
+
+    theme_scores = Counter()
+    for word, count in keywords.items():
+        for theme, theme_keywords in BASELINE_DOMAIN_KEYWORDS.items():
+            if word in theme_keywords:
+                theme_scores[theme] += count
+    themes = [theme for theme, score in theme_scores.most_common() if score > 0][:3]
+
+    suggested = list(themes[:2])
+    theme_words = set()
+    for theme_keywords in BASELINE_DOMAIN_KEYWORDS.values():
+        theme_words.update(theme_keywords)
+
+    proper_noun_counts = Counter(re.findall(r'\b[A-Z][a-z]+(?:[A-Z][a-z]+)*\b', content))
+    for noun, count in proper_noun_counts.most_common():
+        if count >= 2 and noun.lower() not in STOP_WORDS and len(suggested) < max_tags:
+            suggested.append(noun)
+
+    for word, count in keywords.most_common(20):
+        if len(suggested) >= max_tags:
+            break
+        if word not in theme_words and word not in [s.lower() for s in suggested]:
+            if count >= 3:
+                suggested.append(word)
+
+    return suggested[:max_tags]
+
+
+FIXTURES = {
+    'post': (
+        "# Building Startups in San Francisco\n\n"
+        "I moved to San Francisco to build a startup. The startup scene in San Francisco\n"
+        "is full of founders, investors and **software** engineers.\n\n"
+        "## The Tech Scene\n\n"
+        "Every founder talks about funding, revenue and growth. Python and GitHub\n"
+        "are everywhere; Python meetups happen weekly.\n\n"
+        "### Lessons Learned\n\n"
+        "- Customers first\n- Ship the product\n- Ship again, ship often\n"
+    ),
+    'multi_line_link': (
+        "# Reading List\n\n"
+        "Start with [the essay on\nstartup funding](https://example.com/essay) and then\n"
+        "[a long\nlink text that\nspans lines](https://example.com/a\n/b) before reading\n"
+        "the [plain](https://example.com) one. Reading reading reading.\n"
+    ),
+    'link_across_heading': (
+        "Intro text with [a link that\n## Interrupting Heading\ncontinues here](https://x.io) ok.\n"
+    ),
+    'pending_headings': (
+        "#\n\n\nTitle On Next Line\n\nBody words body words body.\n"
+        "##   \nHeading Below Marker\nmore body text about journeys and journeys\n"
+        "#hashtag is not a heading\n"
+    ),
+    'formatting': (
+        "# *Bold* _Title_\n\nSome `code` and ~~struck~~ __words__ with snake_case_names\n"
+        "and [**formatted link**](https://example.com/**x**) plus an unclosed [bracket\n"
+        "that never ends, and a ](dangling) target.\n"
+    ),
+    'no_title': "Just a paragraph with market market market money and portfolio words.\n",
+    'empty': "",
+}
+
+
+def random_document(rng: random.Random) -> str:
+    """Markdown built from fragments that stress headings, links and batching"""
+    fragments = [
+        '# ', '## ', '### ', '#', '#tag', '', '   ', '\n',
+        'startup', 'founder', 'market', 'the', 'and', 'Python', 'Tokyo', 'journey',
+        '[', ']', '(', ')', '](', 'https://x.io/', '**', '_', '`', '~',
+        'link text', 'growth', 'money', 'snake_case', 'café', 'abc123',
+    ]
+    lines = []
+    for _ in range(rng.randrange(1, 40)):
+        lines.append(' '.join(rng.choice(fragments) for _ in range(rng.randrange(0, 8))))
+    return '\n'.join(lines)
+
+
+class ExtractKeywordsTest(unittest.TestCase):
+
+    def assertSameKeywords(self, content: str, **weights) -> None:
+        expected = baseline_extract_keywords(content, **weights)
+        actual = extract_keywords(content, **weights)
+        self.assertEqual(dict(actual), dict(expected))
+        # Ranking and tie order must match too
+        self.assertEqual(actual.most_common(), expected.most_common())
+
+    def test_fixtures(self):
+        for name, content in FIXTURES.items():
+            with self.subTest(name):
+                self.assertSameKeywords(content)
+                self.assertSameKeywords(content, title_weight=5, heading_weight=1)
+
+    def test_multi_line_links_keep_text_only(self):
+        keywords = extract_keywords(FIXTURES['multi_line_link'])
+        self.assertIn('spans', keywords)
+        self.assertNotIn('https', keywords)
+        self.assertNotIn('example', keywords)
+
+    def test_lines_input(self):
+        for name, content in FIXTURES.items():
+            with self.subTest(name):
+                lines = [line + '\n' for line in iter_lines(content)]
+                self.assertEqual(extract_keywords(lines), extract_keywords(content))
+
+    def test_links_across_batches(self):
+        # Small batches put the multi-line links on batch boundaries
+        content = '\n'.join([FIXTURES['multi_line_link']] * 20)
+        for batch_lines in (1, 2, 3, 5):
+            with self.subTest(batch_lines=batch_lines), \
+                    mock.patch.object(content_analyzer, 'SCAN_BATCH_LINES', batch_lines):
+                self.assertSameKeywords(content)
+
+    def test_random_documents(self):
+        rng = random.Random(1)
+        for i in range(300):
+            content = random_document(rng)
+            with self.subTest(i, content=content), \
+                    mock.patch.object(content_analyzer, 'SCAN_BATCH_LINES', rng.randrange(1, 8)):
+                self.assertSameKeywords(content)
+
+
+class SuggestTagsTest(unittest.TestCase):
+
+    def test_fixtures(self):
+        for name, content in FIXTURES.items():
+            with self.subTest(name):
+                self.assertEqual(suggest_tags(content), baseline_suggest_tags(content))
+                self.assertEqual(suggest_tags(content, 3), baseline_suggest_tags(content, 3))
+
+    def test_random_documents(self):
+        rng = random.Random(2)
+        for i in range(200):
+            content = random_document(rng)
+            with self.subTest(i, content=content):
+                self.assertEqual(suggest_tags(content), baseline_suggest_tags(content))
+
+
+if __name__ == '__main__':
+    unittest.main()
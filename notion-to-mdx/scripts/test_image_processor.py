@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Tests for the image downloader
+Runs batch downloads against a local server that fails on purpose
+
+Run with: python -m pytest scripts/test_image_processor.py
+      or: python -m unittest discover -s scripts
+"""
+
+import base64
+import hashlib
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from collections import Counter
+from pathlib import Path
+
+import requests
+
+from benchmark import LocalServer, synthetic_png
+from image_processor import (
+    CHUNK_SIZE, DownloadTooLarge, download_image, download_images, unique_filenames
+)
+
+# Larger than one read chunk, so a broken stream leaves bytes to resume from
+BIG_IMAGE = synthetic_png(4 * CHUNK_SIZE, 5)
+ETAG = '"v1"'
+
+
+def send_body(request, body: bytes, status: int = 200, headers: dict = None) -> None:
+    """Send a complete response with a Content-Length"""
+    request.send_response(status)
+    for name, value in (headers or {}).items():
+        request.send_header(name, value)
+    request.send_header('Content-Length', str(len(body)))
+    request.end_headers()
+    request.wfile.write(body)
+
+
+class BatchServer(LocalServer):
+    """
+    /a/image.png and /b/image.png are different images, /flaky/image.png
+    answers 503 once, /missing.png is a 404 and /slow/<n>.png takes 0.2 s
+    """
+
+    def __init__(self):
+        self.images = {'/a/image.png': synthetic_png(3000, 1), '/b/image.png': synthetic_png(5000, 2),
+                       '/flaky/image.png': synthetic_png(4000, 3)}
+        self.hits = Counter()
+        self.active = 0
+        self.max_active = 0
+        lock = threading.Lock()
+
+        def handle(request):
+            with lock:
+                self.hits[request.path] += 1
+                first = self.hits[request.path] == 1
+                self.active += 1
+                self.max_active = max(self.max_active, self.active)
+            try:
+                if request.path == '/flaky/image.png' and first:
+                    send_body(request, b'busy', 503, {'Retry-After': '0'})
+                elif request.path.startswith('/slow/'):
+                    time.sleep(0.2)
+                    send_body(request, synthetic_png(2000, 4))
+                elif request.path in self.images:
+                    send_body(request, self.images[request.path])
+                else:
+                    request.send_error(404)
+            finally:
+                with lock:
+                    self.active -= 1
+
+        super().__init__(handle)
+
+
+class DownloadImagesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = BatchServer().__enter__()
+        self.addCleanup(self.server.__exit__)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.output_dir = Path(tmp.name) / 'photos'
+
+    def download(self, paths, **options):
+        urls = [f"{self.server.url}{path}" for path in paths]
+        return download_images(urls, self.output_dir, backoff=0.01, **options)
+
+    def test_transient_error_is_retried(self):
+        [result] = self.download(['/flaky/image.png'])
+        self.assertNotIn('error', result)
+        self.assertEqual(self.server.hits['/flaky/image.png'], 2)
+        self.assertEqual(Path(result['path']).read_bytes(), self.server.images['/flaky/image.png'])
+        self.assertEqual((result['width'], result['height']), (1200, 800))
+
+    def test_permanent_error_does_not_abort_the_batch(self):
+        results = self.download(['/a/image.png', '/missing.png', '/b/image.png'])
+        self.assertEqual([('error' in result) for result in results], [False, True, False])
+        self.assertIn('404', results[1]['error'])
+        # A 404 is not retried
+        self.assertEqual(self.server.hits['/missing.png'], 1)
+        self.assertEqual(sorted(path.name for path in self.output_dir.iterdir()),
+                         sorted(Path(results[i]['path']).name for i in (0, 2)))
+
+    def test_same_basename_gets_distinct_files(self):
+        results = self.download(['/a/image.png', '/b/image.png'])
+        paths = [Path(result['path']) for result in results]
+        self.assertEqual(paths[0].name, 'image.png')
+        self.assertNotEqual(paths[0], paths[1])
+        self.assertEqual(paths[0].read_bytes(), self.server.images['/a/image.png'])
+        self.assertEqual(paths[1].read_bytes(), self.server.images['/b/image.png'])
+
+    def test_downloads_run_concurrently(self):
+        start = time.perf_counter()
+        results = self.download([f'/slow/{n}.png' for n in range(8)], workers=4)
+        self.assertFalse([result for result in results if 'error' in result])
+        self.assertGreater(self.server.max_active, 1)
+        # Eight 0.2 s downloads on four workers take about two rounds, not eight
+        self.assertLess(time.perf_counter() - start, 1.2)
+
+
+class ResumeServer(LocalServer):
+    """
+    Serves BIG_IMAGE, breaking the first response of each path part way
+
+    How a Range request for the rest is answered depends on the path:
+    /resume honours it, /ignore-range sends the whole body again,
+    /wrong-range sends a different range and /range-416 refuses it.
+    /too-big is a large body with a Content-Length, /no-length one without,
+    and /bad-checksum sends a digest that does not match the body.
+    """
+
+    def __init__(self):
+        self.requests = []
+        lock = threading.Lock()
+
+        def handle(request):
+            path = request.path
+            ranged = request.headers.get('Range')
+            with lock:
+                self.requests.append((path, ranged))
+                first = len([r for r in self.requests if r[0] == path]) == 1
+            headers = {'Content-Type': 'image/png', 'ETag': ETAG}
+
+            if path == '/bad-checksum':
+                digest = base64.b64encode(hashlib.sha256(b'other bytes').digest()).decode()
+                send_body(request, BIG_IMAGE, headers=dict(headers, **{'Repr-Digest': f"sha-256=:{digest}:"}))
+            elif path == '/no-length':
+                request.send_response(200)
+                request.send_header('Connection', 'close')
+                request.end_headers()
+                request.wfile.write(BIG_IMAGE)
+                request.close_connection = True
+            elif path == '/too-big':
+                send_body(request, BIG_IMAGE, headers=headers)
+            elif first:
+                # Promise the whole body, send part of it and drop the connection
+                request.send_response(200)
+                for name, value in dict(headers, **{'Content-Length': str(len(BIG_IMAGE))}).items():
+                    request.send_header(name, value)
+                request.end_headers()
+                request.wfile.write(BIG_IMAGE[:CHUNK_SIZE + 1000])
+                request.wfile.flush()
+                request.connection.shutdown(socket.SHUT_RDWR)
+                request.close_connection = True
+            elif ranged and path == '/range-416':
+                send_body(request, b'', 416)
+            elif ranged and path in ('/resume', '/wrong-range'):
+                start = int(ranged.split('=')[1].rstrip('-'))
+                if path == '/wrong-range':
+                    start = 100
+                part = BIG_IMAGE[start:]
+                send_body(request, part, 206, dict(
+                    headers, **{'Content-Range': f"bytes {start}-{len(BIG_IMAGE) - 1}/{len(BIG_IMAGE)}"}
+                ))
+            else:
+                send_body(request, BIG_IMAGE, headers=headers)
+
+        super().__init__(handle)
+
+
+class FileDownloadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ResumeServer().__enter__()
+        self.addCleanup(self.server.__exit__)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.output_dir = Path(tmp.name)
+
+    def download(self, path, **options):
+        options = dict({'backoff': 0.01, 'timeout': 5, 'verbose': False}, **options)
+        return download_image(f"{self.server.url}{path}", self.output_dir, 'image.png', **options)
+
+    def ranges(self, path):
+        return [ranged for requested, ranged in self.server.requests if requested == path]
+
+    def assertNothingLeft(self):
+        self.assertEqual(list(self.output_dir.iterdir()), [])
+
+    def assertDownloaded(self, result):
+        self.assertEqual(result, self.output_dir / 'image.png')
+        self.assertEqual(result.read_bytes(), BIG_IMAGE)
+        # Only the final file; the .part file was renamed or removed
+        self.assertEqual(list(self.output_dir.iterdir()), [result])
+
+    def test_truncated_download_resumes(self):
+        self.assertDownloaded(self.download('/resume'))
+        self.assertEqual(self.ranges('/resume'), [None, f"bytes={CHUNK_SIZE}-"])
+
+    def test_server_ignoring_range_restarts_from_zero(self):
+        self.assertDownloaded(self.download('/ignore-range'))
+        self.assertEqual(self.ranges('/ignore-range'), [None, f"bytes={CHUNK_SIZE}-"])
+
+    def test_wrong_range_restarts_from_zero(self):
+        self.assertDownloaded(self.download('/wrong-range'))
+        self.assertEqual(self.ranges('/wrong-range'), [None, f"bytes={CHUNK_SIZE}-", None])
+
+    def test_range_not_satisfiable_restarts_from_zero(self):
+        self.assertDownloaded(self.download('/range-416'))
+        self.assertEqual(self.ranges('/range-416'), [None, f"bytes={CHUNK_SIZE}-", None])
+
+    def test_body_over_the_cap_is_refused(self):
+        for path in ('/too-big', '/no-length'):
+            with self.subTest(path):
+                with self.assertRaises(DownloadTooLarge):
+                    self.download(path, max_bytes=len(BIG_IMAGE) - 1)
+                self.assertNothingLeft()
+                # Too large is permanent and not retried
+                self.assertEqual(len(self.ranges(path)), 1)
+
+    def test_checksum_mismatch_fails_without_a_file(self):
+        with self.assertRaises(requests.RequestException):
+            self.download('/bad-checksum', retries=1)
+        self.assertNothingLeft()
+        self.assertEqual(self.ranges('/bad-checksum'), [None, None])
+
+
+class UniqueFilenamesTest(unittest.TestCase):
+
+    def test_repeated_names_get_a_url_hash(self):
+        names = unique_filenames(['https://x.io/a/image.png', 'https://x.io/b/image.png',
+                                  'https://x.io/c/other.jpg'])
+        self.assertEqual(len(set(names.values())), 3)
+        self.assertEqual(names['https://x.io/a/image.png'], 'image.png')
+        self.assertRegex(names['https://x.io/b/image.png'], r'^image-[0-9a-f]{8}\.png$')
+
+
+if __name__ == '__main__':
+    unittest.main()
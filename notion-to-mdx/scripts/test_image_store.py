@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for the content-addressed image store
+Checks signed-URL handling and what the manifest keeps on disk
+
+Run with: python -m pytest scripts/test_image_store.py
+      or: python -m unittest discover -s scripts
+"""
+
+import json
+import tempfile
+import unittest
+from collections import Counter
+from pathlib import Path
+
+from benchmark import LocalServer, synthetic_png
+from image_store import (
+    MANIFEST_NAME, load_image_manifest, save_image_manifest, store_image, url_key
+)
+
+IMAGE = synthetic_png(3000, 1)
+
+
+class SignedURLTest(unittest.TestCase):
+
+    def setUp(self):
+        self.hits = Counter()
+
+        def handle(request):
+            self.hits[request.path.split('?')[0]] += 1
+            request.send_response(200)
+            request.send_header('Content-Length', str(len(IMAGE)))
+            request.end_headers()
+            request.wfile.write(IMAGE)
+
+        self.server = LocalServer(handle).__enter__()
+        self.addCleanup(self.server.__exit__)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.store_dir = Path(tmp.name) / 'store'
+        self.output_dir = Path(tmp.name) / 'photos'
+
+    def signed(self, signature: str) -> str:
+        return (f"{self.server.url}/s3/photo.png?X-Amz-Credential=AKIDSECRET&"
+                f"X-Amz-Signature={signature}&expirationTimestamp=17000&id=7")
+
+    def test_url_key_drops_signature_case_insensitively(self):
+        self.assertEqual(url_key(self.signed('one')), f"{self.server.url}/s3/photo.png?id=7")
+        self.assertEqual(url_key('https://x.io/a.png?EXPIRATIONTIMESTAMP=1&v=2'),
+                         'https://x.io/a.png?v=2')
+
+    def test_manifest_never_stores_signed_urls(self):
+        manifest = load_image_manifest(self.store_dir)
+        store_image(self.signed('first'), self.output_dir, 'a.png', self.store_dir, manifest)
+        save_image_manifest(manifest, self.store_dir)
+
+        raw = (self.store_dir / MANIFEST_NAME).read_text(encoding='utf-8')
+        self.assertNotIn('AKIDSECRET', raw)
+        self.assertNotIn('first', raw)
+
+        # A re-signed URL for the same file is served from the store
+        manifest = load_image_manifest(self.store_dir)
+        path, status = store_image(self.signed('second'), self.output_dir, 'b.png',
+                                   self.store_dir, manifest)
+        self.assertEqual(status, 'cached')
+        self.assertEqual(self.hits['/s3/photo.png'], 1)
+        self.assertEqual(path.read_bytes(), IMAGE)
+
+    def test_old_manifest_urls_are_dropped_on_load(self):
+        self.store_dir.mkdir(parents=True)
+        (self.store_dir / MANIFEST_NAME).write_text(json.dumps({
+            'https://x.io/a.png': {'sha256': '0' * 64, 'object': 'objects/00/x',
+                                   'url': 'https://x.io/a.png?X-Amz-Signature=old'},
+        }), encoding='utf-8')
+        manifest = load_image_manifest(self.store_dir)
+        self.assertNotIn('url', manifest['https://x.io/a.png'])
+
+
+if __name__ == '__main__':
+    unittest.main()
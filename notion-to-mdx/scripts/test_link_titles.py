@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for the link title resolver
+Runs resolve_link_titles against a local server and checks what the
+persistent cache keeps between runs
+
+Run with: python -m pytest scripts/test_link_titles.py
+      or: python -m unittest discover -s scripts
+"""
+
+import tempfile
+import threading
+import time
+import unittest
+from collections import Counter
+from pathlib import Path
+
+from benchmark import LocalServer
+from link_titles import resolve_link_titles
+
+TIMEOUT = 0.5
+
+
+class TitleServer(LocalServer):
+    """
+    /ok has a title, /gone is a 404, and /flaky (a 503) and /slow (longer
+    than TIMEOUT) fail until healthy is set
+    """
+
+    def __init__(self):
+        self.hits = Counter()
+        self.healthy = False
+        lock = threading.Lock()
+
+        def handle(request):
+            with lock:
+                self.hits[request.path] += 1
+            if request.path == '/gone':
+                request.send_error(404)
+                return
+            if not self.healthy and request.path == '/flaky':
+                request.send_error(503)
+                return
+            if not self.healthy and request.path == '/slow':
+                time.sleep(TIMEOUT * 3)
+            body = f"<html><head><title>Page {request.path[1:]}</title></head></html>".encode()
+            request.send_response(200)
+            request.send_header('Content-Type', 'text/html; charset=utf-8')
+            request.send_header('Content-Length', str(len(body)))
+            request.end_headers()
+            request.wfile.write(body)
+
+        super().__init__(handle)
+
+
+class ResolveLinkTitlesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = TitleServer().__enter__()
+        self.addCleanup(self.server.__exit__)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = Path(tmp.name) / 'titles.sqlite3'
+        self.urls = [f"{self.server.url}/{name}" for name in ('ok', 'gone', 'flaky', 'slow')]
+
+    def resolve(self):
+        return resolve_link_titles(self.urls, self.cache, workers=4,
+                                   per_host_interval=0, timeout=TIMEOUT)
+
+    def test_cache_keeps_titles_and_definitive_misses_only(self):
+        ok, gone, flaky, slow = self.urls
+        first = self.resolve()
+        self.assertEqual(first, {ok: 'Page ok', gone: None, flaky: None, slow: None})
+
+        self.server.healthy = True
+        self.server.hits.clear()
+        second = self.resolve()
+        # The title and the 404 come from the cache; transient failures are retried
+        self.assertEqual(second, {ok: 'Page ok', gone: None, flaky: 'Page flaky', slow: 'Page slow'})
+        self.assertEqual(self.server.hits, Counter({'/flaky': 1, '/slow': 1}))
+
+        self.server.hits.clear()
+        self.assertEqual(self.resolve(), second)
+        self.assertEqual(self.server.hits, Counter())
+
+    def test_without_cache_every_run_fetches(self):
+        resolve_link_titles(self.urls[:2], None, per_host_interval=0, timeout=TIMEOUT)
+        resolve_link_titles(self.urls[:2], None, per_host_interval=0, timeout=TIMEOUT)
+        self.assertEqual(self.server.hits, Counter({'/ok': 2, '/gone': 2}))
+        self.assertFalse(self.cache.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Tests for the Notion API fetcher
+Runs fetch_pages against a local stand-in for the Notion API that
+paginates, throttles and changes pages on request
+
+Run with: python -m pytest scripts/test_notion_fetcher.py
+      or: python -m unittest discover -s scripts
+"""
+
+import json
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+from benchmark import LocalServer
+from notion_fetcher import NotionClient, fetch_pages, open_block_cache
+
+PAGE_ID = '0123456789abcdef0123456789abcdef'
+DASHED_ID = '01234567-89ab-cdef-0123-456789abcdef'
+TOGGLE_ID = 'toggle-1'
+
+# Results per children page; smaller than the client's page_size on purpose
+SERVER_PAGE_SIZE = 2
+
+
+def paragraph(block_id: str, text: str, has_children: bool = False) -> dict:
+    return {
+        'object': 'block', 'id': block_id, 'type': 'paragraph', 'has_children': has_children,
+        'paragraph': {'rich_text': [{'type': 'text', 'plain_text': text, 'text': {'content': text}}]},
+    }
+
+
+class NotionServer(LocalServer):
+    """
+    One page with five top-level blocks, served two per children page;
+    the third block has one nested child
+
+    throttle maps a path to a Retry-After value to answer 429 with once.
+    edit() changes the page and bumps its last_edited_time.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.throttle = {}
+        self.edit('first')
+        lock = threading.Lock()
+
+        def handle(request):
+            url = urlsplit(request.path)
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            with lock:
+                self.requests.append((time.monotonic(), url.path, query))
+                retry_after = self.throttle.pop(url.path, None)
+            if retry_after is not None:
+                self.send_json(request, {'object': 'error', 'code': 'rate_limited'}, 429,
+                               {'Retry-After': retry_after})
+            elif url.path == f"/v1/pages/{DASHED_ID}":
+                self.send_json(request, {'object': 'page', 'id': DASHED_ID,
+                                         'last_edited_time': self.edited})
+            elif url.path.startswith('/v1/blocks/') and url.path.endswith('/children'):
+                block_id = url.path.split('/')[3]
+                self.send_children(request, self.children.get(block_id), query)
+            else:
+                self.send_json(request, {'object': 'error', 'code': 'object_not_found'}, 404)
+
+        super().__init__(handle)
+
+    def edit(self, version: str) -> None:
+        self.edited = f"2024-01-01T00:00:00.000Z#{version}"
+        blocks = [paragraph(f"b{n}", f"{version} {n}", has_children=n == 2) for n in range(5)]
+        blocks[2]['id'] = TOGGLE_ID
+        self.children = {DASHED_ID: blocks, TOGGLE_ID: [paragraph('nested', f"{version} nested")]}
+
+    def send_children(self, request, blocks, query) -> None:
+        if blocks is None:
+            self.send_json(request, {'object': 'error', 'code': 'object_not_found'}, 404)
+            return
+        start = int(query.get('start_cursor', 0))
+        end = start + SERVER_PAGE_SIZE
+        self.send_json(request, {
+            'object': 'list', 'results': blocks[start:end],
+            'has_more': end < len(blocks), 'next_cursor': str(end) if end < len(blocks) else None,
+        })
+
+    @staticmethod
+    def send_json(request, data: dict, status: int = 200, headers: dict = None) -> None:
+        body = json.dumps(data).encode()
+        request.send_response(status)
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.send_header('Content-Type', 'application/json')
+        request.send_header('Content-Length', str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+    def paths(self) -> list:
+        return [path for _, path, _ in self.requests]
+
+
+class FetchPagesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = NotionServer().__enter__()
+        self.addCleanup(self.server.__exit__)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = open_block_cache(Path(tmp.name) / 'blocks.sqlite3')
+        self.addCleanup(self.cache.close)
+
+    def fetch(self, page_id=PAGE_ID, cache=None):
+        client = NotionClient('secret', self.server.url, rate=0, backoff=0.01)
+        try:
+            pages = fetch_pages(client, [page_id], cache)
+        finally:
+            client.close()
+        return pages, client.stats
+
+    def texts(self, blocks) -> list:
+        texts = []
+        for block in blocks:
+            texts.append(block['paragraph']['rich_text'][0]['plain_text'])
+            texts.extend(self.texts(block.get('children', [])))
+        return texts
+
+    def test_paginated_children_are_joined_in_order(self):
+        pages, stats = self.fetch()
+        self.assertEqual(self.texts(pages[DASHED_ID]['results']),
+                         ['first 0', 'first 1', 'first 2', 'first nested', 'first 3', 'first 4'])
+        cursors = [query.get('start_cursor') for _, path, query in self.server.requests
+                   if path == f"/v1/blocks/{DASHED_ID}/children"]
+        self.assertEqual(cursors, [None, '2', '4'])
+        self.assertEqual(stats['requests'], 5)
+
+    def test_retry_after_is_honored(self):
+        children = f"/v1/blocks/{DASHED_ID}/children"
+        self.server.throttle[children] = '1'
+        pages, stats = self.fetch()
+        self.assertNotIn('error', pages[DASHED_ID])
+        self.assertEqual(stats['throttled'], 1)
+        throttled, retried = [at for at, path, _ in self.server.requests if path == children][:2]
+        self.assertGreaterEqual(retried - throttled, 0.9)
+
+    def test_retry_after_is_capped(self):
+        children = f"/v1/blocks/{DASHED_ID}/children"
+        self.server.throttle[children] = '3600'
+        start = time.monotonic()
+        with mock.patch('image_processor.MAX_RETRY_AFTER', 0.2):
+            pages, stats = self.fetch()
+        self.assertNotIn('error', pages[DASHED_ID])
+        self.assertEqual(stats['throttled'], 1)
+        throttled, retried = [at for at, path, _ in self.server.requests if path == children][:2]
+        self.assertGreaterEqual(retried - throttled, 0.15)
+        self.assertLess(time.monotonic() - start, 2)
+
+    def test_unchanged_page_comes_from_the_cache(self):
+        first, _ = self.fetch(cache=self.cache)
+        self.server.requests.clear()
+        second, stats = self.fetch(cache=self.cache)
+        self.assertEqual(second, first)
+        # Only the page object is requested to compare last_edited_time
+        self.assertEqual(self.server.paths(), [f"/v1/pages/{DASHED_ID}"])
+        self.assertEqual(stats['cached'], 2)
+
+    def test_edited_page_is_fetched_again(self):
+        self.fetch(cache=self.cache)
+        self.server.edit('second')
+        self.server.requests.clear()
+        pages, stats = self.fetch(cache=self.cache)
+        self.assertEqual(self.texts(pages[DASHED_ID]['results']),
+                         ['second 0', 'second 1', 'second 2', 'second nested', 'second 3', 'second 4'])
+        self.assertEqual(stats['cached'], 0)
+        self.assertEqual(len(self.server.requests), 5)
+
+    def test_page_id_forms_share_one_cache_entry(self):
+        self.fetch(DASHED_ID, cache=self.cache)
+        for page_id in (PAGE_ID, PAGE_ID.upper(), f"https://www.notion.so/team/My-Post-{PAGE_ID}?pvs=4"):
+            with self.subTest(page_id=page_id):
+                self.server.requests.clear()
+                pages, stats = self.fetch(page_id, cache=self.cache)
+                self.assertEqual(list(pages), [DASHED_ID])
+                self.assertEqual(self.server.paths(), [f"/v1/pages/{DASHED_ID}"])
+                self.assertEqual(stats['cached'], 2)
+
+    def test_invalid_page_id_is_refused(self):
+        with self.assertRaises(ValueError):
+            self.fetch('not-a-page')
+        self.assertEqual(self.server.requests, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
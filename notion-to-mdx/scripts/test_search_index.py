@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for the search index
+Checks which terms of a generated post end up in the term shards
+
+Run with: python -m pytest scripts/test_search_index.py
+      or: python -m unittest discover -s scripts
+"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from content_analyzer import extract_keywords
+from mdx_builder import FOOTER, build_mdx, strip_footer
+from search_index import SEARCH_INDEX_VERSION, sync_search_index
+
+
+class FooterTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.posts_dir = Path(tmp.name) / 'posts'
+        self.output_dir = Path(tmp.name) / 'search'
+        for slug, body in (('rust', 'Ownership and borrowing in Rust.'),
+                           ('python', 'Generators and coroutines in Python.')):
+            (self.posts_dir / slug).mkdir(parents=True)
+            (self.posts_dir / slug / 'index.mdx').write_text(
+                build_mdx(slug.title(), '2024-01-01', [], body), encoding='utf-8'
+            )
+
+    def terms(self) -> set:
+        terms = set()
+        for path in (self.output_dir / 'terms').iterdir():
+            terms.update(json.loads(path.read_text(encoding='utf-8')))
+        return terms
+
+    def test_footer_is_stripped(self):
+        text = build_mdx('Post', '2024-01-01', [], 'Body text.')
+        self.assertFalse(strip_footer(text).rstrip().endswith('---'))
+        self.assertIn('Body text.', strip_footer(text))
+        self.assertEqual(strip_footer('No footer here.\n'), 'No footer here.\n')
+
+    def test_footer_terms_are_not_indexed(self):
+        sync_search_index(self.posts_dir, self.output_dir, shards=4)
+        terms = self.terms()
+        self.assertIn('ownership', terms)
+        self.assertIn('coroutines', terms)
+        self.assertFalse(set(extract_keywords(FOOTER)) & terms)
+
+    def test_index_of_an_older_version_is_rebuilt(self):
+        sync_search_index(self.posts_dir, self.output_dir, shards=4)
+        meta = json.loads((self.output_dir / 'meta.json').read_text(encoding='utf-8'))
+        meta['version'] = SEARCH_INDEX_VERSION - 1
+        (self.output_dir / 'meta.json').write_text(json.dumps(meta), encoding='utf-8')
+        stale = self.output_dir / 'terms' / '000.json'
+        stale.write_text(json.dumps({'converting': [0, 1, 1, 1]}), encoding='utf-8')
+
+        stats = sync_search_index(self.posts_dir, self.output_dir, shards=4)
+        self.assertEqual(stats['shards'], 4)
+        self.assertNotIn('converting', self.terms())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests for the site builder
+Checks how a page's local and remote images are placed in its photos folder
+
+Run with: python -m pytest scripts/test_site_builder.py
+      or: python -m unittest discover -s scripts
+"""
+
+import re
+import tempfile
+import unittest
+from pathlib import Path
+
+from benchmark import LocalServer, synthetic_png
+from notion_export import ExportDirectory
+from site_builder import rewrite_images
+
+LOCAL_IMAGE = synthetic_png(3000, 1)
+REMOTE_IMAGE = synthetic_png(5000, 2)
+
+
+class RewriteImagesTest(unittest.TestCase):
+
+    def setUp(self):
+        def handle(request):
+            request.send_response(200)
+            request.send_header('Content-Type', 'image/png')
+            request.send_header('Content-Length', str(len(REMOTE_IMAGE)))
+            request.end_headers()
+            request.wfile.write(REMOTE_IMAGE)
+
+        self.server = LocalServer(handle).__enter__()
+        self.addCleanup(self.server.__exit__)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+
+        (self.root / 'export' / 'Post').mkdir(parents=True)
+        (self.root / 'export' / 'Post' / 'image.png').write_bytes(LOCAL_IMAGE)
+        self.export = ExportDirectory(self.root / 'export')
+        self.addCleanup(self.export.close)
+        self.text = (f"# Post\n\n![local](Post/image.png)\n\n"
+                     f"![remote]({self.server.url}/files/image.png)\n")
+
+    def placed(self, markdown: str) -> list:
+        """Files the rewritten page points at, in order"""
+        return re.findall(r'src="\./photos/([^"]+)"', markdown)
+
+    def assertKeptApart(self, store_dir):
+        photos = self.root / 'post' / 'photos'
+        markdown, names, warnings = rewrite_images(
+            self.text, 'Post abc.md', photos, self.export, store_dir=store_dir
+        )
+        self.assertEqual(warnings, [])
+        local, remote = self.placed(markdown)
+        self.assertNotEqual(local, remote)
+        self.assertEqual(sorted(names), sorted([local, remote]))
+        self.assertEqual((photos / local).read_bytes(), LOCAL_IMAGE)
+        self.assertEqual((photos / remote).read_bytes(), REMOTE_IMAGE)
+
+    def test_local_and_remote_image_with_one_name_without_store(self):
+        self.assertKeptApart(None)
+
+    def test_local_and_remote_image_with_one_name_with_store(self):
+        self.assertKeptApart(self.root / 'store')
+
+
+if __name__ == '__main__':
+    unittest.main()
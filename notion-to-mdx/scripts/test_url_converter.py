@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for the URL converter
+Checks which regions are left untouched and that the rewrite scan stays fast
+
+Run with: python -m pytest scripts/test_url_converter.py
+      or: python -m unittest discover -s scripts
+"""
+
+import time
+import unittest
+
+from url_converter import (
+    convert_urls_to_markdown, extract_link_urls, get_domain_from_url, registrable_domain
+)
+
+
+class CodeSpanTest(unittest.TestCase):
+
+    def test_urls_in_code_are_kept(self):
+        for text in ("`https://github.com/a`",
+                     "``code with ` and https://github.com/a``",
+                     "```\nhttps://github.com/a\n```\n"):
+            with self.subTest(text=text):
+                self.assertEqual(convert_urls_to_markdown(text), text)
+
+    def test_unbalanced_runs_are_not_code(self):
+        # A run of three is not closed by a run of two
+        self.assertEqual(
+            convert_urls_to_markdown("```x`` see https://github.com/a"),
+            "```x`` see [GitHub](https://github.com/a)"
+        )
+
+    def test_unbalanced_runs_stay_fast(self):
+        # Runs of 1..80 backticks never close; the old pattern retried each
+        # run at every shorter length and took seconds on this 3 KB line
+        line = ' '.join('`' * n for n in range(1, 81)) + ' https://github.com/a'
+        start = time.perf_counter()
+        converted = convert_urls_to_markdown(line)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertTrue(converted.endswith('[GitHub](https://github.com/a)'))
+
+
+class TrailingPunctuationTest(unittest.TestCase):
+
+    def test_emphasis_closed_after_url(self):
+        cases = {
+            "**https://github.com/a**": "**[GitHub](https://github.com/a)**",
+            "*see https://github.com/a*.": "*see [GitHub](https://github.com/a)*.",
+            "**https://github.com/a*b**": "**[GitHub](https://github.com/a*b)**",
+            "***https://github.com/a***": "***[GitHub](https://github.com/a)***",
+        }
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(convert_urls_to_markdown(text), expected)
+
+    def test_star_that_ends_a_url_is_kept(self):
+        cases = {
+            "https://github.com/a*": "[GitHub](https://github.com/a*)",
+            "**bold** then https://github.com/a*.": "**bold** then [GitHub](https://github.com/a*).",
+            "*a* https://github.com/a**": "*a* [GitHub](https://github.com/a**)",
+        }
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(convert_urls_to_markdown(text), expected)
+
+    def test_sentence_punctuation_and_parens(self):
+        self.assertEqual(
+            convert_urls_to_markdown("(see https://github.com/a_(b)), ok."),
+            "(see [GitHub](https://github.com/a_(b))), ok."
+        )
+
+    def test_extract_link_urls_matches_conversion(self):
+        text = ("**https://github.com/a** and `https://github.com/code` and "
+                "[x](https://github.com/linked) and https://github.com/b*.")
+        self.assertEqual(extract_link_urls(text),
+                         ['https://github.com/a', 'https://github.com/b*'])
+
+
+class DomainTest(unittest.TestCase):
+
+    def test_user_info_and_port_are_dropped(self):
+        url = 'https://user:pw@docs.example.co.uk:8443/path'
+        self.assertEqual(get_domain_from_url(url), 'docs.example.co.uk')
+        self.assertEqual(registrable_domain(get_domain_from_url(url)), 'example.co.uk')
+        self.assertEqual(registrable_domain('user@news.ycombinator.com:443'), 'ycombinator.com')
+
+    def test_host_is_lowercased(self):
+        self.assertEqual(get_domain_from_url('https://WWW.GitHub.com/a'), 'github.com')
+        self.assertEqual(convert_urls_to_markdown('https://WWW.GitHub.com/a'),
+                         '[GitHub](https://WWW.GitHub.com/a)')
+
+    def test_ip_addresses(self):
+        self.assertEqual(get_domain_from_url('http://[::1]:8080/'), '::1')
+        self.assertEqual(registrable_domain('[::1]:8080'), '::1')
+        self.assertEqual(registrable_domain('127.0.0.1:9000'), '127.0.0.1')
+
+
+if __name__ == '__main__':
+    unittest.main()
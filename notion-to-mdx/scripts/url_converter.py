@@ -5,9 +5,80 @@ Extracts URLs and converts them to markdown links with descriptive text
 """
 
 import argparse
+import json
+import os
 import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Tuple, Union
 from urllib.parse import urlparse
 
+from metrics import add_metrics_arguments, increment, instrumented, stage
+from text_io import open_output, read_text
+
+# Bare http(s) URL
+URL_PATTERN = re.compile(r'https?://[^\s<>"{}|\\^`\[\]]+')
+
+# Regions that must be copied through untouched, tried before bare URLs:
+# fenced code blocks, inline code, existing markdown links/images and
+# <autolinks>. A single scan over this alternation visits each character once.
+# An inline code span opens with a whole backtick run and closes with a run
+# of the same length; the lookarounds stop a shorter part of the run from
+# being retried, which made lines of unbalanced runs backtrack for seconds.
+REWRITE_PATTERN = re.compile(
+    r'''
+    (?P<fence>
+        ^[ \t]*(?P<fence_mark>`{3,}|~{3,})[^\n]*\n    # opening fence line
+        .*?                                           # block body
+        (?:^[ \t]*(?P=fence_mark)[`~]*[ \t]*$|\Z)     # closing fence or end
+    )
+    | (?P<code>(?<!`)(?P<ticks>`+)(?!`)[^\n]*?(?<!`)(?P=ticks)(?!`))
+    | (?P<link>
+        \[(?:[^\[\]\n]|\[[^\[\]\n]*\])*\]           # [text], one level of nesting
+        \((?:[^()\s]|\([^()\s]*\))*                    # (target, balanced parens
+        (?:[ \t]+(?:"[^"\n]*"|'[^'\n]*'))?[ \t]*\)     # optional "title")
+    )
+    | (?P<autolink><https?://[^>\s]*>)
+    | (?P<url>https?://[^\s<>"{}|\\^`\[\]]+)
+    ''',
+    re.VERBOSE | re.MULTILINE | re.DOTALL
+)
+
+# Characters that end a sentence rather than a URL; '*' is only stripped
+# when it closes emphasis opened before the URL (see open_emphasis)
+TRAILING_PUNCTUATION = '.,;:!?\'"_~'
+
+# Runs of '*' that open or close emphasis
+EMPHASIS_PATTERN = re.compile(r'\*+')
+
+# Bundled public suffix snapshot used to find registrable domains offline
+PUBLIC_SUFFIX_PATH = Path(__file__).resolve().parent.parent / 'assets' / 'public_suffix_list.dat'
+
+# User overrides for friendly domain names (JSON object of domain -> name)
+DOMAIN_NAMES_PATH = Path(
+    os.environ.get(
+        'NOTION_TO_MDX_DOMAIN_NAMES',
+        Path.home() / '.config' / 'notion-to-mdx' / 'domain_names.json'
+    )
+)
+
+# Map common domains to friendly names
+DOMAIN_NAMES = {
+    'ycombinator.com': 'Y Combinator',
+    'news.ycombinator.com': 'Hacker News',
+    'techcrunch.com': 'TechCrunch',
+    'wikipedia.org': 'Wikipedia',
+    'github.com': 'GitHub',
+    'twitter.com': 'Twitter',
+    'x.com': 'X (Twitter)',
+    'linkedin.com': 'LinkedIn',
+    'medium.com': 'Medium',
+    'substack.com': 'Substack',
+}
+
+_public_suffixes: Optional[Tuple[FrozenSet[str], FrozenSet[str], FrozenSet[str]]] = None
+_domain_names: Optional[Dict[str, str]] = None
+
 
 def extract_urls(text: str) -> list:
     """
@@ -19,10 +90,7 @@ def extract_urls(text: str) -> list:
     Returns:
         List of URLs found in text
     """
-    # Match http(s) URLs
-    url_pattern = r'https?://[^\s<>"{}|\\^`\[\]]+'
-    urls = re.findall(url_pattern, text)
-    return urls
+    return URL_PATTERN.findall(text)
 
 
 def get_domain_from_url(url: str) -> str:
@@ -33,10 +101,13 @@ def get_domain_from_url(url: str) -> str:
         url: Full URL
 
     Returns:
-        Domain name (e.g., "ycombinator.com")
+        Domain name (e.g., "ycombinator.com"), lowercased and without
+        any user info or port
     """
-    parsed = urlparse(url)
-    domain = parsed.netloc
+    try:
+        domain = urlparse(url).hostname or ''
+    except ValueError:
+        domain = ''
 
     # Remove www. prefix if present
     if domain.startswith('www.'):
@@ -45,6 +116,141 @@ def get_domain_from_url(url: str) -> str:
     return domain
 
 
+def load_public_suffixes(path: Union[str, Path] = PUBLIC_SUFFIX_PATH) -> Tuple[FrozenSet[str], FrozenSet[str], FrozenSet[str]]:
+    """
+    Parse a public suffix list file
+
+    Args:
+        path: File in publicsuffix.org list format
+
+    Returns:
+        Tuple of (plain rules, wildcard parents, exception rules); a
+        wildcard rule '*.ck' is stored as 'ck' and '!www.ck' as 'www.ck'
+    """
+    rules, wildcards, exceptions = set(), set(), set()
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('//'):
+                continue
+            rule = line.split()[0].lower()
+            if rule.startswith('!'):
+                exceptions.add(rule[1:])
+            elif rule.startswith('*.'):
+                wildcards.add(rule[2:])
+            else:
+                rules.add(rule)
+    return frozenset(rules), frozenset(wildcards), frozenset(exceptions)
+
+
+@lru_cache(maxsize=8192)
+def registrable_domain(host: str) -> str:
+    """
+    Find the registrable domain (public suffix plus one label) of a host
+
+    Args:
+        host: Host name (e.g. "news.ycombinator.com"); user info and a
+            port, as in a URL's netloc, are ignored
+
+    Returns:
+        Registrable domain (e.g. "ycombinator.com"), or the host itself for
+        IP addresses and bare public suffixes
+    """
+    global _public_suffixes
+    if _public_suffixes is None:
+        _public_suffixes = load_public_suffixes()
+    rules, wildcards, exceptions = _public_suffixes
+
+    if host.count(':') < 2 or host.startswith('['):
+        try:
+            host = urlparse(f"//{host}").hostname or ''
+        except ValueError:
+            pass
+    host = host.lower().rstrip('.')
+    if ':' in host or host.replace('.', '').isdigit():
+        return host  # IP address
+
+    labels = host.split('.')
+    # Walk from the longest candidate; the unlisted default rule is '*'
+    suffix_start = len(labels) - 1
+    for i in range(len(labels)):
+        candidate = '.'.join(labels[i:])
+        if candidate in exceptions:
+            suffix_start = i + 1
+            break
+        if candidate in rules or (i + 1 < len(labels) and '.'.join(labels[i + 1:]) in wildcards):
+            suffix_start = i
+            break
+
+    if suffix_start == 0:
+        return host
+    return '.'.join(labels[suffix_start - 1:])
+
+
+def load_domain_names(path: Union[str, Path]) -> Dict[str, str]:
+    """
+    Add friendly domain names from a JSON config file
+
+    Args:
+        path: JSON object mapping domains (or full hosts) to display names
+
+    Returns:
+        The active domain name table, including the new entries
+
+    Raises:
+        ValueError: If the file is not a JSON object of strings
+    """
+    with open(path, encoding='utf-8') as f:
+        names = json.load(f)
+    if not isinstance(names, dict) or not all(
+            isinstance(k, str) and isinstance(v, str) for k, v in names.items()):
+        raise ValueError(f"Domain names file must map domains to names: {path}")
+
+    table = get_domain_names()
+    table.update({domain.lower(): name for domain, name in names.items()})
+    lookup_domain_name.cache_clear()
+    return table
+
+
+def get_domain_names() -> Dict[str, str]:
+    """
+    Return the active friendly-name table, building it on first use
+
+    The table starts from DOMAIN_NAMES and applies the user config at
+    DOMAIN_NAMES_PATH when that file exists.
+
+    Returns:
+        Dict of domain -> friendly name
+    """
+    global _domain_names
+    if _domain_names is None:
+        _domain_names = dict(DOMAIN_NAMES)
+        if DOMAIN_NAMES_PATH.is_file():
+            load_domain_names(DOMAIN_NAMES_PATH)
+    return _domain_names
+
+
+@lru_cache(maxsize=8192)
+def lookup_domain_name(domain: str) -> str:
+    """
+    Map a domain to its friendly name
+
+    The exact host is tried first, then its registrable domain, so
+    "en.wikipedia.org" resolves through "wikipedia.org".
+
+    Args:
+        domain: Host name without "www." (e.g. "en.wikipedia.org")
+
+    Returns:
+        Friendly name, or the domain itself when none is known
+    """
+    table = get_domain_names()
+    name = table.get(domain.lower())
+    if name is None:
+        name = table.get(registrable_domain(domain), domain)
+    return name
+
+
 def generate_link_text(url: str, context: str = None) -> str:
     """
     Generate descriptive link text for URL
@@ -70,47 +276,144 @@ def generate_link_text(url: str, context: str = None) -> str:
             if len(link_text) > 3:
                 return link_text
 
-    # Map common domains to friendly names
-    domain_names = {
-        'ycombinator.com': 'Y Combinator',
-        'techcrunch.com': 'TechCrunch',
-        'wikipedia.org': 'Wikipedia',
-        'github.com': 'GitHub',
-        'twitter.com': 'Twitter',
-        'x.com': 'X (Twitter)',
-        'linkedin.com': 'LinkedIn',
-        'medium.com': 'Medium',
-        'substack.com': 'Substack',
-    }
+    return lookup_domain_name(domain)
+
+
+def open_emphasis(text: str, start: int) -> int:
+    """
+    Count the '*' opened on a line before a position and not yet closed
 
-    return domain_names.get(domain, domain)
+    Each run of '*' closes the innermost open run of the same length, or
+    opens a new one, which is enough to pair **bold** and *italic* spans.
 
+    Args:
+        text: Full text
+        start: Position of the URL
 
-def convert_urls_to_markdown(text: str) -> str:
+    Returns:
+        Number of '*' characters that a following run may close
+    """
+    line_start = text.rfind('\n', 0, start) + 1
+    runs = []
+    for run in EMPHASIS_PATTERN.findall(text, line_start, start):
+        if runs and runs[-1] == len(run):
+            runs.pop()
+        else:
+            runs.append(len(run))
+    return sum(runs)
+
+
+def split_trailing_punctuation(url: str, open_stars: int = 0) -> Tuple[str, str]:
+    """
+    Separate sentence punctuation and unbalanced ')' from the end of a URL
+
+    Args:
+        url: URL as matched in running text
+        open_stars: '*' opened before the URL (see open_emphasis); up to
+            this many trailing '*' close that emphasis, the rest stay in
+            the URL
+
+    Returns:
+        Tuple of (url, trailing text that is not part of the URL)
+    """
+    end = len(url)
+    while end:
+        char = url[end - 1]
+        if char in TRAILING_PUNCTUATION:
+            end -= 1
+        elif char == '*' and open_stars:
+            open_stars -= 1
+            end -= 1
+        elif char == ')' and url.count('(', 0, end) < url.count(')', 0, end):
+            end -= 1
+        else:
+            break
+    return url[:end], url[end:]
+
+
+def _link_target(text: str, match: re.Match) -> Optional[Tuple[str, str]]:
+    """
+    URL and trailing text of a REWRITE_PATTERN match that should become a link
+
+    Returns:
+        Tuple of (url, trailing text), or None to keep the match as it is
+    """
+    if match.lastgroup != 'url':
+        return None
+
+    start = match.start()
+    before = text[start - 1] if start else ''
+    # Skip [url] references and src="url" style attributes
+    if before == '[' or (before in ('"', "'") and text[start - 2:start - 1] == '='):
+        return None
+
+    found = match.group(0)
+    # Only lines with a '*' in the URL pay for the emphasis scan
+    open_stars = open_emphasis(text, start) if '*' in found else 0
+    url, trailing = split_trailing_punctuation(found, open_stars)
+    if not url.partition('://')[2]:
+        return None
+    return url, trailing
+
+
+def extract_link_urls(text: str) -> List[str]:
+    """
+    List the URLs that convert_urls_to_markdown would turn into links
+
+    Unlike extract_urls, URLs in code and existing links are skipped and
+    trailing punctuation is removed, so the result can be used to fetch
+    link titles.
+
+    Args:
+        text: Input text
+
+    Returns:
+        URLs in order of appearance
+    """
+    urls = []
+    for match in REWRITE_PATTERN.finditer(text):
+        target = _link_target(text, match)
+        if target is not None:
+            urls.append(target[0])
+    return urls
+
+
+def convert_urls_to_markdown(text: str, link_titles: Optional[Dict[str, str]] = None) -> str:
     """
     Convert plain URLs in text to markdown links
 
+    Runs a single regex pass. Fenced code blocks, inline code, existing
+    markdown links and <autolinks> are left untouched, as are URLs inside
+    [brackets] or quoted HTML attributes.
+
     Args:
         text: Input text with plain URLs
+        link_titles: Optional url -> page title map (see link_titles.py);
+            URLs without a title fall back to generate_link_text
 
     Returns:
         Text with URLs converted to markdown links
     """
-    urls = extract_urls(text)
+    rewritten = 0
 
-    for url in urls:
-        # Skip if already in markdown link format
-        if f']({url})' in text or f'[{url}]' in text:
-            continue
+    def replace(match: re.Match) -> str:
+        nonlocal rewritten
+        target = _link_target(text, match)
+        if target is None:
+            return match.group(0)
+        url, trailing = target
 
-        # Generate link text
-        link_text = generate_link_text(url)
+        # Generate link text and replace URL with markdown link
+        link_text = link_titles.get(url) if link_titles else None
+        if not link_text:
+            link_text = generate_link_text(url)
+        rewritten += 1
+        return f'[{link_text}]({url}){trailing}'
 
-        # Replace URL with markdown link
-        markdown_link = f'[{link_text}]({url})'
-        text = text.replace(url, markdown_link)
-
-    return text
+    with stage('rewrite_urls'):
+        text_out = REWRITE_PATTERN.sub(replace, text)
+    increment('urls_rewritten', rewritten)
+    return text_out
 
 
 def main():
@@ -121,6 +424,11 @@ def main():
         '--text',
         help='Text containing URLs to convert'
     )
+    parser.add_argument(
+        '--text-file',
+        metavar='FILE',
+        help='Read text containing URLs from FILE (- for stdin)'
+    )
     parser.add_argument(
         '--url',
         help='Specific URL to convert (optional)'
@@ -129,31 +437,67 @@ def main():
         '--link-text',
         help='Custom link text for the URL'
     )
+    parser.add_argument(
+        '--fetch-titles',
+        action='store_true',
+        help='Use fetched page titles as link text (cached; requires network on first run)'
+    )
+    parser.add_argument(
+        '--title-cache',
+        help='SQLite cache for fetched titles (default: ~/.cache/notion-to-mdx/link_titles.sqlite3)'
+    )
+    parser.add_argument(
+        '--domain-names',
+        metavar='FILE',
+        help='JSON file of extra domain -> friendly name mappings'
+    )
+    parser.add_argument(
+        '--output',
+        help='Write the result to this file instead of stdout'
+    )
 
+    add_metrics_arguments(parser)
     args = parser.parse_args()
 
     # Validate arguments
-    if not args.url and not args.text:
-        parser.error("Either --text or --url must be provided")
-
-    try:
-        if args.url and args.link_text:
-            # Convert single URL with custom link text
-            markdown_link = f'[{args.link_text}]({args.url})'
-            print(markdown_link)
-        elif args.url:
-            # Convert single URL with auto-generated link text
-            link_text = generate_link_text(args.url)
-            markdown_link = f'[{link_text}]({args.url})'
-            print(markdown_link)
-        else:
-            # Convert all URLs in text
-            converted_text = convert_urls_to_markdown(args.text)
-            print(converted_text)
-
-    except Exception as e:
-        print(f"✗ Error: {e}")
-        exit(1)
+    if not args.url and args.text is None and not args.text_file:
+        parser.error("Either --text, --text-file or --url must be provided")
+    if args.text is not None and args.text_file:
+        parser.error("--text and --text-file are mutually exclusive")
+
+    with instrumented(args):
+        try:
+            if args.domain_names:
+                load_domain_names(args.domain_names)
+
+            if args.url and args.link_text:
+                # Convert single URL with custom link text
+                markdown_link = f'[{args.link_text}]({args.url})'
+                with open_output(args.output) as output:
+                    output.write(markdown_link + '\n')
+            elif args.url:
+                # Convert single URL with auto-generated link text
+                link_text = generate_link_text(args.url)
+                markdown_link = f'[{link_text}]({args.url})'
+                with open_output(args.output) as output:
+                    output.write(markdown_link + '\n')
+            else:
+                # Convert all URLs in text
+                text = args.text if args.text is not None else read_text(args.text_file)
+                link_titles = None
+                if args.fetch_titles:
+                    from link_titles import DEFAULT_TITLE_CACHE, resolve_link_titles
+                    link_titles = resolve_link_titles(
+                        extract_link_urls(text), args.title_cache or DEFAULT_TITLE_CACHE
+                    )
+                converted_text = convert_urls_to_markdown(text, link_titles)
+                with open_output(args.output) as output:
+                    output.write(converted_text)
+                    output.write('\n')
+
+        except Exception as e:
+            print(f"✗ Error: {e}")
+            exit(1)
 
 
 if __name__ == '__main__':
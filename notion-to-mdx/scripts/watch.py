@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Watch mode for Notion to MDX
+Keeps one warm pipeline running over an export folder or a fetch cache
+and reconverts only the pages (and stages) that changed
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from image_store import DEFAULT_IMAGE_STORE
+from metrics import add_metrics_arguments, increment, instrumented, stage
+from notion_export import ExportDirectory
+from pipeline import Pipeline, notion_page_title
+from site_builder import local_images, page_date, page_title, unique_slug
+from text_io import open_atomic
+
+# Bump when the state layout changes; older state triggers a full conversion
+WATCH_VERSION = 1
+
+STATE_NAME = '.notion-to-mdx-watch.json'
+
+# Page files: exported Markdown, or block JSON saved by notion_fetcher.py
+PAGE_SUFFIXES = ('.md', '.json')
+
+# (size, mtime_ns) of a file, compared between scans
+FileStat = Tuple[int, int]
+
+
+def scan_tree(root: Path) -> Dict[str, FileStat]:
+    """
+    Stat every file under root
+
+    Uses os.scandir, whose directory entries carry the stat data on most
+    platforms, so a scan of thousands of files takes milliseconds.
+
+    Args:
+        root: Directory to scan
+
+    Returns:
+        Dict of POSIX path relative to root -> (size, mtime_ns); hidden
+        files and folders are skipped
+    """
+    found = {}
+    stack = [(root, '')]
+    while stack:
+        directory, prefix = stack.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            key = f"{prefix}{entry.name}"
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((Path(entry.path), f"{key}/"))
+                elif entry.is_file():
+                    stat = entry.stat()
+                    found[key] = (stat.st_size, stat.st_mtime_ns)
+            except FileNotFoundError:
+                continue  # Removed while scanning; the next scan sees it
+    return found
+
+
+class Debouncer:
+    """
+    Releases changed paths once they have stopped changing
+
+    Editors and sync clients often write a file in several steps; a path
+    is only reported after its stat has stayed the same for the quiet
+    period, so each save is converted once.
+    """
+
+    def __init__(self, quiet: float):
+        self.quiet = quiet
+        self._pending = {}  # key -> (stat or None if removed, time of last change)
+
+    def update(self, previous: Dict[str, FileStat], current: Dict[str, FileStat]) -> None:
+        """Record paths whose stat differs between two scans"""
+        now = time.monotonic()
+        for key, stat in current.items():
+            if previous.get(key) != stat:
+                self._pending[key] = (stat, now)
+        for key in previous.keys() - current.keys():
+            self._pending[key] = (None, now)
+
+    def ready(self) -> Dict[str, Optional[FileStat]]:
+        """
+        Pop paths that have been quiet long enough
+
+        Returns:
+            Dict of key -> stat, or None for removed files
+        """
+        now = time.monotonic()
+        done = {key: stat for key, (stat, changed) in self._pending.items()
+                if now - changed >= self.quiet}
+        for key in done:
+            del self._pending[key]
+        return done
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+class Watcher:
+    """
+    Reconverts changed pages of a source folder with one warm Pipeline
+
+    The pipeline keeps the theme and corpus indexes, domain tables, HTTP
+    session and image manifest in memory between conversions. Per page,
+    only the affected stages run again:
+
+    - a file that was touched but has the same content hash is skipped
+    - block JSON whose Markdown is unchanged (e.g. only last_edited_time
+      moved) is skipped
+    - a page whose Markdown is unchanged but whose local images changed
+      reuses its title, date and tags, so analysis is skipped
+    - unchanged remote images are reused from the image store
+
+    State (hashes, slugs, tags and image fingerprints per page) is saved
+    in the output folder, so a restarted watcher does not reconvert
+    anything that is already up to date. Pages whose last conversion
+    raised are kept in failed (key -> error) until they convert again.
+    """
+
+    def __init__(self, source: Union[str, Path], output_dir: Union[str, Path],
+                 pipeline: Pipeline, prune: bool = False, log=sys.stderr):
+        self.export = ExportDirectory(source)
+        self.source = self.export.root
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.pipeline = pipeline
+        self.prune = prune
+        self.log = log
+        self.state = self._load_state()
+        self.failed: Dict[str, str] = {}
+
+    def _load_state(self) -> dict:
+        path = self.output_dir / STATE_NAME
+        if path.exists():
+            with open(path, encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('version') == WATCH_VERSION and state.get('source') == str(self.source.resolve()):
+                return state
+        return {'version': WATCH_VERSION, 'source': str(self.source.resolve()), 'pages': {}}
+
+    def save_state(self) -> None:
+        """Write the per-page state atomically"""
+        with open_atomic(self.output_dir / STATE_NAME) as f:
+            json.dump(self.state, f, indent=1, sort_keys=True)
+
+    def _dependents(self, keys: Set[str]) -> List[str]:
+        """Pages that embed any of the given image keys"""
+        return [page for page, entry in self.state['pages'].items()
+                if keys.intersection(entry.get('assets', {}))]
+
+    def _read_page(self, key: str, data: bytes) -> Tuple[str, dict, Optional[dict]]:
+        """Markdown of a page file, the pipeline input and any Notion page object"""
+        if key.endswith('.json'):
+            tree = json.loads(data)
+            if isinstance(tree, list):
+                tree = {'results': tree}
+            text = self.pipeline.markdown({'blocks': tree.get('results', [])})
+            return text, {'content': text}, tree.get('page')
+        text = data.decode('utf-8', errors='replace')
+        return text, {'content': text, 'export': self.export, 'key': key}, None
+
+    def convert(self, key: str) -> Optional[dict]:
+        """
+        Bring one page's output up to date
+
+        Args:
+            key: Page path relative to the source folder
+
+        Returns:
+            The new state entry, or None if nothing had to be done
+        """
+        start = time.perf_counter()
+        entry = self.state['pages'].get(key)
+        data = self.export.read_bytes(key)
+        sha256 = hashlib.sha256(data).hexdigest()
+        output = self.output_dir / entry['slug'] / 'index.mdx' if entry else None
+
+        if entry and entry['sha256'] == sha256 and output.exists() and all(
+                self.export.exists(asset) and self.export.fingerprint(asset) == fingerprint
+                for asset, fingerprint in entry['assets'].items()):
+            return None
+
+        text, page, notion_page = self._read_page(key, data)
+        text_sha256 = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        assets = {asset: self.export.fingerprint(asset)
+                  for asset in local_images(text, key, self.export)}
+
+        if entry and entry['text_sha256'] == text_sha256 and output.exists() \
+                and entry['assets'] == assets:
+            # Same Markdown from a changed file (e.g. block metadata only)
+            entry['sha256'] = sha256
+            return None
+
+        if entry and entry['text_sha256'] == text_sha256:
+            # Only images changed: reuse the analysis
+            title, post_date, tags = entry['title'], entry['date'], entry['tags']
+            increment('analysis_reused')
+        else:
+            title = None
+            if notion_page is not None:
+                title = notion_page_title(notion_page)
+            title = title or page_title(text, key)
+            if notion_page is not None and notion_page.get('created_time'):
+                post_date = notion_page['created_time'][:10]
+            else:
+                post_date = page_date(text, self.export.modified(key))
+            tags = None
+
+        slug = entry['slug'] if entry else unique_slug(
+            title, key, {other['slug'] for other in self.state['pages'].values()}
+        )
+        page.update(title=title, date=post_date, output=self.output_dir / slug / 'index.mdx')
+        if tags is not None:
+            page['tags'] = tags
+        result = self.pipeline.convert(page)
+
+        entry = {
+            'sha256': sha256,
+            'text_sha256': text_sha256,
+            'slug': slug,
+            'title': result['title'],
+            'date': result['date'],
+            'tags': result['tags'],
+            'assets': assets,
+        }
+        self.state['pages'][key] = entry
+        for warning in result['warnings']:
+            print(f"  ! {key}: {warning}", file=self.log)
+        print(f"✓ {key} -> {slug}/index.mdx ({time.perf_counter() - start:.3f}s"
+              f"{', analysis reused' if tags is not None else ''})", file=self.log)
+        return entry
+
+    def remove(self, key: str) -> None:
+        """Forget a deleted page, deleting its post folder with prune"""
+        self.failed.pop(key, None)
+        entry = self.state['pages'].pop(key, None)
+        if entry is None:
+            return
+        print(f"- {key} removed", file=self.log)
+        if self.prune:
+            shutil.rmtree(self.output_dir / entry['slug'], ignore_errors=True)
+
+    def process(self, changed: Dict[str, Optional[FileStat]]) -> int:
+        """
+        Handle a batch of settled changes
+
+        A page that raises is reported and recorded in failed; the rest
+        of the batch is still converted.
+
+        Args:
+            changed: Keys from the debouncer (None for removed files)
+
+        Returns:
+            Number of pages converted
+        """
+        pages = set()
+        assets = set()
+        for key, stat in changed.items():
+            if key.endswith(PAGE_SUFFIXES):
+                if stat is None:
+                    self.remove(key)
+                else:
+                    pages.add(key)
+            else:
+                assets.add(key)
+        pages.update(page for page in self._dependents(assets) if self.export.exists(page))
+
+        converted = 0
+        for key in sorted(pages):
+            try:
+                with stage('watch_page'):
+                    if self.convert(key) is not None:
+                        converted += 1
+                self.failed.pop(key, None)
+            except Exception as e:
+                self.failed[key] = str(e)
+                print(f"✗ {key}: {e}", file=self.log)
+        if changed:
+            self.save_state()
+        return converted
+
+    def sync(self) -> int:
+        """Convert every page that is out of date, as on startup"""
+        files = scan_tree(self.source)
+        changed = {key: stat for key, stat in files.items() if key.endswith(PAGE_SUFFIXES)}
+        changed.update({key: None for key in self.state['pages'] if key not in files})
+        return self.process(changed)
+
+    def run(self, interval: float = 0.2, debounce: float = 0.3) -> None:
+        """
+        Watch the source folder until interrupted
+
+        Args:
+            interval: Seconds between scans
+            debounce: Seconds a file must stay unchanged before it is converted
+        """
+        debouncer = Debouncer(debounce)
+        previous = scan_tree(self.source)
+        while True:
+            time.sleep(interval)
+            current = scan_tree(self.source)
+            debouncer.update(previous, current)
+            previous = current
+            ready = debouncer.ready()
+            if ready:
+                self.process(ready)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Watch a Notion export folder or fetch cache and reconvert changed pages'
+    )
+    parser.add_argument(
+        '--source',
+        required=True,
+        help='Extracted Notion export folder (*.md), or a notion_fetcher.py --output-dir (*.json)'
+    )
+    parser.add_argument(
+        '--output-dir',
+        required=True,
+        help='Posts directory to write <slug>/index.mdx and <slug>/photos/ into'
+    )
+    parser.add_argument(
+        '--interval',
+        type=float,
+        default=0.2,
+        help='Seconds between scans of the source folder (default: 0.2)'
+    )
+    parser.add_argument(
+        '--debounce',
+        type=float,
+        default=0.3,
+        help='Seconds a file must stay unchanged before it is converted (default: 0.3)'
+    )
+    parser.add_argument(
+        '--once',
+        action='store_true',
+        help='Convert out-of-date pages and exit instead of watching'
+    )
+    parser.add_argument(
+        '--prune',
+        action='store_true',
+        help='Delete the post folder when a page is removed'
+    )
+    parser.add_argument(
+        '--max-tags',
+        type=int,
+        default=5,
+        help='Maximum number of suggested tags (default: 5)'
+    )
+    parser.add_argument(
+        '--themes',
+        metavar='FILE',
+        help='Theme vocabulary file (JSON or YAML) used for tag analysis'
+    )
+    parser.add_argument(
+        '--corpus-index',
+        help='Corpus index built by corpus_index.py; ranks keywords by TF-IDF'
+    )
+    parser.add_argument(
+        '--fetch-titles',
+        action='store_true',
+        help='Use fetched page titles as link text (cached)'
+    )
+    parser.add_argument(
+        '--no-download',
+        action='store_true',
+        help='Leave remote images as links instead of downloading them'
+    )
+    parser.add_argument(
+        '--store',
+        metavar='DIR',
+        help='Content-addressed image store (default: ~/.cache/notion-to-mdx/images)'
+    )
+    parser.add_argument(
+        '--no-store',
+        action='store_true',
+        help='Download images without the image store'
+    )
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    store_dir = None
+    if not args.no_store:
+        store_dir = Path(args.store) if args.store else DEFAULT_IMAGE_STORE
+
+    with instrumented(args):
+        try:
+            with Pipeline(args.max_tags, args.themes, args.corpus_index, not args.no_download,
+                          store_dir, args.fetch_titles) as pipeline:
+                watcher = Watcher(args.source, args.output_dir, pipeline, args.prune)
+                converted = watcher.sync()
+                up_to_date = len(watcher.state['pages'].keys() - watcher.failed.keys())
+                print(f"{'⚠' if watcher.failed else '✓'} {converted} page(s) converted, "
+                      f"{up_to_date} up to date, {len(watcher.failed)} failed", file=sys.stderr)
+                if args.once:
+                    exit(1 if watcher.failed else 0)
+                print(f"Watching {watcher.source} (Ctrl-C to stop)", file=sys.stderr)
+                watcher.run(args.interval, args.debounce)
+
+        except KeyboardInterrupt:
+            print("\nStopped", file=sys.stderr)
+        except Exception as e:
+            print(f"✗ Error: {e}", file=sys.stderr)
+            exit(1)
+
+
+if __name__ == '__main__':
+    main()